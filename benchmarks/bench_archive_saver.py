@@ -0,0 +1,138 @@
+""" Archives a synthetic output tree with the ArchiveSaver and emails it to a stand-in SMTP server
+        running in this process. Reports the archive and delivery throughput and the peak memory
+        traced while doing each, which stays near the chunk sizes instead of growing with the
+        archive. Checks the delivered attachment matches the archive.
+
+    Usage (from the repository root):
+        python benchmarks/bench_archive_saver.py --files 200 --file-mb 0.5
+"""
+import argparse
+import email
+import email.policy
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.builtin_plugins.archive_saver import ArchiveSaver, ARCHIVE_FORMAT_CHOICES, zstandard_available
+
+class StandInSmtpHandler(socketserver.StreamRequestHandler):
+    """ Accepts every command and spools each received message to server.message_path, so the
+            server's memory isn't traced as the delivery's. """
+
+    def handle(self):
+        self.reply("220 stand-in")
+        message_file = None
+        while(line := self.rfile.readline()):
+            if(message_file is not None):
+                if(line == b".\r\n"):
+                    message_file.close()
+                    message_file = None
+                    self.reply("250 queued")
+                else:
+                    message_file.write(line)
+                continue
+
+            command = line[:4].upper()
+            if(command == b"DATA"):
+                message_file = open(self.server.message_path, "wb")
+                self.reply("354 end with .")
+            elif(command == b"QUIT"):
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+    def reply(self, text):
+        self.wfile.write(f"{text}\r\n".encode("ascii"))
+
+def build_output_tree(path: str, files: int, file_mb: float):
+    """ Half compressible CSV-like text and half random bytes, like CSVs and PNGs. """
+    saved_files = []
+    size = int(file_mb*1024*1024)
+    for index in range(files):
+        directory = os.path.join(path, f"analysis_{index % 10}")
+        os.makedirs(directory, exist_ok=True)
+        if(index % 2 == 0):
+            file_path = os.path.join(directory, f"result_{index}.csv")
+            row = f"{index},value,{index*0.5}\n".encode("ascii")
+            data = (row * (size // len(row) + 1))[:size]
+        else:
+            file_path = os.path.join(directory, f"figure_{index}.png")
+            data = os.urandom(size)
+        with open(file_path, "wb") as file:
+            file.write(data)
+        saved_files.append(file_path)
+    return saved_files
+
+def traced(function):
+    """ Run the function, returning its seconds and the peak traced memory in MB. """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        function()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / (1024*1024)
+        tracemalloc.stop()
+    return seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ArchiveSaver and its SMTP delivery.")
+    parser.add_argument("--files", type=int, default=200, help="Files in the output tree.")
+    parser.add_argument("--file-mb", type=float, default=0.5, help="Size of each file in MB.")
+    args = parser.parse_args()
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandInSmtpHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    formats = [archive_format for archive_format in ARCHIVE_FORMAT_CHOICES if archive_format != "tar.zst" or zstandard_available]
+    if(not zstandard_available):
+        print("zstandard is not installed, skipping tar.zst.")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        server.message_path = os.path.join(temp_dir, "message.eml")
+        saved_files = build_output_tree(os.path.join(temp_dir, "out"), args.files, args.file_mb)
+        total_mb = sum([os.path.getsize(path) for path in saved_files]) / (1024*1024)
+        print(f"Archiving {len(saved_files)} file(s), {total_mb:.1f} MB.")
+
+        prog_data = SimpleNamespace(saved_files=saved_files, program_start_ts=time.time(), args=SimpleNamespace(config="bench"))
+        delivery = {"method": "smtp", "host": "127.0.0.1", "port": server.server_address[1], "from": "bench@localhost", "to": "bench@localhost"}
+
+        print(f"{'':<10}{'archive':>12}{'peak':>10}{'deliver':>12}{'peak':>10}{'archive MB':>12}")
+        for archive_format in formats:
+            saver = ArchiveSaver()
+            out_path = os.path.join(temp_dir, archive_format)
+            archive_path = os.path.join(out_path, f"results.{archive_format}")
+            stdout = sys.stdout
+            with open(os.devnull, "w") as devnull:
+                sys.stdout = devnull
+                try:
+                    archive_seconds, archive_peak = traced(lambda: saver.save(prog_data, {"format": archive_format}, out_path))
+                    config = {"format": archive_format, "filename": f"results.{archive_format}", "delivery": delivery}
+                    deliver_seconds, deliver_peak = traced(lambda: saver.save(prog_data, config, out_path))
+                finally:
+                    sys.stdout = stdout
+
+            # The second save archived again before delivering, compare against that archive
+            with open(server.message_path, "rb") as file:
+                message = email.message_from_binary_file(file, policy=email.policy.default)
+            attachment = list(message.iter_attachments())[0].get_content()
+            with open(archive_path, "rb") as file:
+                assert attachment == file.read(), "The delivered attachment differs from the archive"
+
+            archive_mb = os.path.getsize(archive_path) / (1024*1024)
+            print(f"{archive_format:<10}{archive_seconds*1000:>10.0f}ms{archive_peak:>8.1f}MB{(deliver_seconds-archive_seconds)*1000:>10.0f}ms{deliver_peak:>8.1f}MB{archive_mb:>12.1f}")
+
+    server.shutdown()
+    print("Delivered attachments match their archives.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Throughput of the binary identifier codec. Builds the identifiers a synthetic run would
+        produce and compares encode/decode speed and payload size against pickle. The round trip
+        checks are in tests/test_identifier_codec.py.
+
+    Usage (from the repository root):
+        python benchmarks/bench_identifier_codec.py --keys 200 --periods 24
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.builtin_plugins.vis_dataclasses import VisIdentifier
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier, AggregateAnalysisIdentifier
+from src.data.identifier_codec import encode_identifiers, decode_identifiers
+
+from benchmarks.synthetic_plugins import SyntheticIdentifier, synthetic_key
+
+def build_identifiers(periods: int, keys: int):
+    """ Build the identifiers of a synthetic run, each analysis and visualization shares its
+            .on subtree with the others on the same DataFrame. """
+    identifiers = []
+    for period in range(periods):
+        start_ts = 1_700_000_000 + period*2_592_000
+        end_ts = start_ts + 2_591_999
+        for key_index in range(keys):
+            base = SyntheticIdentifier(start_ts, end_ts, synthetic_key(key_index))
+            identifiers.append(base)
+            for analysis in ["bench_sum", "bench_mean", "bench_top"]:
+                analysis_identifier = AnalysisIdentifier(base, analysis)
+                identifiers.append(analysis_identifier)
+                identifiers.append(VisIdentifier(analysis_identifier, "bench_vis_bar"))
+
+    for key_index in range(keys):
+        identifiers.append(MetaAnalysisIdentifier(None, "bench_meta", synthetic_key(key_index)))
+    identifiers.append(AggregateAnalysisIdentifier(AnalysisIdentifier(TimeStampIdentifier(0, 1), "bench_sum"), "bench_agg", None))
+
+    return identifiers
+
+def time_call(method, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = method()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the identifier codec against pickle.")
+    parser.add_argument("--periods", type=int, default=12)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    identifiers = build_identifiers(args.periods, args.keys)
+    print(f"Encoding {len(identifiers)} identifier(s).")
+
+    encode_seconds, payload = time_call(lambda: encode_identifiers(identifiers), args.repeat)
+    decode_seconds, _ = time_call(lambda: decode_identifiers(payload), args.repeat)
+    pickle_seconds, pickled = time_call(lambda: pickle.dumps(identifiers), args.repeat)
+    unpickle_seconds, _ = time_call(lambda: pickle.loads(pickled), args.repeat)
+    str_size = sum([len(str(identifier).encode("utf-8")) for identifier in identifiers])
+
+    print(f"{'':<8}{'encode':>12}{'decode':>12}{'bytes':>12}")
+    print(f"{'codec':<8}{encode_seconds*1000:>10.2f}ms{decode_seconds*1000:>10.2f}ms{len(payload):>12}")
+    print(f"{'pickle':<8}{pickle_seconds*1000:>10.2f}ms{unpickle_seconds*1000:>10.2f}ms{len(pickled):>12}")
+    print(f"{'str':<8}{'':>12}{'':>12}{str_size:>12}")
+
+if __name__ == "__main__":
+    main()
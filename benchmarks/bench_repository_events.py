@@ -0,0 +1,75 @@
+""" Overhead of DataRepository events. Times adding identifiers with no subscriptions against an
+        add without the event check, and with subscriptions that do and don't match. The events
+        themselves are tested in tests/test_repository_events.py.
+
+    Usage (from the repository root):
+        python benchmarks/bench_repository_events.py --identifiers 200000 --rounds 5
+"""
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.data.data_repository import DataRepository
+from src.data.filters import filter_type
+from src.data.identifier import AnalysisIdentifier, Identifier, TimeStampIdentifier
+
+class EventlessRepository(DataRepository):
+    """ A repository whose add skips the event check, the floor the event path is timed against. """
+
+    def add(self, identifier, data, metadata=None):
+        if(not isinstance(identifier, Identifier)):
+            raise ValueError(f"Cannot add data for \"{identifier}\", it is not an Identifier.")
+        self._add(identifier, data, metadata)
+
+def build_identifiers(count: int):
+    bases = [TimeStampIdentifier(index, index+1) for index in range(max(1, count // 4))]
+    return [AnalysisIdentifier(bases[index % len(bases)], f"analysis_{index // len(bases)}") for index in range(count)]
+
+def time_add(identifiers: list, repo_type: type, subscribe=None):
+    """ The seconds to add every identifier to a fresh repository. """
+    data_repo = repo_type()
+    if(subscribe is not None):
+        subscribe(data_repo)
+    add = data_repo.add
+    start = time.perf_counter()
+    for identifier in identifiers:
+        add(identifier, None, None)
+    return time.perf_counter() - start
+
+def time_adds(identifiers: list, cases: dict, rounds: int):
+    """ The best time of each case over the rounds, the cases are interleaved so they share the
+            machine's noise. A first round warms up and isn't counted. """
+    timings = {name: float("inf") for name in cases.keys()}
+    for round_number in range(rounds+1):
+        for name, (repo_type, subscribe) in cases.items():
+            seconds = time_add(identifiers, repo_type, subscribe)
+            if(round_number > 0):
+                timings[name] = min(timings[name], seconds)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Time DataRepository events.")
+    parser.add_argument("--identifiers", type=int, default=200000, help="Identifiers added per timing.")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds, the best round of each case is printed.")
+    args = parser.parse_args()
+
+    identifiers = build_identifiers(args.identifiers)
+    timings = time_adds(identifiers, {
+        "eventless": (EventlessRepository, None),
+        "no subscriptions": (DataRepository, None),
+        "sync, filtered out": (DataRepository, lambda data_repo: data_repo.subscribe(lambda events: None, filter_type(TimeStampIdentifier))),
+        "sync, every add": (DataRepository, lambda data_repo: data_repo.subscribe(lambda events: None)),
+        "queued, every add": (DataRepository, lambda data_repo: data_repo.subscribe_queue()),
+    }, args.rounds)
+
+    floor = timings.pop("eventless")
+    print(f"Adding {len(identifiers)} identifiers, {floor*1000:.1f}ms without the event check:")
+    for name, seconds in timings.items():
+        print(f"  {name:<20}{seconds*1000:>10.1f}ms  {(seconds/floor-1)*100:>+7.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+""" Writes tens of thousands of scalar analysis results with AnalysisSaver, comparing its buffered
+        text results writer against appending each period's results with append_line_to_file,
+        which rereads and rewrites text_results.txt for every period. That both produce the same
+        file is tested in tests/test_analysis_saver.py.
+
+    Usage (from the repository root):
+        python benchmarks/bench_text_results.py --sources 10000 --analyses 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.builtin_plugins.analysis_saver import AnalysisSaver
+from src.data.data_repository import DataRepository
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier
+from src.utils.fileutils import append_line_to_file, ParallelFileWriter
+
+def build_repository(sources: int, analyses: int):
+    """ One hourly period per source, each with a float result per analysis. """
+    data_repo = DataRepository()
+    for source in range(sources):
+        base = TimeStampIdentifier(1_700_000_000 + source*3600, 1_700_000_000 + source*3600 + 3599)
+        for analysis in range(analyses):
+            data_repo.add(AnalysisIdentifier(base, f"bench_text_{analysis}"), source*0.5 + analysis)
+    return data_repo
+
+def save_buffered(data_repo: DataRepository, base_path: str):
+    saver = AnalysisSaver()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            saver.save(SimpleNamespace(data_repo=data_repo), None, base_path)
+        finally:
+            sys.stdout = stdout
+    return time.perf_counter() - start, saver
+
+def save_appending(saver: AnalysisSaver, path: str):
+    """ The text results write loop from before the buffered writer, appending each period. """
+    start = time.perf_counter()
+    ordered_keys = sorted(saver.text_results.keys(), key=lambda x: x.start_ts)
+    for index, identifier in enumerate(ordered_keys):
+        to_append = f"For {identifier}:\n  {"\n  ".join(saver.text_results[identifier])}"
+        append_line_to_file(path, to_append, overwrite=(index == 0))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AnalysisSaver's text results writer.")
+    parser.add_argument("--sources", type=int, default=10000, help="Periods with text results.")
+    parser.add_argument("--analyses", type=int, default=3, help="Scalar analyses per period.")
+    args = parser.parse_args()
+
+    data_repo = build_repository(args.sources, args.analyses)
+    print(f"Saving {args.sources*args.analyses} text result(s) over {args.sources} period(s).")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        buffered_path = os.path.join(temp_dir, "buffered")
+        saver_seconds, saver = save_buffered(data_repo, buffered_path)
+
+        appending_path = os.path.join(temp_dir, "appending.txt")
+        appending_seconds = save_appending(saver, appending_path)
+
+        # Time the text results alone, the full save also makes a directory per result
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                with ParallelFileWriter(1) as saver.writer:
+                    saver.save_text_results()
+            finally:
+                sys.stdout = stdout
+        buffered_seconds = time.perf_counter() - start
+
+    print(f"{'full AnalysisSaver.save':<32}{saver_seconds*1000:>12.1f}ms")
+    print(f"{'text results, appending':<32}{appending_seconds*1000:>12.1f}ms")
+    print(f"{'text results, buffered':<32}{buffered_seconds*1000:>12.1f}ms")
+    print(f"{'speedup':<32}{appending_seconds/buffered_seconds:>13.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+""" Per-figure rendering cost of the built-in bar and time series visualizations, comparing the
+        standard engine to the fast engine. Each figure is plotted and encoded to PNG bytes the way
+        the VisualAnalysisDriver's png render mode does. That the fast engine renders the same
+        bytes on a reused template as on a fresh one is tested in tests/test_vis_render.py.
+
+    Usage (from the repository root):
+        python benchmarks/bench_vis_render.py --rows 10 200 --periods 12 36
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.builtin_plugins.vis_impls import FigureSpec, RENDER_ENGINE_CHOICES, plot_figure, render_png
+
+from benchmarks.synthetic_plugins import synthetic_key
+
+def build_bar_specs(rows: int, count: int, rng):
+    """ Bar charts shaped like the synthetic top namespaces analysis. """
+    specs = []
+    for index in range(count):
+        df = pd.DataFrame({
+            "namespace": [f"{synthetic_key(index)}-ns-{row:03d}" for row in range(rows)],
+            "hours": np.sort(rng.random(rows)*1000)[::-1]
+        })
+        specs.append(FigureSpec("bar", df, {}, f"Top namespaces {index}", f"Total hours: {df['hours'].sum():.2f}", "green"))
+    return specs
+
+def build_time_specs(periods: int, columns: int, count: int, rng):
+    """ Time series shaped like the synthetic meta analysis, one month per period. """
+    starts = [1_700_000_000 + period*2_592_000 for period in range(periods)]
+    metadata = {"periods": [(start_ts, start_ts + 2_591_999) for start_ts in starts]}
+
+    specs = []
+    for index in range(count):
+        df = pd.DataFrame({"Period": [str(start_ts) for start_ts in starts]})
+        for column in range(columns):
+            df[f"bench_{column}"] = rng.random(periods)*100
+        specs.append(FigureSpec("time", df, metadata, f"Hours over time {index}", "", {"bench_0": "blue", "bench_1": "red"}))
+    return specs
+
+def time_engine(specs: list[FigureSpec], engine: str, repeat: int):
+    """ Get the best per-figure plot and total (plot and encode) seconds over the repeats. """
+    specs = [dataclasses.replace(spec, engine=engine) for spec in specs]
+    # Warm up so text metrics and templates are cached like they are past the first figure of a run
+    render_png(specs[0])
+
+    best_plot = None
+    best_total = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for spec in specs:
+            plt.close(plot_figure(spec, reuse=True))
+        plot_seconds = (time.perf_counter() - start)/len(specs)
+
+        start = time.perf_counter()
+        for spec in specs:
+            render_png(spec)
+        total_seconds = (time.perf_counter() - start)/len(specs)
+
+        best_plot = plot_seconds if best_plot is None else min(best_plot, plot_seconds)
+        best_total = total_seconds if best_total is None else min(best_total, total_seconds)
+
+    return best_plot, best_total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-figure cost of the visualization engines.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100], help="Bar chart row counts.")
+    parser.add_argument("--periods", type=int, nargs="+", default=[12, 36], help="Time series period counts.")
+    parser.add_argument("--columns", type=int, default=2, help="Time series line count.")
+    parser.add_argument("--figures", type=int, default=5, help="Figures rendered per case and repeat.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cases = [(f"bar {rows} rows", build_bar_specs(rows, args.figures, rng)) for rows in args.rows]
+    cases += [(f"time {periods}x{args.columns}", build_time_specs(periods, args.columns, args.figures, rng)) for periods in args.periods]
+
+    print(f"{'per figure':<16}" + "".join([f"{engine + ' plot':>16}{engine + ' total':>16}" for engine in RENDER_ENGINE_CHOICES]) + f"{'speedup':>10}")
+    for name, specs in cases:
+        timings = [time_engine(specs, engine, args.repeat) for engine in RENDER_ENGINE_CHOICES]
+        row = "".join([f"{plot_seconds*1000:>14.1f}ms{total_seconds*1000:>14.1f}ms" for plot_seconds, total_seconds in timings])
+        print(f"{name:<16}{row}{timings[0][1]/timings[-1][1]:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+""" Benchmark harness for AutoMetrics. Runs the full ingest, analysis, and saving phases with the
+        synthetic plugins at several scales, times repository hot spots, and records peak RSS.
+        Results are written as JSON and can be compared against a stored baseline.
+
+    Usage (from the repository root):
+        python benchmarks/run_benchmarks.py --output bench.json
+        python benchmarks/run_benchmarks.py --scales small,medium --baseline benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+SYNTHETIC_PLUGINS_PATH = "./benchmarks/synthetic_plugins.py"
+
+# Each scale is the amount of monthly main periods, keys per period and rows per DataFrame
+SCALES = {
+    "small":  {"periods": 3,  "keys": 10,  "rows": 200},
+    "medium": {"periods": 12, "keys": 50,  "rows": 1000},
+    "large":  {"periods": 24, "keys": 200, "rows": 5000},
+}
+
+BENCH_ANALYSES = ["bench_sum", "bench_mean", "bench_top", "bench_meta", "bench_agg", "bench_vis_bar", "bench_vis_time"]
+BENCH_SAVERS = ["AnalysisSaver", "VizualizationsSaver", "SyntheticSaver"]
+
+def get_bench_period(period_count):
+    """ Get a (start_ts, end_ts) range covering period_count whole months, ending last month. """
+    from src.utils.timeutils import get_unix_timestamp_range
+
+    today = datetime.date.today()
+    month_index = today.year*12 + today.month-1 - 1 # Last month
+    end_range = get_unix_timestamp_range(month_index % 12 + 1, month_index // 12)
+
+    month_index -= period_count-1
+    start_range = get_unix_timestamp_range(month_index % 12 + 1, month_index // 12)
+
+    return (start_range[0], end_range[1])
+
+def get_peak_rss_mb():
+    """ Get the peak resident set size of this process in MB. """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    if(sys.platform == "darwin"):
+        return peak / (1024*1024)
+    return peak / 1024
+
+def time_call(method, repeat=1):
+    """ Run the method repeat times, returning the mean seconds per call and the last result. """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = method()
+    return (time.perf_counter()-start) / repeat, result
+
+def benchmark_hot_spots(data_repo, timeline, repeat):
+    """ Time the DataRepository operations that dominate analysis time. """
+    from src.data.data_repository import DataRepository
+    from src.data.filters import filter_analyis_type
+    from src.data.identifier import AnalysisIdentifier
+    from src.utils.datautils import resolve_analysis
+
+    results = {}
+    identifiers = list(data_repo.get_ids())
+
+    seconds, matched = time_call(lambda: data_repo.filter_ids(filter_analyis_type("bench_sum")), repeat)
+    results["filter_ids"] = {"seconds": seconds, "scanned": len(identifiers), "matched": len(matched)}
+
+    def add_all():
+        repo = DataRepository()
+        for identifier in identifiers:
+            repo.add(AnalysisIdentifier(identifier, "bench_copy"), None)
+        return repo
+    seconds, _ = time_call(add_all, repeat)
+    results["add"] = {"seconds": seconds, "seconds_per_call": seconds/max(len(identifiers), 1), "count": len(identifiers)}
+
+    half = len(identifiers)//2
+    def join_halves():
+        left = DataRepository()
+        right = DataRepository()
+        for identifier in identifiers[:half]:
+            left.add(identifier, None)
+        for identifier in identifiers[half:]:
+            right.add(identifier, None)
+        left.join(right)
+    seconds, _ = time_call(join_halves, repeat)
+    results["join"] = {"seconds": seconds, "count": len(identifiers)}
+
+    # Resolve one analysis per main period for the first key, like MetaAnalysisDriver does
+    key_method = lambda identifier: identifier.find_base().key
+    def resolve_all():
+        for start_ts, end_ts in timeline.main_periods:
+            resolve_analysis(data_repo, start_ts, end_ts, "bench_sum", key_method=key_method, unique_key="key0000")
+    seconds, _ = time_call(resolve_all, repeat)
+    calls = len(timeline.main_periods)
+    results["resolve_analysis"] = {"seconds": seconds, "seconds_per_call": seconds/max(calls, 1), "calls": calls}
+
+    return results
+
+def run_scale(scale_name, scale, repeat, compact=None, stream=False):
+    """ Run a single scale, this is called in a fresh process so peak RSS belongs to the scale.
+            compact is the ingest.compact mode for the synthetic frames, None to keep them as is.
+            stream sets saving.stream, so the savers write during the analysis phase. """
+    os.chdir(project_root)
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import pandas as pd
+    pd.set_option('mode.copy_on_write', True)
+
+    from src.data.compaction import get_frame_bytes
+    from src.pipeline import run_ingest, run_analyses, run_savers, start_streams
+    from src.plugin_mgmt.pluginloader import LoadedPlugins
+    from src.program_data import ProgramData
+
+    plugins = LoadedPlugins()
+    plugins.load_plugins_from_file(SYNTHETIC_PLUGINS_PATH)
+
+    with tempfile.TemporaryDirectory(prefix="autometrics_bench_") as base_path:
+        config = {
+            "timeline": {"align": "month"},
+            "ingest": {"run": ["IngestTimeline", "SyntheticIngest"]},
+            "analysis": {"run": list(BENCH_ANALYSES)},
+            "saving": {"base-path": base_path, "run": list(BENCH_SAVERS)},
+            "SyntheticIngest": {"keys": scale["keys"], "rows": scale["rows"]},
+        }
+        if(compact is not None):
+            config["ingest"]["compact"] = {"SyntheticIngest": compact}
+        if(stream):
+            config["saving"]["stream"] = True
+        args = argparse.Namespace(
+            config=None, period=get_bench_period(scale["periods"]), analysis_options=list(BENCH_ANALYSES),
+            verbose=False, verifyconfig=False, exitaction=None, shards=1, backfill=None, step="month", workers=1, trace=None,
+            profile=False, profile_plugins=None, profile_mode="cprofile", repo_stats=False
+        )
+
+        prog_data = ProgramData(plugins, args, config)
+        prog_data.program_start_ts = time.time()
+
+        phases = {}
+        analyses = {}
+        # Plugin output is noise here, only the timings matter
+        with contextlib.redirect_stdout(io.StringIO()):
+            phases["ingest"], _ = time_call(lambda: run_ingest(prog_data))
+            frame_bytes = sum([get_frame_bytes(data) for data in map(prog_data.data_repo.get_data, prog_data.data_repo.get_ids()) if isinstance(data, pd.DataFrame)])
+
+            analysis_start = time.perf_counter()
+            start_streams(prog_data, base_path)
+            for analysis_name in BENCH_ANALYSES:
+                analysis = plugins.get_analysis_by_name(analysis_name)
+                analyses[analysis_name], _ = time_call(lambda: run_analyses(prog_data, [analysis]))
+            phases["analysis"] = time.perf_counter()-analysis_start
+
+            phases["saving"], saved_files = time_call(lambda: run_savers(prog_data, base_path))
+
+            hot_spots = benchmark_hot_spots(prog_data.data_repo, prog_data.timeline, repeat)
+
+    return {
+        "params": scale,
+        "identifiers": prog_data.data_repo.count(),
+        "saved_files": len(saved_files),
+        "ingested_frame_mb": frame_bytes / (1024*1024),
+        "phases": phases,
+        "analyses": analyses,
+        "hot_spots": hot_spots,
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+
+def flatten_metrics(scale_results):
+    """ Flatten the compared metrics of a scale result into {"phases.ingest": 1.2, ...}. Only
+            timings and peak RSS are compared, counts are informational. """
+    metrics = {"peak_rss_mb": scale_results["peak_rss_mb"]}
+
+    for group in ["phases", "analyses"]:
+        for name, seconds in scale_results[group].items():
+            metrics[f"{group}.{name}"] = seconds
+
+    for name, values in scale_results["hot_spots"].items():
+        for key in ["seconds", "seconds_per_call"]:
+            if(key in values):
+                metrics[f"hot_spots.{name}.{key}"] = values[key]
+
+    return metrics
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compare results against a baseline result file.
+
+    Returns:
+        list[str]: A message for each metric that got worse by more than threshold (a fraction).
+    """
+    regressions = []
+    for scale_name, scale_results in results["scales"].items():
+        if(scale_name not in baseline["scales"]):
+            continue
+
+        current = flatten_metrics(scale_results)
+        previous = flatten_metrics(baseline["scales"][scale_name])
+        for metric, value in current.items():
+            if(metric not in previous or previous[metric] is None or value is None or previous[metric] <= 0):
+                continue
+
+            ratio = value / previous[metric]
+            if(ratio > 1+threshold):
+                regressions.append(f"{scale_name} {metric}: {previous[metric]:.4g} -> {value:.4g} ({(ratio-1)*100:+.1f}%)")
+
+    return regressions
+
+def print_summary(results):
+    for scale_name, scale_results in results["scales"].items():
+        phases = scale_results["phases"]
+        print(f"{scale_name}: {scale_results['identifiers']} identifiers, {scale_results['saved_files']} files, peak RSS {scale_results['peak_rss_mb']:.1f} MB, ingested DataFrames {scale_results.get('ingested_frame_mb', 0):.1f} MB")
+        print(f"  phases: {", ".join([f"{phase} {seconds:.3f}s" for phase, seconds in phases.items()])}")
+        print(f"  analyses: {", ".join([f"{analysis} {seconds:.3f}s" for analysis, seconds in scale_results["analyses"].items()])}")
+        print(f"  hot spots: {", ".join([f"{name} {values['seconds']*1000:.3f}ms" for name, values in scale_results["hot_spots"].items()])}")
+
+def main():
+    parser = argparse.ArgumentParser(prog="AutoMetrics benchmarks", description="Benchmark AutoMetrics with synthetic plugins.")
+    parser.add_argument("--scales", default="small,medium", type=lambda opt: opt.split(","), help=f"Comma separated scales to run, choices: {", ".join(SCALES.keys())}.")
+    parser.add_argument("--repeat", default=5, type=int, help="How many times each hot spot is repeated.")
+    parser.add_argument("--output", default=None, help="Write the JSON results to this path.")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON result file, exits with 1 on regressions.")
+    parser.add_argument("--compact", default=None, choices=["standard", "arrow", "downcast"], help="Compact the synthetic DataFrames on ingest with this ingest.compact mode.")
+    parser.add_argument("--stream", action="store_true", help="Set saving.stream so results are saved while the analyses run.")
+    parser.add_argument("--threshold", default=0.2, type=float, help="Allowed slowdown before a metric counts as a regression, as a fraction.")
+    args = parser.parse_args()
+
+    for scale_name in args.scales:
+        if(scale_name not in SCALES):
+            parser.error(f"Unknown scale \"{scale_name}\", choices: {", ".join(SCALES.keys())}")
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": {},
+    }
+
+    # Each scale runs in its own process so the peak RSS isn't shared between scales
+    context = multiprocessing.get_context("spawn")
+    for scale_name in args.scales:
+        print(f"Running {scale_name} {SCALES[scale_name]}...")
+        with context.Pool(1) as pool:
+            results["scales"][scale_name] = pool.apply(run_scale, (scale_name, SCALES[scale_name], args.repeat, args.compact, args.stream))
+
+    print()
+    print_summary(results)
+
+    if(args.output is not None):
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Wrote results to \"{args.output}\"")
+
+    if(args.baseline is not None):
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if(len(regressions) > 0):
+            print(f"{len(regressions)} regression(s) over {args.threshold*100:.0f}% against \"{args.baseline}\":")
+            for regression in regressions:
+                print(f"  {regression}")
+            exit(1)
+
+        print(f"No regressions against \"{args.baseline}\".")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+""" Synthetic plugins for the benchmark suite. These are loaded by run_benchmarks.py, they aren't in
+        ./plugins so normal runs never see them. """
+from dataclasses import dataclass
+import os
+import numpy as np
+import pandas as pd
+
+from src.builtin_plugins.agg_analysis_driver import AggregateAnalysis
+from src.builtin_plugins.meta_analysis_driver import MetaAnalysis
+from src.builtin_plugins.simple_analysis_driver import SimpleAnalysis
+from src.builtin_plugins.vis_dataclasses import VisualAnalysis, VisBarSettings, VisTimeSettings
+from src.data.data_repository import DataRepository
+from src.data.filters import *
+from src.data.timeline import Timeline
+from src.parameter_utils import ConfigurationException
+from src.plugin_mgmt.plugins import IngestPlugin, AnalysisPlugin, Saver
+from src.program_data import ProgramData
+from src.utils.config_checker import verify_sections_exist
+
+# Only the first VIS_KEY_COUNT keys get bar graphs, this keeps the figure count reasonable at
+#   large scales while still exercising the variable resolution for every figure.
+VIS_KEY_COUNT = 5
+
+def synthetic_key(index):
+    return f"key{index:04d}"
+
+@dataclass(frozen=True)
+class SyntheticIdentifier(TimeStampIdentifier):
+    """ Identifier for a synthetic DataFrame, one per main period and key. """
+    key: str
+
+    def __hash__(self) -> int:
+        return hash((self.start_ts, self.end_ts, self.key))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SyntheticIdentifier) and self.start_ts == other.start_ts and self.end_ts == other.end_ts and self.key == other.key
+
+    def __str__(self) -> str:
+        return f"synthetic {self.key} {self.start_ts}-{self.end_ts}"
+
+class SyntheticIngest(IngestPlugin):
+    """ Generates one DataFrame per main period and key, with a low cardinality string column and
+            a few numeric columns. The data is seeded by period and key so shards and backfill
+            periods generate the same frames as a single run. """
+
+    def verify_config_section(self, config_section):
+        if(config_section is None):
+            return True
+
+        verify_sections_exist(config_section, "SyntheticIngest", required_sections=set(), optional_sections={"keys", "rows"})
+        for section in config_section.keys():
+            if(not isinstance(config_section[section], int) or config_section[section] < 1):
+                raise ConfigurationException(f"SyntheticIngest \"{section}\" has to be a positive integer.")
+
+        return True
+
+    def ingest(self, prog_data: ProgramData, config_section: dict) -> DataRepository:
+        key_count = 10
+        row_count = 100
+        if(config_section is not None):
+            key_count = config_section.get("keys", key_count)
+            row_count = config_section.get("rows", row_count)
+
+        timeline: Timeline = prog_data.timeline
+        data_repo = DataRepository()
+
+        for start_ts, end_ts in timeline.main_periods:
+            for key_index in range(key_count):
+                rng = np.random.default_rng((int(start_ts), key_index))
+                df = pd.DataFrame({
+                    "namespace": rng.choice([f"ns{i}" for i in range(20)], size=row_count),
+                    "node": rng.choice([f"node{i}" for i in range(50)], size=row_count),
+                    "cpu": rng.random(row_count) * 64,
+                    "gpu": rng.integers(0, 8, size=row_count),
+                    "hours": rng.random(row_count) * 24,
+                })
+                data_repo.add(SyntheticIdentifier(start_ts, end_ts, synthetic_key(key_index)), df, {"rows": row_count})
+
+        return data_repo
+
+def synthetic_key_method(identifier):
+    return identifier.find_base().key
+
+def synthetic_top_namespaces(identifier, data_repo: DataRepository):
+    df = data_repo.get_data(identifier)
+    top = df.groupby("namespace", as_index=False, observed=True)["hours"].sum()
+    return top.sort_values("hours", ascending=False).head(10)
+
+def is_vis_key(identifier):
+    return synthetic_key_method(identifier) in [synthetic_key(i) for i in range(VIS_KEY_COUNT)]
+
+class SyntheticAnalyses(AnalysisPlugin):
+    """ One representative analysis per built-in driver. """
+
+    def get_analyses(self):
+        return [
+            SimpleAnalysis(
+                name="bench_sum",
+                prereq_analyses=[],
+                filter=filter_type(SyntheticIdentifier),
+                method=lambda identifier, data_repo: float(data_repo.get_data(identifier)["hours"].sum())
+            ),
+            SimpleAnalysis(
+                name="bench_mean",
+                prereq_analyses=[],
+                filter=filter_type(SyntheticIdentifier),
+                method=lambda identifier, data_repo: float(data_repo.get_data(identifier)["cpu"].mean())
+            ),
+            SimpleAnalysis(
+                name="bench_top",
+                prereq_analyses=[],
+                filter=filter_type(SyntheticIdentifier),
+                method=synthetic_top_namespaces
+            ),
+            MetaAnalysis(
+                name="bench_meta",
+                prereq_analyses=["bench_sum", "bench_mean"],
+                key_method=synthetic_key_method
+            ),
+            AggregateAnalysis(
+                name="bench_agg",
+                prereq_analyses=["bench_sum"],
+                filter=filter_analyis_type("bench_sum"),
+                key_method=synthetic_key_method,
+                method=lambda identifiers, data_repo: sum([data_repo.get_data(identifier) for identifier in identifiers])
+            ),
+            VisualAnalysis(
+                name="bench_vis_bar",
+                prereq_analyses=["bench_top", "bench_sum"],
+                filter=lambda identifier: filter_analyis_type("bench_top")(identifier) and is_vis_key(identifier),
+                vis_settings=VisBarSettings(title="Top namespaces %MONTH% %YEAR%", variables={"SUM": "bench_sum"}, subtext="Total hours: %SUM%", color="green")
+            ),
+            VisualAnalysis(
+                name="bench_vis_time",
+                prereq_analyses=["bench_meta"],
+                filter=lambda identifier: filter_analyis_type("bench_meta")(identifier) and identifier.key == synthetic_key(0),
+                vis_settings=VisTimeSettings(title="Hours over time", variables=None, color={"bench_sum": "blue", "bench_mean": "red"})
+            ),
+        ]
+
+class SyntheticSaver(Saver):
+    """ Writes every DataFrame in the repository as a CSV, without the per-analysis directory
+            layout of AnalysisSaver. Measures plain serialization throughput. """
+
+    def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        data_repo: DataRepository = prog_data.data_repo
+
+        out_path = os.path.join(base_path, "synthetic")
+        os.makedirs(out_path, exist_ok=True)
+
+        saved_files = []
+        for index, identifier in enumerate(data_repo.get_ids()):
+            data = data_repo.get_data(identifier)
+            if(not isinstance(data, pd.DataFrame)):
+                continue
+
+            path = os.path.join(out_path, f"{index}.csv")
+            data.to_csv(path, index=False)
+            saved_files.append(path)
+
+        return saved_files
@@ -0,0 +1,138 @@
+import datetime
+import os
+
+from src.data.data_repository import DataRepository
+from src.parameters import BACKFILL_STEP_CHOICES
+from src.pipeline import run_ingest, run_analyses, run_savers, start_streams
+from src.program_data import ProgramData
+from src.sharding import create_sub_program_data, create_worker_pool, get_worker_plugins, start_worker_telemetry, get_worker_telemetry, merge_worker_telemetry
+from src.utils.datautils import get_identifier_period
+from src.utils.fileutils import convert_readable_period_fs
+from src.utils.profiling import PROFILE_DIRECTORY
+from src.utils.timeutils import break_period_into_months, get_range_printable
+from src.utils.tracing import is_tracing, span
+
+def get_backfill_periods(start_ts, end_ts, step="month"):
+    """
+    Break the backfill range into the periods that each get their own run.
+
+    Args:
+        start_ts (int): The start of the backfill range.
+        end_ts (int): The end of the backfill range.
+        step (str): The size of each period, one of BACKFILL_STEP_CHOICES.
+    Returns:
+        list[tuple[str, tuple[int, int]]]: (label, (start_ts, end_ts)) for each period, the label
+            is used as the output subdirectory name.
+    Raises:
+        ValueError: The step is not one of BACKFILL_STEP_CHOICES.
+    """
+    if(step not in BACKFILL_STEP_CHOICES):
+        raise ValueError(f"Unknown backfill step \"{step}\", the choices are: {", ".join(BACKFILL_STEP_CHOICES)}")
+
+    months = break_period_into_months(start_ts, end_ts)
+
+    if(step == "month"):
+        return [(convert_readable_period_fs(get_range_printable(*month)), month) for month in months]
+
+    # Group the months by calendar year
+    years = {}
+    for month_start, month_end in months:
+        year = datetime.datetime.fromtimestamp(month_start).year
+        if(year not in years):
+            years[year] = (month_start, month_end)
+        else:
+            years[year] = (years[year][0], month_end)
+
+    return [(str(year), period) for year, period in years.items()]
+
+def slice_repository(data_repo: DataRepository, start_ts, end_ts) -> DataRepository:
+    """
+    Create a repository with the identifiers from data_repo that belong inside of a period. The
+        data and metadata objects are shared, not copied. Identifiers without a period (see
+        get_identifier_period) are included in every slice.
+
+    Args:
+        data_repo (DataRepository): The repository to slice.
+        start_ts (int): The start of the period.
+        end_ts (int): The end of the period.
+    Returns:
+        DataRepository: The sliced repository.
+    """
+    sliced_repo = DataRepository()
+
+    for identifier in data_repo.get_ids():
+        period = get_identifier_period(identifier)
+        if(period is not None and (period[0] < start_ts or period[1] > end_ts)):
+            continue
+
+        data, metadata = data_repo.get(identifier)
+        sliced_repo.add(identifier, data, metadata)
+
+    return sliced_repo
+
+def run_backfill(prog_data: ProgramData, analysis_order: list, base_path: str, step: str, workers: int):
+    """
+    Run the whole config once per backfill period. Plugins are loaded once, the data for the
+        whole backfill range is ingested once and sliced for each period. The periods are
+        analyzed and saved concurrently, each into its own subdirectory of base_path.
+
+    Args:
+        prog_data (ProgramData): The program data, its timeline covers the whole backfill range.
+        analysis_order (list[Analysis]): The analyses, ordered by get_analysis_order.
+        base_path (str): The saving base path, each period saves into base_path/<period label>.
+        step (str): The size of each period, one of BACKFILL_STEP_CHOICES.
+        workers (int): The maximum amount of periods processed at the same time.
+    Returns:
+        list[str]: Every file saved, in period order.
+    """
+    periods = get_backfill_periods(prog_data.timeline.start_ts, prog_data.timeline.end_ts, step)
+    workers = max(1, min(workers, len(periods)))
+
+    print(f"Backfilling {len(periods)} period(s) with {workers} worker(s): {", ".join([label for label, _ in periods])}")
+
+    run_ingest(prog_data)
+
+    if(prog_data.args.verbose):
+        prog_data.data_repo.print_contents()
+
+    analysis_names = [analysis.name for analysis in analysis_order]
+    tasks = [
+        (prog_data.args, prog_data.config, period, slice_repository(prog_data.data_repo, *period), analysis_names, os.path.join(base_path, label), prog_data.program_start_ts, prog_data.run_report is not None, is_tracing())
+        for label, period in periods
+    ]
+
+    all_saved_files = []
+    with create_worker_pool(workers) as executor:
+        futures = [executor.submit(_run_backfill_period, *task) for task in tasks]
+
+        for (label, _), future in zip(periods, futures):
+            saved_files, telemetry = future.result()
+            all_saved_files.extend(saved_files)
+            merge_worker_telemetry(prog_data, telemetry, period=label)
+
+    return all_saved_files
+
+def _run_backfill_period(args, config, period, data_repo, analysis_names, base_path, program_start_ts, measured, traced):
+    """ Worker entry point, analyze and save a single backfill period. Returns the saved files and
+            the period's telemetry. """
+    start_worker_telemetry(traced)
+
+    loaded_plugins = get_worker_plugins()
+    period_prog_data = create_sub_program_data(loaded_plugins, args, config, period, program_start_ts, measured)
+    period_prog_data.data_repo = data_repo
+    if(args.repo_stats):
+        data_repo.enable_stats()
+
+    with span(f"Backfill {os.path.basename(base_path)}", "backfill"):
+        start_streams(period_prog_data, base_path)
+        run_analyses(period_prog_data, [loaded_plugins.get_analysis_by_name(name) for name in analysis_names])
+        if(data_repo.stats is not None):
+            print(f"### Repository access for {os.path.basename(base_path)}:")
+            data_repo.stats.print_report()
+
+        saved_files = run_savers(period_prog_data, base_path)
+
+    if(period_prog_data.profiler is not None):
+        period_prog_data.profiler.save(os.path.join(base_path, PROFILE_DIRECTORY))
+
+    return saved_files, get_worker_telemetry(period_prog_data)
@@ -5,8 +5,9 @@ import pandas as pd
 from src.data.data_repository import DataRepository
 from src.data.filters import filter_type, filter_analyis_type
 from src.data.identifier import Identifier, AggregateAnalysisIdentifier
-from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin
+from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin, AnalysisPlan
 from src.utils.timeutils import get_range_printable
+from src.utils.tracing import span
 
 import src.builtin_plugins.agg_analysis_driver as pkg
 
@@ -52,11 +53,28 @@ class AggregateAnalysisDriver(AnalysisDriverPlugin):
             keyed_filter = lambda id: filter_method(id) and key_method(id) == unique_key
             identifiers = data_repo.filter_ids(keyed_filter)
 
-            result = analysis_method(identifiers, data_repo)
+            with span(str(unique_key), "method", analysis=analysis.name, identifiers=len(identifiers)):
+                result = analysis_method(identifiers, data_repo)
 
             out_identifier = AggregateAnalysisIdentifier(None, analysis.name, unique_key)
             data_repo.add(out_identifier, result)
 
+    def explain_analysis(self, analysis: pkg.AggregateAnalysis, plan_repo: DataRepository):
+        """ Each key filters the whole repository, then calls the method once. """
+        key_method = analysis.key_method
+        if(key_method is None):
+            key_method = lambda x: None
+
+        identifiers = plan_repo.filter_ids(analysis.filter)
+        unique_keys = set([key_method(identifier) for identifier in identifiers])
+
+        return AnalysisPlan(
+            inputs=len(identifiers),
+            calls=len(unique_keys),
+            outputs=[AggregateAnalysisIdentifier(None, analysis.name, unique_key) for unique_key in unique_keys],
+            work=f"{len(unique_keys)} key(s), each filtering {plan_repo.count()} identifiers"
+        )
+
 def get_all_unique_keys(data_repo: DataRepository, filter_method, key_method):
     """ List form for analysis_names of get_unique_keys. """
 
@@ -7,40 +7,48 @@ from src.data.filters import *
 from src.parameter_utils import ConfigurationException
 from src.plugin_mgmt.plugins import Saver
 from src.program_data import ProgramData
-from src.utils.fileutils import append_line_to_file
+from src.utils.config_checker import verify_sections_exist
+from src.utils.content_manifest import ContentManifest, is_incremental
+from src.utils.fileutils import BufferedLineWriter, DEFAULT_WRITE_WORKERS, ParallelFileWriter
 from src.utils.timeutils import get_range_printable
+from src.utils.tracing import span
 
 class AnalysisSaver(Saver):
     """ The AnalysisSaver will attempt to cover all AnalysisIdentifiers and their extensions. It
             can save standard AnalysisIdentifiers and MetaAnalysisIdentifiers. There are two types
             of result: text result and dataframe; text results will be put into a single .txt file
-            while dataframes will be saved as .csvs """
+            while dataframes will be saved as .csvs
+        The files are written by a pool of write-workers threads. With saving.incremental set,
+            files whose content didn't change since the last run aren't written again. With
+            saving.stream set, CSVs are written while the analyses are still running.
+    """
+
+    CONCURRENT = True
 
     def verify_config_section(self, config_section):
         if(config_section is None):
             return True
-        
-        if("whitelist" not in config_section):
-            raise ConfigurationException("A config section was provided, but no whitelist section exists.")
 
-        if(not isinstance(config_section["whitelist"], list)):
+        verify_sections_exist(config_section, "AnalysisSaver", required_sections=set(), optional_sections={"whitelist", "write-workers", "addtl-base"})
+
+        if("whitelist" in config_section and not isinstance(config_section["whitelist"], list)):
             raise ConfigurationException("The config section for \"whitelist\" should be in the form of a list.")
+
+        if("write-workers" in config_section and (not isinstance(config_section["write-workers"], int) or config_section["write-workers"] < 1)):
+            raise ConfigurationException("AnalysisSaver \"write-workers\" has to be a positive integer.")
         
         return True
 
     def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
 
-        self.prog_data = prog_data
-        data_repo: DataRepository = prog_data.data_repo
-
-        self.base_path = base_path
-        if(not os.path.exists(self.base_path)):
-            os.makedirs(self.base_path, exist_ok=True)
+        # With saving.stream set the saver was started before the analyses, see start_stream
+        streamed = getattr(self, "streamed", None)
+        self.streamed = None
+        if(streamed is None):
+            self.start(prog_data, config_section, base_path)
+            streamed = set()
 
-        # Keep a list of files we've written to so we can clear the contents previously existing files
-        self.has_written = set()
-        # Keep a dict of SourceIdentifiers and their corresponding text results
-        self.text_results = {}
+        data_repo: DataRepository = prog_data.data_repo
 
         identifiers = []
         # Handle if there is a whitelist in the config section
@@ -54,35 +62,91 @@ class AnalysisSaver(Saver):
             # If no whitelist, we'll just get all of the AnalysisIdentifiers
             identifiers = data_repo.filter_ids(filter_type(AnalysisIdentifier))
 
-        # Loop through each result given by identifiers saving it by its type
-        for identifier in identifiers:
-            identifier: AnalysisIdentifier = identifier
+        # The writer keeps the written files in the order they were submitted
+        with self.writer:
+            # Loop through each result given by identifiers saving it by its type
+            for identifier in identifiers:
+                identifier: AnalysisIdentifier = identifier
 
-            result = data_repo.get_data(identifier)
+                # Streamed results are already being written
+                if(identifier in streamed):
+                    continue
 
-            # Only save results that exist
-            if(result is None):
-                return
+                result = data_repo.get_data_view(identifier)
 
-            if(isinstance(identifier, MetaAnalysisIdentifier)):
-                self.save_meta_analysis(identifier)
-            else:
-                self.save_analysis(identifier)
-        
-        self.save_text_results()
+                # Only save results that exist
+                if(result is None):
+                    continue
+
+                self.save_result(identifier, result)
+            
+            self.save_text_results()
 
-        return list(self.has_written)
+            saved_files = self.writer.wait()
 
-    def save_analysis(self, identifier: AnalysisIdentifier):
+        if(self.manifest is not None):
+            self.manifest.save()
+            self.manifest.print_summary()
+
+        return saved_files
+
+    def start(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        """ Set up the saver's state for a run and start its file writer. """
+        self.prog_data = prog_data
+
+        self.base_path = base_path
+        if(not os.path.exists(self.base_path)):
+            os.makedirs(self.base_path, exist_ok=True)
+
+        # The directories made or found this run, so each one is only checked once
+        self.made_dirs = set()
+        # Keep a dict of SourceIdentifiers and their corresponding text results
+        self.text_results = {}
+        self.manifest = ContentManifest(self.base_path, "AnalysisSaver") if is_incremental(prog_data) else None
+
+        write_workers = DEFAULT_WRITE_WORKERS
+        if(config_section is not None):
+            write_workers = config_section.get("write-workers", write_workers)
+        self.writer = ParallelFileWriter(write_workers)
+
+    def start_stream(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        self.start(prog_data, config_section, base_path)
+        # The identifiers written by save_streamed, save() skips them
+        self.streamed = set()
+
+        if(config_section is not None and "whitelist" in config_section):
+            return filter_multiple_analyis_type(config_section["whitelist"])
+        return filter_type(AnalysisIdentifier)
+
+    def save_streamed(self, identifier: AnalysisIdentifier, data):
+        # Text results share one file that's written after the analyses, save() collects them
+        if(not isinstance(data, pd.DataFrame)):
+            # A streamed DataFrame can be updated to a text result
+            self.streamed.discard(identifier)
+            return False
+
+        self.save_result(identifier, data)
+        self.streamed.add(identifier)
+        return True
+
+    def save_result(self, identifier: AnalysisIdentifier, result):
+        if(isinstance(identifier, MetaAnalysisIdentifier)):
+            self.save_meta_analysis(identifier, result)
+        else:
+            self.save_analysis(identifier, result)
+
+    def get_write_stats(self):
+        if(getattr(self, "manifest", None) is None):
+            return None
+        return self.manifest.get_stats()
+
+    def save_analysis(self, identifier: AnalysisIdentifier, result):
 
-        data_repo: DataRepository = self.prog_data.data_repo
         src_id = identifier.find_base()
-        result = data_repo.get_data(identifier)        
 
         # Make sure the directory holding these results is there
         analysis_dir_path = os.path.join(self.base_path, identifier.fs_str())
-        if(not os.path.exists(analysis_dir_path)):
-            os.mkdir(analysis_dir_path)
+        self.make_dir(analysis_dir_path)
 
         # Ensure there is a list to append to
         if(src_id not in self.text_results.keys()):
@@ -92,9 +156,7 @@ class AnalysisSaver(Saver):
         if(isinstance(result, pd.DataFrame)):
             path = os.path.join(analysis_dir_path, f"{identifier.analysis}.csv")
             print(f"  Saving analysis file \"{path}\"")
-            result.to_csv(path, index=False)
-
-            self.has_written.add(path)
+            self.writer.submit(path, self.write_csv, path, result, identifier)
         else:
             if(isinstance(result, Iterable) and not isinstance(result, str)):
                 result = ", ".join(map(str, result))
@@ -108,37 +170,54 @@ class AnalysisSaver(Saver):
 
         # Save text results, order keys by start time
         ordered_keys = sorted(self.text_results.keys(), key=lambda x: x.start_ts if hasattr(x, "start_ts") and not None else -float('inf'))
-        for identifier in ordered_keys:
+        ordered_keys = [identifier for identifier in ordered_keys if len(self.text_results[identifier]) > 0]
+        if(len(ordered_keys) == 0):
+            return
 
-            if(len(self.text_results[identifier]) == 0):
-                continue
-            
+        print(f"  Saving analysis text results file \"{path}\"")
+        self.writer.submit(path, self.write_text_results, path, ordered_keys)
+
+    def get_text_result_lines(self, ordered_keys):
+        for identifier in ordered_keys:
             out_name = str(identifier) if identifier else "Unknown period"
-            to_append = f"For {out_name}:\n  {"\n  ".join(self.text_results[identifier])}"
+            yield f"For {out_name}:\n  {"\n  ".join(self.text_results[identifier])}"
 
-            overwrite = path not in self.has_written
-            append_line_to_file(path, to_append, overwrite)
+    def write_text_results(self, path, ordered_keys):
+        with span(path, "write", results=len(ordered_keys)):
+            if(self.manifest is not None):
+                self.manifest.write(path, "\n".join(self.get_text_result_lines(ordered_keys)).encode("utf-8"))
+                return
 
-            self.has_written.add(path)
+            # Stream every result through one buffered handle instead of rewriting the file per result
+            with BufferedLineWriter() as writer:
+                for line in self.get_text_result_lines(ordered_keys):
+                    writer.write_line(path, line)
 
-        if(path in self.has_written):
-            print(f"  Saved analysis text results file \"{path}\"")
+    def write_csv(self, path, df: pd.DataFrame, identifier):
+        with span(path, "write", identifier=identifier):
+            if(self.manifest is not None):
+                # Encoded like to_csv(path) writes it, so unchanged results hash the same
+                self.manifest.write(path, df.to_csv(index=False).encode("utf-8"))
+            else:
+                df.to_csv(path, index=False)
 
-    def save_meta_analysis(self, identifier):
-        data_repo: DataRepository = self.prog_data.data_repo
+    def make_dir(self, path):
+        """ Make the directory if it doesn't exist, only touching the file system the first time a
+                path is seen this run. """
+        if(path in self.made_dirs):
+            return
 
-        result = data_repo.get_data(identifier)
-        
+        os.makedirs(path, exist_ok=True)
+        self.made_dirs.add(path)
+
+    def save_meta_analysis(self, identifier, result):
         readable_period = "Entire range"
 
         # Make sure the directory holding these results is there
         analysis_dir_path = os.path.join(self.base_path, f"{readable_period} analysis")
-        if(not os.path.exists(analysis_dir_path)):
-            os.mkdir(analysis_dir_path)
+        self.make_dir(analysis_dir_path)
 
         # Save as a DataFrame, meta analyses are always DataFrames
         path = os.path.join(analysis_dir_path, f"{identifier.analysis}.csv")
         print(f"  Saving analysis file \"{path}\"")
-        result.to_csv(path, index=False)
-
-        self.has_written.add(path)
\ No newline at end of file
+        self.writer.submit(path, self.write_csv, path, result, identifier)
\ No newline at end of file
@@ -0,0 +1,173 @@
+""" Delivery steps for the archives made by the ArchiveSaver. A delivery method is picked by the
+        "method" of the ArchiveSaver's delivery config section, plugins can add their own methods
+        with register_delivery_method.
+"""
+from abc import ABC, abstractmethod
+import base64
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+import os
+import secrets
+import smtplib
+import time
+
+from src.parameter_utils import ConfigurationException
+from src.program_data import ProgramData
+from src.utils.config_checker import verify_sections_exist
+from src.utils.timeutils import from_unix_ts, seconds_to_compact
+
+# The bytes of the archive read at a time, a multiple of 57 so every chunk encodes to whole 76
+#   character base64 lines
+DELIVERY_CHUNK_SIZE = 57*1024
+DEFAULT_SMTP_TIMEOUT = 60
+
+class ArchiveDelivery(ABC):
+    """ An ArchiveDelivery hands a finished archive to something outside of AutoMetrics, the
+            archive has to be streamed instead of read into memory. """
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    @classmethod
+    def verify_config(cls, config: dict):
+        """ Verify the delivery config section, raising a ConfigurationException if it's invalid. """
+        pass
+
+    @abstractmethod
+    def deliver(self, archive_path: str, prog_data: ProgramData):
+        """ Deliver the archive at archive_path. Raise an exception if it couldn't be delivered. """
+        pass
+
+_delivery_methods = {}
+
+def register_delivery_method(name: str, delivery_type: type):
+    """
+    Register an ArchiveDelivery under the method name used in ArchiveSaver's delivery config.
+
+    Raises:
+        ValueError: The type isn't an ArchiveDelivery, or the name is taken by another type.
+    """
+    if(not isinstance(delivery_type, type) or not issubclass(delivery_type, ArchiveDelivery)):
+        raise ValueError(f"Can't register \"{delivery_type}\" as a delivery method, it is not a subclass of ArchiveDelivery.")
+    if(name in _delivery_methods and _delivery_methods[name] is not delivery_type):
+        raise ValueError(f"Can't register \"{delivery_type.__qualname__}\" as \"{name}\", the delivery method is already registered to {_delivery_methods[name]}.")
+
+    _delivery_methods[name] = delivery_type
+
+def get_delivery_type(config: dict) -> type:
+    """ Get the ArchiveDelivery type of a delivery config section, see register_delivery_method. """
+    if(not isinstance(config, dict) or "method" not in config):
+        raise ConfigurationException("The ArchiveSaver delivery section needs a \"method\".")
+    if(config["method"] not in _delivery_methods):
+        raise ConfigurationException(f"Unknown delivery method \"{config["method"]}\", the choices are: {", ".join(_delivery_methods.keys())}")
+    return _delivery_methods[config["method"]]
+
+def create_delivery(config: dict) -> ArchiveDelivery:
+    return get_delivery_type(config)(config)
+
+class SmtpDelivery(ArchiveDelivery):
+    """
+    Emails the archive as an attachment. The message is written to the SMTP connection in chunks,
+        base64 encoding the archive as it's read, so the archive is never held in memory.
+
+    Config:
+        host (str): The SMTP server.
+        port (int): Defaults to 465 with ssl, 25 otherwise.
+        from (str): The sender address.
+        to (str | list[str]): The recipient addresses.
+        subject (str): Defaults to "AutoMetrics results from <start time>".
+        ssl (bool): Connect with SMTP over SSL.
+        starttls (bool): Upgrade the connection with STARTTLS.
+        username (str): Log in as username, with the password in the password-env environment
+            variable.
+        password-env (str): The environment variable holding the password.
+        timeout (int): The connection timeout in seconds.
+    """
+
+    @classmethod
+    def verify_config(cls, config: dict):
+        verify_sections_exist(config, "ArchiveSaver.delivery", required_sections={"method", "host", "from", "to"}, optional_sections={"port", "subject", "ssl", "starttls", "username", "password-env", "timeout"})
+
+        if(config.get("ssl", False) and config.get("starttls", False)):
+            raise ConfigurationException("SMTP delivery can't use both \"ssl\" and \"starttls\".")
+        if(("username" in config) != ("password-env" in config)):
+            raise ConfigurationException("SMTP delivery needs both \"username\" and \"password-env\" to log in.")
+
+    def get_recipients(self) -> list[str]:
+        recipients = self.config["to"]
+        return [recipients] if isinstance(recipients, str) else list(recipients)
+
+    def deliver(self, archive_path: str, prog_data: ProgramData):
+        config = self.config
+        recipients = self.get_recipients()
+        use_ssl = config.get("ssl", False)
+        smtp_type = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+        port = config.get("port", 465 if use_ssl else 25)
+
+        print(f"  Emailing archive \"{archive_path}\" to {", ".join(recipients)} through {config["host"]}:{port}")
+        with smtp_type(config["host"], port, timeout=config.get("timeout", DEFAULT_SMTP_TIMEOUT)) as smtp:
+            if(config.get("starttls", False)):
+                smtp.starttls()
+            if("username" in config):
+                smtp.login(config["username"], os.environ[config["password-env"]])
+
+            # sendmail() needs the whole message, so the SMTP transaction is run step by step instead
+            smtp.ehlo_or_helo_if_needed()
+            code, response = smtp.mail(config["from"])
+            if(code != 250):
+                raise smtplib.SMTPSenderRefused(code, response, config["from"])
+
+            for recipient in recipients:
+                code, response = smtp.rcpt(recipient)
+                if(code not in (250, 251)):
+                    raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+
+            code, response = smtp.docmd("DATA")
+            if(code != 354):
+                raise smtplib.SMTPDataError(code, response)
+
+            for chunk in self.get_message_chunks(archive_path, prog_data, recipients):
+                smtp.send(chunk)
+            smtp.send(b".\r\n")
+
+            code, response = smtp.getreply()
+            if(code != 250):
+                raise smtplib.SMTPDataError(code, response)
+
+    def get_message_chunks(self, archive_path: str, prog_data: ProgramData, recipients: list[str]):
+        """ Yield the message as CRLF terminated bytes. Every part is base64 encoded, so no line
+                starts with a "." and the message doesn't need dot stuffing. """
+        start_time_formatted = from_unix_ts(prog_data.program_start_ts)
+        runtime_formatted = seconds_to_compact(time.time() - prog_data.program_start_ts)
+        boundary = f"=={secrets.token_hex(16)}"
+
+        headers = {
+            "From": self.config["from"],
+            "To": ", ".join(recipients),
+            "Subject": self.config.get("subject", f"AutoMetrics results from {start_time_formatted}"),
+            "Date": formatdate(localtime=True),
+            "Message-ID": make_msgid(),
+            "MIME-Version": "1.0",
+            "Content-Type": f"multipart/mixed; boundary=\"{boundary}\""
+        }
+        # Folded and encoded one by one, a Message would write its own multipart body
+        yield ("".join([SMTP.fold(name, value) for name, value in headers.items()]) + "\r\n").encode("ascii")
+
+        text = f"Results generated from configuration {prog_data.args.config} on {start_time_formatted}, taking {runtime_formatted}."
+        yield (f"--{boundary}\r\n"
+               f"Content-Type: text/plain; charset=\"utf-8\"\r\n"
+               f"Content-Transfer-Encoding: base64\r\n\r\n").encode("ascii")
+        yield base64.encodebytes(text.encode("utf-8")).replace(b"\n", b"\r\n")
+
+        filename = os.path.basename(archive_path)
+        yield (f"--{boundary}\r\n"
+               f"Content-Type: application/octet-stream; name=\"{filename}\"\r\n"
+               f"Content-Transfer-Encoding: base64\r\n"
+               f"Content-Disposition: attachment; filename=\"{filename}\"\r\n\r\n").encode("ascii")
+        with open(archive_path, "rb") as file:
+            while(chunk := file.read(DELIVERY_CHUNK_SIZE)):
+                yield base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+        yield f"--{boundary}--\r\n".encode("ascii")
+
+register_delivery_method("smtp", SmtpDelivery)
@@ -0,0 +1,119 @@
+import os
+import tarfile
+import zipfile
+
+try:
+    import zstandard
+    zstandard_available = True
+except ImportError:
+    zstandard_available = False
+
+from src.builtin_plugins.archive_delivery import create_delivery, get_delivery_type
+from src.parameter_utils import ConfigurationException
+from src.plugin_mgmt.plugins import Saver
+from src.program_data import ProgramData
+from src.utils.config_checker import verify_sections_exist
+from src.utils.content_manifest import format_bytes
+from src.utils.fileutils import open_atomic
+from src.utils.tracing import span
+
+ARCHIVE_FORMAT_CHOICES = ['zip', 'tar.zst']
+DEFAULT_ARCHIVE_NAME = "results"
+DEFAULT_COMPRESSION_LEVELS = {"zip": 6, "tar.zst": 3}
+# The tar stream's block size, members are read into the archive in chunks of it
+ARCHIVE_CHUNK_SIZE = 1024*1024
+# Members with these extensions are already compressed, zip archives store them as they are
+COMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".parquet", ".feather", ".xlsx", ".zip", ".gz", ".zst"}
+
+def get_archive_members(saved_files: list[str], archive_path: str) -> list[tuple[str, str]]:
+    """
+    Get the files to archive from a saved file list, each existing file once in the order it was
+        saved. The archive itself is left out.
+
+    Returns:
+        list[tuple[str, str]]: The (path, archive name) of each member, archive names are relative
+            to the directory holding all of the files.
+    """
+    archive_path = os.path.abspath(archive_path)
+    paths = []
+    for path in dict.fromkeys([os.path.abspath(path) for path in saved_files]):
+        if(path != archive_path and os.path.isfile(path)):
+            paths.append(path)
+
+    if(len(paths) == 0):
+        return []
+
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [(path, os.path.relpath(path, root)) for path in paths]
+
+class ArchiveSaver(Saver):
+    """ The ArchiveSaver archives the files saved by the savers before it in saving.run into one
+            zip or tar.zst file, then optionally delivers the archive, see archive_delivery.py.
+            Members are read in chunks and the archive is streamed to disk, so neither is held in
+            memory. zip archives store already compressed members like PNGs as they are, tar.zst
+            archives are compressed by compression-workers threads and need zstandard.
+        The archive only holds files from this run, run it after the savers it should archive.
+    """
+
+    def verify_config_section(self, config_section):
+        if(config_section is None):
+            return True
+
+        verify_sections_exist(config_section, "ArchiveSaver", required_sections=set(), optional_sections={"format", "filename", "compression-level", "compression-workers", "delivery", "addtl-base"})
+
+        archive_format = config_section.get("format", ARCHIVE_FORMAT_CHOICES[0])
+        if(archive_format not in ARCHIVE_FORMAT_CHOICES):
+            raise ConfigurationException(f"Unknown ArchiveSaver format \"{archive_format}\", the choices are: {", ".join(ARCHIVE_FORMAT_CHOICES)}")
+        if(archive_format == "tar.zst" and not zstandard_available):
+            raise ConfigurationException("Can't write tar.zst archives, zstandard is not installed.")
+
+        if("compression-workers" in config_section and (not isinstance(config_section["compression-workers"], int) or config_section["compression-workers"] < 1)):
+            raise ConfigurationException("ArchiveSaver \"compression-workers\" has to be a positive integer.")
+
+        if("delivery" in config_section):
+            get_delivery_type(config_section["delivery"]).verify_config(config_section["delivery"])
+
+        return True
+
+    def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        if(config_section is None):
+            config_section = {}
+
+        archive_format = config_section.get("format", ARCHIVE_FORMAT_CHOICES[0])
+        if(archive_format == "tar.zst" and not zstandard_available):
+            raise ConfigurationException("Can't write tar.zst archives, zstandard is not installed.")
+        compression_level = config_section.get("compression-level", DEFAULT_COMPRESSION_LEVELS[archive_format])
+
+        archive_path = os.path.join(base_path, config_section.get("filename", f"{DEFAULT_ARCHIVE_NAME}.{archive_format}"))
+        members = get_archive_members(getattr(prog_data, "saved_files", []), archive_path)
+        if(len(members) == 0):
+            print("  No saved files to archive.")
+            return []
+
+        os.makedirs(base_path, exist_ok=True)
+        with span(archive_path, "write", members=len(members)), open_atomic(archive_path) as file:
+            if(archive_format == "zip"):
+                self.write_zip(file, members, compression_level)
+            else:
+                self.write_tar_zst(file, members, compression_level, config_section.get("compression-workers", os.cpu_count()))
+        print(f"  Saved archive \"{archive_path}\" with {len(members)} file(s) ({format_bytes(os.path.getsize(archive_path))})")
+
+        if("delivery" in config_section):
+            with span(archive_path, "deliver", method=config_section["delivery"]["method"]):
+                create_delivery(config_section["delivery"]).deliver(archive_path, prog_data)
+
+        return [archive_path]
+
+    def write_zip(self, file, members: list[tuple[str, str]], compression_level: int):
+        with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compression_level) as archive:
+            for path, arcname in members:
+                # write() copies the member into the archive in chunks
+                compressed = os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS
+                archive.write(path, arcname, compress_type=zipfile.ZIP_STORED if compressed else zipfile.ZIP_DEFLATED)
+
+    def write_tar_zst(self, file, members: list[tuple[str, str]], compression_level: int, workers: int):
+        compressor = zstandard.ZstdCompressor(level=compression_level, threads=workers)
+        # The tar stream is written straight into the compressor, which compresses on its own threads
+        with compressor.stream_writer(file, closefd=False) as writer, tarfile.open(fileobj=writer, mode="w|", bufsize=ARCHIVE_CHUNK_SIZE) as archive:
+            for path, arcname in members:
+                archive.add(path, arcname, recursive=False)
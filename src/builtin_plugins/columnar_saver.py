@@ -0,0 +1,264 @@
+from collections.abc import Iterable
+import io
+import json
+import numbers
+import os
+import numpy as np
+import pandas as pd
+
+from src.data.compaction import pyarrow_available
+from src.data.data_repository import DataRepository
+from src.data.filters import *
+from src.parameter_utils import ConfigurationException
+from src.plugin_mgmt.plugins import Saver
+from src.program_data import ProgramData
+from src.utils.config_checker import verify_sections_exist
+from src.utils.content_manifest import ContentManifest, is_incremental
+from src.utils.fileutils import DEFAULT_WRITE_WORKERS, ParallelFileWriter, write_bytes_atomic
+from src.utils.tracing import span
+
+COLUMNAR_FORMAT_CHOICES = ['parquet', 'feather']
+COLUMNAR_FORMAT_EXTENSIONS = {"parquet": "parquet", "feather": "feather"}
+# Parquet accepts snappy, gzip, brotli, lz4, zstd, and none, Feather accepts lz4, zstd, and uncompressed
+DEFAULT_COLUMNAR_COMPRESSION = "zstd"
+COLUMNAR_MANIFEST_FILENAME = "manifest.json"
+SCALARS_TABLE_NAME = "scalars"
+# The partition of results that don't have a base period, like meta and aggregate analyses
+ENTIRE_RANGE_PARTITION = "Entire range"
+
+def get_partition_name(identifier: AnalysisIdentifier):
+    """ Get the file name, without extension, of a DataFrame result inside of its analysis'
+            directory. The base period's fs_str(), followed by the key of keyed identifiers. """
+    base = identifier.find_base()
+    name = base.fs_str() if base is not None else ENTIRE_RANGE_PARTITION
+
+    key = getattr(identifier, "key", None)
+    if(key is not None):
+        name = f"{name}__{str(key).replace("/", "_")}"
+    return name
+
+def get_partition_names(identifiers: list[AnalysisIdentifier]) -> dict:
+    """
+    Get the file name of each DataFrame result, see get_partition_name. Results of one analysis
+        that share a base period and key, like an analysis of two other analyses' results, are
+        named by their whole identifier instead. AnalysisIdentifier.fs_str() can't tell them apart,
+        it only keeps the analysis and the base period.
+
+    Args:
+        identifiers (list[AnalysisIdentifier]): The identifiers of the DataFrame results.
+    Returns:
+        dict[AnalysisIdentifier, str]: The file name of each identifier, without extension.
+    Raises:
+        ValueError: Two results of an analysis would still have the same name.
+    """
+    partitions = {}
+    for identifier in identifiers:
+        partitions.setdefault((identifier.analysis, get_partition_name(identifier)), []).append(identifier)
+
+    names = {}
+    for (analysis, name), partition_identifiers in partitions.items():
+        if(len(partition_identifiers) == 1):
+            names[partition_identifiers[0]] = name
+            continue
+
+        for identifier in partition_identifiers:
+            names[identifier] = str(identifier).replace("/", "_")
+
+    taken = {}
+    for identifier, name in names.items():
+        other = taken.setdefault((identifier.analysis, name), identifier)
+        if(other is not identifier):
+            raise ValueError(f"Can't save \"{identifier}\" and \"{other}\" as columnar files, they would both be named \"{name}\".")
+
+    return names
+
+class ColumnarSaver(Saver):
+    """ The ColumnarSaver saves AnalysisIdentifiers like the AnalysisSaver, but as compressed
+            Parquet or Feather files that load faster than CSVs. DataFrame results are partitioned
+            into <analysis>/<base period>.<format> files, or <analysis>/<identifier>.<format> files
+            when several results of an analysis share a base period. Every other result becomes a
+            row of one scalars table, and manifest.json maps each identifier to the file holding it.
+        Needs pyarrow. With saving.incremental set, files whose content didn't change since the
+            last run aren't written again.
+    """
+
+    CONCURRENT = True
+
+    def verify_config_section(self, config_section):
+        if(not pyarrow_available):
+            raise ConfigurationException("ColumnarSaver needs pyarrow, it is not installed.")
+
+        if(config_section is None):
+            return True
+
+        verify_sections_exist(config_section, "ColumnarSaver", required_sections=set(), optional_sections={"format", "compression", "whitelist", "write-workers", "addtl-base"})
+
+        if("format" in config_section and config_section["format"] not in COLUMNAR_FORMAT_CHOICES):
+            raise ConfigurationException(f"Unknown ColumnarSaver format \"{config_section["format"]}\", the choices are: {", ".join(COLUMNAR_FORMAT_CHOICES)}")
+
+        if("whitelist" in config_section and not isinstance(config_section["whitelist"], list)):
+            raise ConfigurationException("The config section for \"whitelist\" should be in the form of a list.")
+
+        if("write-workers" in config_section and (not isinstance(config_section["write-workers"], int) or config_section["write-workers"] < 1)):
+            raise ConfigurationException("ColumnarSaver \"write-workers\" has to be a positive integer.")
+
+        return True
+
+    def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        if(not pyarrow_available):
+            raise ConfigurationException("ColumnarSaver needs pyarrow, it is not installed.")
+
+        data_repo: DataRepository = prog_data.data_repo
+
+        self.format = COLUMNAR_FORMAT_CHOICES[0]
+        self.compression = DEFAULT_COLUMNAR_COMPRESSION
+        write_workers = DEFAULT_WRITE_WORKERS
+        if(config_section is not None):
+            self.format = config_section.get("format", self.format)
+            self.compression = config_section.get("compression", self.compression)
+            write_workers = config_section.get("write-workers", write_workers)
+        self.extension = COLUMNAR_FORMAT_EXTENSIONS[self.format]
+
+        self.base_path = base_path
+        os.makedirs(self.base_path, exist_ok=True)
+        self.content_manifest = ContentManifest(self.base_path, "ColumnarSaver") if is_incremental(prog_data) else None
+
+        identifiers = []
+        if(config_section is not None and "whitelist" in config_section):
+            for whitelisted_analysis in config_section["whitelist"]:
+                identifiers.extend(data_repo.filter_ids(filter_analyis_type(whitelisted_analysis)))
+        else:
+            identifiers = data_repo.filter_ids(filter_type(AnalysisIdentifier))
+
+        # The manifest entries of the DataFrame results and the rows of the scalars table
+        self.manifest_files = []
+        self.scalar_rows = []
+        self.scalars_entry = None
+        self.made_dirs = set()
+
+        with ParallelFileWriter(write_workers) as self.writer:
+            frames = {}
+            for identifier in identifiers:
+                identifier: AnalysisIdentifier = identifier
+                result = data_repo.get_data_view(identifier)
+
+                # Only save results that exist
+                if(result is None):
+                    continue
+
+                if(isinstance(result, pd.DataFrame)):
+                    frames[identifier] = result
+                else:
+                    self.add_scalar(identifier, result)
+
+            # Named once every DataFrame result is known, so colliding names can be told apart
+            partition_names = get_partition_names(list(frames.keys()))
+            for identifier, df in frames.items():
+                self.save_frame(identifier, df, partition_names[identifier])
+
+            self.save_scalars()
+            saved_files = self.writer.wait()
+
+        manifest_path = os.path.join(self.base_path, COLUMNAR_MANIFEST_FILENAME)
+        self.save_manifest(manifest_path)
+        saved_files.append(manifest_path)
+
+        if(self.content_manifest is not None):
+            self.content_manifest.save()
+            self.content_manifest.print_summary()
+
+        return saved_files
+
+    def get_write_stats(self):
+        if(getattr(self, "content_manifest", None) is None):
+            return None
+        return self.content_manifest.get_stats()
+
+    def save_frame(self, identifier: AnalysisIdentifier, df: pd.DataFrame, partition_name: str):
+        """ Write a DataFrame result to its analysis' directory as partition_name, see
+                get_partition_names, and add it to the manifest. """
+        analysis_dir_path = os.path.join(self.base_path, identifier.analysis)
+        if(analysis_dir_path not in self.made_dirs):
+            os.makedirs(analysis_dir_path, exist_ok=True)
+            self.made_dirs.add(analysis_dir_path)
+
+        path = os.path.join(analysis_dir_path, f"{partition_name}.{self.extension}")
+        print(f"  Saving columnar file \"{path}\"")
+        self.writer.submit(path, self.write_table, path, df, identifier)
+
+        base = identifier.find_base()
+        self.manifest_files.append({
+            "identifier": str(identifier),
+            "analysis": identifier.analysis,
+            "base": str(base) if base is not None else None,
+            "key": getattr(identifier, "key", None),
+            "path": os.path.relpath(path, self.base_path),
+            "rows": len(df)
+        })
+
+    def add_scalar(self, identifier: AnalysisIdentifier, result):
+        """ Add a non DataFrame result as a row of the scalars table. Numbers are kept in the value
+                column, every result is also written to the text column like text_results.txt. """
+        if(isinstance(result, Iterable) and not isinstance(result, str)):
+            text = ", ".join(map(str, result))
+        else:
+            text = str(result)
+
+        base = identifier.find_base()
+        self.scalar_rows.append({
+            "identifier": str(identifier),
+            "analysis": identifier.analysis,
+            "base": str(base) if base is not None else None,
+            "key": getattr(identifier, "key", None),
+            "start_ts": getattr(base, "start_ts", None),
+            "end_ts": getattr(base, "end_ts", None),
+            "value": float(result) if isinstance(result, numbers.Real) else np.nan,
+            "text": text
+        })
+
+    def save_scalars(self):
+        if(len(self.scalar_rows) == 0):
+            return
+
+        scalars_df = pd.DataFrame(self.scalar_rows, columns=["identifier", "analysis", "base", "key", "start_ts", "end_ts", "value", "text"])
+        scalars_df = scalars_df.astype({
+            "identifier": "string", "analysis": "category", "base": "string", "key": "string",
+            "start_ts": "Int64", "end_ts": "Int64", "value": "float64", "text": "string"
+        })
+        # Ordered like text_results.txt, by period and then analysis
+        scalars_df = scalars_df.sort_values(["start_ts", "base", "analysis", "identifier"], na_position="first", kind="stable", ignore_index=True)
+
+        path = os.path.join(self.base_path, f"{SCALARS_TABLE_NAME}.{self.extension}")
+        print(f"  Saving columnar scalars file \"{path}\"")
+        self.writer.submit(path, self.write_table, path, scalars_df, SCALARS_TABLE_NAME)
+        self.scalars_entry = {"path": os.path.relpath(path, self.base_path), "rows": len(scalars_df)}
+
+    def write_table(self, path, df: pd.DataFrame, identifier):
+        # Both formats need string column names, and Feather needs the default index
+        if(not all([isinstance(column, str) for column in df.columns])):
+            df = df.rename(columns=str)
+
+        with span(path, "write", identifier=identifier):
+            # Encoded in memory first when only changed files are written
+            out = io.BytesIO() if self.content_manifest is not None else path
+            if(self.format == "parquet"):
+                df.to_parquet(out, index=False, compression=self.compression)
+            else:
+                df.reset_index(drop=True).to_feather(out, compression=self.compression)
+
+            if(self.content_manifest is not None):
+                self.content_manifest.write(path, out.getvalue())
+
+    def save_manifest(self, path):
+        manifest = {
+            "format": self.format,
+            "compression": self.compression,
+            "files": self.manifest_files,
+            "scalars": self.scalars_entry
+        }
+        data = json.dumps(manifest, indent=2, default=str).encode("utf-8")
+        with span(path, "write"):
+            if(self.content_manifest is not None):
+                self.content_manifest.write(path, data)
+            else:
+                write_bytes_atomic(path, data)
@@ -16,7 +16,7 @@ from src.utils.timeutils import from_unix_ts, seconds_to_compact
 
 warnings.warn(
     "EmailSaver is deprecated and should not be used from the master branch. "
-    "Move it to a project-specific plugin before enabling it again.",
+    "Use ArchiveSaver with smtp delivery, or move it to a project-specific plugin before enabling it again.",
     DeprecationWarning,
     stacklevel=2,
 )
@@ -0,0 +1,228 @@
+from collections.abc import Iterable
+from itertools import islice
+import numbers
+import os
+import re
+import pandas as pd
+import xlsxwriter
+
+from src.data.data_repository import DataRepository
+from src.data.filters import *
+from src.parameter_utils import ConfigurationException
+from src.plugin_mgmt.plugins import Saver
+from src.program_data import ProgramData
+from src.utils.config_checker import verify_sections_exist
+from src.utils.tracing import span
+
+DEFAULT_WORKBOOK_FILENAME = "analyses.xlsx"
+SCALARS_SHEET_NAME = "Scalar results"
+SOURCE_COLUMN_NAME = "Source"
+# Excel's sheet name and worksheet size limits
+EXCEL_SHEET_NAME_LENGTH = 31
+EXCEL_MAX_ROWS = 1048576
+INVALID_SHEET_NAME_CHARACTERS = re.compile(r"[\[\]:*?/\\]")
+# Day 0 of Excel's serial dates, correct for dates after February 1900
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+DATE_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+def get_sheet_name(name: str, used_names: set[str]):
+    """
+    Make a valid, unique Excel sheet name. Characters Excel doesn't allow are replaced with _, the
+        name is cut to 31 characters, and names already used (ignoring case) get a numbered suffix.
+
+    Args:
+        name (str): The wanted sheet name.
+        used_names (set[str]): The lowercase names of the workbook's sheets, the returned name is
+            added to it.
+    Returns:
+        str: The sheet name.
+    """
+    name = INVALID_SHEET_NAME_CHARACTERS.sub("_", str(name)).strip("'")
+    if(len(name) == 0):
+        name = "Sheet"
+    # History is reserved by Excel
+    if(name.lower() == "history"):
+        name = f"{name}_"
+
+    sheet_name = name[:EXCEL_SHEET_NAME_LENGTH].rstrip("'")
+    suffix_number = 2
+    while(sheet_name.lower() in used_names):
+        suffix = f" ({suffix_number})"
+        sheet_name = name[:EXCEL_SHEET_NAME_LENGTH-len(suffix)].rstrip("'") + suffix
+        suffix_number += 1
+
+    used_names.add(sheet_name.lower())
+    return sheet_name
+
+def get_column_cells(series: pd.Series) -> tuple[list, bool]:
+    """
+    Get a column's cells as Python values from its NumPy array, missing values become None so they
+        aren't written. Datetimes are converted to Excel serial dates in one NumPy pass instead of
+        per cell by xlsxwriter, timezone aware datetimes keep their local time.
+
+    Returns:
+        tuple[list, bool]: The cells, and whether they're serial dates that need a date format.
+    """
+    if(pd.api.types.is_datetime64_any_dtype(series.dtype)):
+        if(series.dt.tz is not None):
+            series = series.dt.tz_localize(None)
+        serial_dates = (series - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return serial_dates.to_numpy(dtype=object, na_value=None).tolist(), True
+
+    return series.to_numpy(dtype=object, na_value=None).tolist(), False
+
+class ExcelSaver(Saver):
+    """ The ExcelSaver writes the DataFrame results of AnalysisIdentifiers into one Excel workbook.
+            Per period analyses are stacked into one sheet per analysis with a Source column,
+            keyed results like MetaAnalysis tables get a sheet per key, and scalar results share
+            one sheet.
+        The workbook is written in xlsxwriter's constant memory mode, every row is streamed to
+            disk as it's written, so workbooks with hundreds of sheets aren't held in memory.
+    """
+
+    CONCURRENT = True
+
+    def verify_config_section(self, config_section):
+        if(config_section is None):
+            return True
+
+        verify_sections_exist(config_section, "ExcelSaver", required_sections=set(), optional_sections={"filename", "whitelist", "addtl-base"})
+
+        if("filename" in config_section and not str(config_section["filename"]).endswith(".xlsx")):
+            raise ConfigurationException("ExcelSaver \"filename\" has to end with .xlsx")
+
+        if("whitelist" in config_section and not isinstance(config_section["whitelist"], list)):
+            raise ConfigurationException("The config section for \"whitelist\" should be in the form of a list.")
+
+        return True
+
+    def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        data_repo: DataRepository = prog_data.data_repo
+
+        filename = DEFAULT_WORKBOOK_FILENAME
+        if(config_section is not None):
+            filename = config_section.get("filename", filename)
+
+        identifiers = []
+        if(config_section is not None and "whitelist" in config_section):
+            for whitelisted_analysis in config_section["whitelist"]:
+                identifiers.extend(data_repo.filter_ids(filter_analyis_type(whitelisted_analysis)))
+        else:
+            identifiers = data_repo.filter_ids(filter_type(AnalysisIdentifier))
+
+        # The tables of each sheet by the sheet's unsanitized name, as (source, identifier). The
+        #   source is None for sheets holding a single table.
+        sheets = {}
+        scalars = []
+        for identifier in identifiers:
+            identifier: AnalysisIdentifier = identifier
+            result = data_repo.get_data_view(identifier)
+            if(result is None):
+                continue
+
+            base = identifier.find_base()
+            key = getattr(identifier, "key", None)
+            if(not isinstance(result, pd.DataFrame)):
+                scalars.append((base, identifier, result))
+            elif(key is not None):
+                sheets[f"{identifier.analysis} {key}"] = [(None, identifier)]
+            elif(base is None):
+                sheets[identifier.analysis] = [(None, identifier)]
+            else:
+                sheets.setdefault(identifier.analysis, []).append((base, identifier))
+
+        if(len(sheets) == 0 and len(scalars) == 0):
+            return []
+
+        os.makedirs(base_path, exist_ok=True)
+        path = os.path.join(base_path, filename)
+        print(f"  Saving Excel workbook \"{path}\" with {len(sheets) + (len(scalars) > 0)} sheet(s)")
+
+        with span(path, "write", sheets=len(sheets)):
+            workbook = xlsxwriter.Workbook(path, {
+                "constant_memory": True,
+                "default_date_format": DATE_FORMAT,
+                "remove_timezone": True,
+                "nan_inf_to_errors": True
+            })
+            self.header_format = workbook.add_format({"bold": True})
+            self.date_format = workbook.add_format({"num_format": DATE_FORMAT})
+            used_names = {SCALARS_SHEET_NAME.lower()}
+
+            try:
+                for name, tables in sheets.items():
+                    worksheet = workbook.add_worksheet(get_sheet_name(name, used_names))
+                    # Stack the periods in time order, like text_results.txt
+                    tables = sorted(tables, key=lambda table: (getattr(table[0], "start_ts", -float('inf')), str(table[0])))
+                    self.write_tables(worksheet, data_repo, tables)
+
+                if(len(scalars) > 0):
+                    self.write_scalars(workbook.add_worksheet(SCALARS_SHEET_NAME), scalars)
+            finally:
+                workbook.close()
+
+        return [path]
+
+    def write_tables(self, worksheet, data_repo: DataRepository, tables: list[tuple]):
+        """ Write the tables one under another, with a header of every column in the order they
+                first appear and a leading Source column when the tables have a source. """
+        frames = [(source, data_repo.get_data_view(identifier)) for source, identifier in tables]
+        has_source = any([source is not None for source, _ in frames])
+
+        header = [SOURCE_COLUMN_NAME] if has_source else []
+        for _, df in frames:
+            header.extend([str(column) for column in df.columns if str(column) not in header])
+        column_positions = {column: position for position, column in enumerate(header)}
+
+        worksheet.write_row(0, 0, header, self.header_format)
+        worksheet.freeze_panes(1, 0)
+
+        row_number = 1
+        for source, df in frames:
+            columns = [[None]*len(df) for _ in header]
+            # Each column's write method and format, numbers and dates skip xlsxwriter's per cell type checks
+            writers = [(worksheet.write, None) for _ in header]
+            if(has_source):
+                columns[0] = [str(source)]*len(df)
+            for position in range(len(df.columns)):
+                series = df.iloc[:, position]
+                column_number = column_positions[str(df.columns[position])]
+                columns[column_number], is_date = get_column_cells(series)
+                if(is_date):
+                    writers[column_number] = (worksheet.write_number, self.date_format)
+                elif(pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)):
+                    writers[column_number] = (worksheet.write_number, None)
+                elif(isinstance(series.dtype, pd.StringDtype)):
+                    writers[column_number] = (worksheet.write_string, None)
+
+            rows_left = EXCEL_MAX_ROWS - row_number
+            if(len(df) > rows_left):
+                print(f"  WARNING: Sheet \"{worksheet.name}\" reached Excel's {EXCEL_MAX_ROWS} row limit, the remaining rows were not written.")
+
+            # Constant memory mode needs the rows of a sheet in order, each row is flushed when the next starts
+            for row in islice(zip(*columns), rows_left):
+                for column_number, cell in enumerate(row):
+                    if(cell is not None):
+                        write, cell_format = writers[column_number]
+                        write(row_number, column_number, cell, cell_format)
+                row_number += 1
+
+            if(row_number >= EXCEL_MAX_ROWS):
+                break
+
+    def write_scalars(self, worksheet, scalars: list[tuple]):
+        """ Write the scalar results as Source, Analysis, Value rows ordered like text_results.txt. """
+        worksheet.write_row(0, 0, [SOURCE_COLUMN_NAME, "Analysis", "Value"], self.header_format)
+        worksheet.freeze_panes(1, 0)
+
+        scalars = sorted(scalars, key=lambda scalar: (getattr(scalar[0], "start_ts", -float('inf')), str(scalar[0]), scalar[1].analysis, str(scalar[1])))
+        for row_number, (base, identifier, result) in enumerate(scalars[:EXCEL_MAX_ROWS-1], start=1):
+            if(isinstance(result, numbers.Real)):
+                value = result
+            elif(isinstance(result, Iterable) and not isinstance(result, str)):
+                value = ", ".join(map(str, result))
+            else:
+                value = str(result)
+
+            source = str(base) if base is not None else str(identifier)
+            worksheet.write_row(row_number, 0, [source, identifier.analysis, value])
@@ -6,9 +6,10 @@ import numpy as np
 from src.data.data_repository import DataRepository
 from src.data.filters import filter_type, filter_analyis_type
 from src.data.identifier import Identifier, MetaAnalysisIdentifier, TimeStampIdentifier
-from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin
+from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin, AnalysisPlan
 from src.utils.datautils import resolve_analysis
 from src.utils.timeutils import get_range_printable
+from src.utils.tracing import span
 
 import src.builtin_plugins.meta_analysis_driver as pkg
 
@@ -23,6 +24,12 @@ class MetaAnalysis(Analysis):
     The key_method is a callable that takes the identifier and returns some key value from it, this
         key value is used to perform meta analyses on only the identifiers that have matching keys.
     """
+    long_format: bool = False
+    """
+    Store every key in one table with a categorical Key column, under a single identifier with
+        a None key, instead of one table and identifier per key. Use get_meta_key_frame or
+        get_meta_key_frames to read per key tables from it.
+    """
 
 class MetaAnalysisDriver(AnalysisDriverPlugin):
     SERVED_TYPE = pkg.MetaAnalysis
@@ -52,39 +59,151 @@ class MetaAnalysisDriver(AnalysisDriverPlugin):
         if(len(timestamps) == 0):
             raise Exception(f"Failed to run meta analysis, there were no Timestamps loaded. Is !!IngestTimeline!! configured?")
 
-        for unique_key in unique_keys:
+        periods = [(id.start_ts, id.end_ts) for id in timestamps]
+        readable_periods = [get_range_printable(start_ts, end_ts, 3600) for start_ts, end_ts in periods]
 
-            out_df = pd.DataFrame(columns=(["Period"]+sub_analyses))
+        # Read each sub analysis' scalar results in one pass, None if it has results that aren't
+        #   scalars, those are resolved one period at a time.
+        sub_analysis_vectors = {sub_analysis: data_repo.get_scalar_vectors(sub_analysis, periods, key_method) for sub_analysis in sub_analyses}
 
-            for identifier in timestamps:
-                start_ts = identifier.start_ts
-                end_ts = identifier.end_ts
+        if(analysis.long_format):
+            keys = sorted(unique_keys, key=str)
+            with span(analysis.name, "method", analysis=analysis.name, periods=len(periods), keys=len(keys)):
+                out_df = build_long_table(data_repo, sub_analyses, sub_analysis_vectors, keys, periods, readable_periods, key_method)
 
-                readable_period = get_range_printable(start_ts, end_ts, 3600)
-                row = [readable_period]
+            metadata = {
+                "periods": list(periods),
+                "keys": keys,
+                "long_format": True
+            }
+            data_repo.add(MetaAnalysisIdentifier(None, analysis.name, None), out_df, metadata)
+            return
 
-                for sub_analysis in sub_analyses:
-                    analysis_id = resolve_analysis(data_repo, start_ts, end_ts, sub_analysis, key_method=key_method, unique_key=unique_key)
-                    if(analysis_id is None):
-                        row.append(0)
-                        continue
+        for unique_key in unique_keys:
+            with span(str(unique_key), "method", analysis=analysis.name, periods=len(timestamps)):
+                columns = [readable_periods]
 
-                    analysis_result = data_repo.get_data(analysis_id)
-                    
-                    if(not verify_result_for_meta(analysis_result)):
-                        row.append(0)
-                        continue
+                for sub_analysis in sub_analyses:
+                    vectors = sub_analysis_vectors[sub_analysis]
+                    if(vectors is None):
+                        columns.append(resolve_meta_column(data_repo, periods, sub_analysis, key_method, unique_key))
+                    elif(unique_key in vectors):
+                        values, found = vectors[unique_key]
+                        columns.append([value if is_found else 0 for value, is_found in zip(values.tolist(), found.tolist())])
+                    else:
+                        columns.append([0]*len(periods))
+
+                out_df = pd.DataFrame(list(zip(*columns)), columns=(["Period"]+sub_analyses))
+            
+                out_identifier = MetaAnalysisIdentifier(None, analysis.name, unique_key)
+                metadata = {
+                    "periods": list(periods)
+                }
 
-                    row.append(float(analysis_result))
+                data_repo.add(out_identifier, out_df, metadata)
 
-                out_df.loc[len(out_df)] = row
-            
-            out_identifier = MetaAnalysisIdentifier(None, analysis.name, unique_key)
-            metadata = {
-                "periods": [(id.start_ts, id.end_ts) for id in timestamps]
-            }
+    def explain_analysis(self, analysis: pkg.MetaAnalysis, plan_repo: DataRepository):
+        """ Each key builds a table with a row per period and a column per sub analysis, the cells
+                are read from the repository's scalar columns. """
+        sub_analyses = analysis.prereq_analyses
+        key_method = analysis.key_method
+        if(key_method is None):
+            key_method = lambda x: None
 
-            data_repo.add(out_identifier, out_df, metadata)
+        unique_keys = get_all_unique_keys(plan_repo, sub_analyses, key_method)
+        period_count = len(plan_repo.filter_ids(filter_type(TimeStampIdentifier, strict=True)))
+        input_count = sum([len(plan_repo.filter_ids(filter_analyis_type(sub_analysis))) for sub_analysis in sub_analyses])
+
+        outputs = [MetaAnalysisIdentifier(None, analysis.name, unique_key) for unique_key in unique_keys]
+        if(analysis.long_format):
+            outputs = [MetaAnalysisIdentifier(None, analysis.name, None)]
+
+        return AnalysisPlan(
+            inputs=input_count,
+            calls=len(unique_keys)*period_count*len(sub_analyses),
+            outputs=outputs,
+            work=f"{len(unique_keys)} key(s) x {period_count} period(s) x {len(sub_analyses)} sub analyses, read with one scalar column scan per sub analysis"
+        )
+
+def resolve_meta_column(data_repo: DataRepository, periods: list, sub_analysis: str, key_method, unique_key):
+    """ Get a sub analysis' values for each period by resolving each result on its own, used when
+            the sub analysis has results that aren't in the repository's scalar store. Periods
+            without a result are 0. """
+    column = []
+    for start_ts, end_ts in periods:
+        analysis_id = resolve_analysis(data_repo, start_ts, end_ts, sub_analysis, key_method=key_method, unique_key=unique_key)
+        if(analysis_id is None):
+            column.append(0)
+            continue
+
+        analysis_result = data_repo.get_data(analysis_id)
+
+        if(not verify_result_for_meta(analysis_result)):
+            column.append(0)
+            continue
+
+        column.append(float(analysis_result))
+
+    return column
+
+def build_long_table(data_repo: DataRepository, sub_analyses: list[str], sub_analysis_vectors: dict, keys: list, periods: list, readable_periods: list, key_method):
+    """ Build the long format table, a row per key and period with columns Key, Period, and a
+            column per sub analysis. Rows are grouped by key in the order of keys. """
+    period_count = len(periods)
+
+    # A None key has no category, it's stored as a missing value
+    categories = [key for key in keys if key is not None]
+    category_codes = {key: code for code, key in enumerate(categories)}
+    codes = np.repeat(np.array([category_codes.get(key, -1) for key in keys], dtype=np.int32), period_count)
+
+    out_columns = {
+        "Key": pd.Categorical.from_codes(codes, categories=categories),
+        "Period": np.tile(np.array(readable_periods, dtype=object), len(keys))
+    }
+
+    for sub_analysis in sub_analyses:
+        vectors = sub_analysis_vectors[sub_analysis]
+        key_columns = []
+        for key in keys:
+            if(vectors is None):
+                key_columns.append(np.array(resolve_meta_column(data_repo, periods, sub_analysis, key_method, key), dtype=np.float64))
+            elif(key in vectors):
+                values, found = vectors[key]
+                key_columns.append(np.where(found, values, 0.0))
+            else:
+                key_columns.append(np.zeros(period_count))
+
+        out_columns[sub_analysis] = np.concatenate(key_columns) if len(key_columns) > 0 else np.zeros(0)
+
+    return pd.DataFrame(out_columns)
+
+def get_meta_key_frame(long_df: pd.DataFrame, key) -> pd.DataFrame:
+    """
+    Get one key's table from a long format meta analysis table, in the same shape a per key meta
+        analysis stores: Period and a column per sub analysis.
+
+    Args:
+        long_df (pd.DataFrame): The long format table.
+        key: The key to select.
+    Returns:
+        pd.DataFrame: The key's rows without the Key column, empty if the key isn't in the table.
+    """
+    key_column = long_df["Key"]
+    if(key is None):
+        rows = key_column.isna()
+    elif(key in key_column.cat.categories):
+        rows = key_column.cat.codes == key_column.cat.categories.get_loc(key)
+    else:
+        rows = np.zeros(len(long_df), dtype=bool)
+
+    return long_df.loc[rows, long_df.columns[1:]].reset_index(drop=True)
+
+def get_meta_key_frames(long_df: pd.DataFrame) -> dict:
+    """ Split a long format meta analysis table into a table per key, see get_meta_key_frame. """
+    frames = {}
+    for key, key_df in long_df.groupby("Key", observed=True, sort=False, dropna=False):
+        frames[None if pd.isna(key) else key] = key_df.drop(columns="Key").reset_index(drop=True)
+    return frames
 
 def verify_result_for_meta(result):
     """ Verify if the object is valid to be used in a meta analysis- ensures it exists and is a single value. """
@@ -3,7 +3,8 @@ from typing import Callable, Any
 
 from src.data.data_repository import DataRepository
 from src.data.identifier import Identifier, AnalysisIdentifier
-from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin
+from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin, AnalysisPlan
+from src.utils.tracing import span
 
 import src.builtin_plugins.simple_analysis_driver as pkg
 
@@ -23,6 +24,7 @@ class SimpleAnalysisDriver(AnalysisDriverPlugin):
         The filter and method have specific signatures, see definitions in SimpleAnalysis class.
     """
     SERVED_TYPE = pkg.SimpleAnalysis
+    PERIOD_LOCAL = True
 
     def run_analysis(self, analysis: pkg.SimpleAnalysis, prog_data, config_section: dict):
         """ The SimpleAnalysisDriver will poll the DataRepository with the passed filter, then run 
@@ -41,8 +43,18 @@ class SimpleAnalysisDriver(AnalysisDriverPlugin):
             print(f"WARNING: Selected 0 identifiers for analysis \"{analysis.name}\"")
 
         for identifier in identifiers:
-            analysis_result = analysis.method(identifier, data_repo)
+            with span(str(identifier), "method", analysis=analysis.name):
+                analysis_result = analysis.method(identifier, data_repo)
 
             # Generate identifier and add to repository.
             analysis_identifier = AnalysisIdentifier(identifier, analysis.name)
-            data_repo.add(analysis_identifier, analysis_result)
\ No newline at end of file
+            data_repo.add(analysis_identifier, analysis_result)
+
+    def explain_analysis(self, analysis: pkg.SimpleAnalysis, plan_repo: DataRepository):
+        identifiers = plan_repo.filter_ids(analysis.filter)
+        return AnalysisPlan(
+            inputs=len(identifiers),
+            calls=len(identifiers),
+            outputs=[AnalysisIdentifier(identifier, analysis.name) for identifier in identifiers],
+            work=f"{len(identifiers)} method call(s)"
+        )
@@ -4,7 +4,8 @@ from typing import Callable
 from src.data.data_repository import DataRepository
 from src.data.filters import filter_analyis_type
 from src.data.identifier import Identifier
-from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin
+from src.plugin_mgmt.plugins import Analysis, AnalysisDriverPlugin, AnalysisPlan
+from src.utils.tracing import span
 
 import src.builtin_plugins.verification_analysis_driver as pkg
 
@@ -29,6 +30,7 @@ class VerificationDriver(AnalysisDriverPlugin):
         data is invalid.
     """
     SERVED_TYPE = pkg.VerificationAnalysis
+    PERIOD_LOCAL = True
 
     def run_analysis(self, analysis: pkg.VerificationAnalysis, prog_data, config_section: dict):
         """ The SimpleAnalysisDriver will poll the DataRepository for AnalysisIdentifiers with the 
@@ -44,5 +46,17 @@ class VerificationDriver(AnalysisDriverPlugin):
             return
 
         for identifier in identifiers:
-            if(not analysis.method(identifier, data_repo)):
-                raise VerificationException(f"Failed to verify analysis \"{analysis.name}\" for identifier {identifier}")
\ No newline at end of file
+            with span(str(identifier), "method", analysis=analysis.name):
+                verified = analysis.method(identifier, data_repo)
+
+            if(not verified):
+                raise VerificationException(f"Failed to verify analysis \"{analysis.name}\" for identifier {identifier}")
+
+    def explain_analysis(self, analysis: pkg.VerificationAnalysis, plan_repo: DataRepository):
+        identifiers = plan_repo.filter_ids(filter_analyis_type(analysis.targ_analysis))
+        return AnalysisPlan(
+            inputs=len(identifiers),
+            calls=len(identifiers),
+            outputs=[],
+            work=f"{len(identifiers)} verification call(s)"
+        )
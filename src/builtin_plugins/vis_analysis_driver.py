@@ -1,20 +1,51 @@
 import matplotlib.pyplot as plt
+import os
 import pandas as pd
 
-from src.builtin_plugins.vis_dataclasses import VisIdentifier, VisualAnalysis, VisSettings, VisBarSettings, VisTimeSettings
-from src.builtin_plugins.vis_impls import plot_simple_bargraph, plot_time_series
+from src.builtin_plugins.vis_dataclasses import VisIdentifier, VisualAnalysis, VisSettings, VisBarSettings, VisTimeSettings, RenderedFigure
+from src.builtin_plugins.vis_impls import FigureCache, FigureSpec, RENDER_ENGINE_CHOICES, RENDER_MODE_CHOICES, get_figure_fingerprint, plot_figure, render_png, render_pngs
 from src.builtin_plugins.vis_variables import VisualizationVariables
 from src.data.data_repository import DataRepository
 from src.data.filters import *
-from src.plugin_mgmt.plugins import AnalysisDriverPlugin
+from src.parameter_utils import ConfigurationException
+from src.plugin_mgmt.plugins import AnalysisDriverPlugin, AnalysisPlan
+from src.utils.config_checker import verify_sections_exist
+from src.utils.tracing import span
 
 class VisualAnalysisDriver(AnalysisDriverPlugin):
     """ The VisualAnalysisDriver will perform VisualAnalyses, taking in the VisSettings and
             applying them to the provided analysis. Visualized plots are stored with VisIdentifiers
             in the DataRepository.
+        The render config option decides what is stored:
+            inline: matplotlib Figures, plotted one at a time (default)
+            png: RenderedFigure PNG bytes, plotted one at a time and closed right away
+            process: RenderedFigure PNG bytes, plotted in a pool of render-workers processes
+        The render-engine config option picks how bar and time series figures are plotted, see
+            RENDER_ENGINE_CHOICES. The fast engine reuses figure templates in the png and process
+            modes.
+        In the png and process modes every figure's inputs are fingerprinted. With the
+            figure-cache config option set to a directory, rendered PNGs are kept there by
+            fingerprint and figures with a cached fingerprint aren't rendered again.
     """
     SERVED_TYPE=VisualAnalysis
 
+    def verify_config_section(self, config_section):
+        if(config_section is None):
+            return True
+
+        verify_sections_exist(config_section, "VisualAnalysisDriver", required_sections=set(), optional_sections={"render", "render-workers", "render-engine", "figure-cache"})
+
+        if("render" in config_section and config_section["render"] not in RENDER_MODE_CHOICES):
+            raise ConfigurationException(f"Unknown VisualAnalysisDriver render mode \"{config_section["render"]}\", the choices are: {", ".join(RENDER_MODE_CHOICES)}")
+        if("render-engine" in config_section and config_section["render-engine"] not in RENDER_ENGINE_CHOICES):
+            raise ConfigurationException(f"Unknown VisualAnalysisDriver render engine \"{config_section["render-engine"]}\", the choices are: {", ".join(RENDER_ENGINE_CHOICES)}")
+        if("render-workers" in config_section and (not isinstance(config_section["render-workers"], int) or config_section["render-workers"] < 1)):
+            raise ConfigurationException(f"VisualAnalysisDriver \"render-workers\" has to be a positive integer.")
+        if("figure-cache" in config_section and config_section.get("render", "inline") == "inline"):
+            raise ConfigurationException(f"VisualAnalysisDriver \"figure-cache\" needs the png or process render mode, inline figures aren't rendered to PNGs.")
+
+        return True
+
     def run_analysis(self, analysis: VisualAnalysis, prog_data, config_section: dict):
         """ Loop through the identifiers returned by the VisualAnalysis' filter, performing the
                 corresponding visualization specified by the VisualAnalysis. Store each plot with a
@@ -22,12 +53,27 @@ class VisualAnalysisDriver(AnalysisDriverPlugin):
         """
         vis_settings = analysis.vis_settings
 
+        render_mode = "inline"
+        render_workers = os.cpu_count()
+        render_engine = "standard"
+        figure_cache = None
+        if(config_section is not None):
+            render_mode = config_section.get("render", render_mode)
+            render_workers = config_section.get("render-workers", render_workers)
+            render_engine = config_section.get("render-engine", render_engine)
+            if("figure-cache" in config_section):
+                figure_cache = FigureCache(config_section["figure-cache"])
+
         data_repo: DataRepository = prog_data.data_repo
         identifiers = data_repo.filter_ids(analysis.filter)
 
+        # The figures waiting on the render workers, as (VisIdentifier, FigureSpec, fingerprint)
+        pending = []
+        cached_count = 0
+
         for identifier in identifiers:
 
-            analysis_result = data_repo.get_data(identifier)
+            analysis_result = data_repo.get_data_view(identifier)
 
             if(analysis_result is None or not isinstance(analysis_result, pd.DataFrame)):
                 raise Exception(f"ERROR: Can't visualize analysis {analysis} it's result is not a pd.DataFrame ({type(analysis_result)})")
@@ -44,17 +90,59 @@ class VisualAnalysisDriver(AnalysisDriverPlugin):
 
             vis_color = vis_settings.color
 
-            # Plot figure based off visualization type
-            fig = None
             if(isinstance(vis_settings, VisBarSettings)):
-                fig = plot_simple_bargraph(data_repo, identifier, vis_title, vis_subtext, vis_color)
+                kind = "bar"
             elif(isinstance(vis_settings, VisTimeSettings)):
-                fig = plot_time_series(data_repo, identifier, vis_title, vis_color)
+                kind = "time"
             else:
                 raise Exception(f"Don't know how to handle visualization type \"{type(vis_settings)}\"")
 
-            # Create vis identifier and add to repo
+            spec = FigureSpec(kind, analysis_result, dict(data_repo.get_metadata(identifier)), vis_title, vis_subtext, vis_color, render_engine)
             vis_identifier = VisIdentifier(identifier, type(VisSettings).__name__)
-            data_repo.add(vis_identifier, fig)
 
-            plt.close(fig)
\ No newline at end of file
+            if(render_mode == "inline"):
+                # Plot figure based off visualization type
+                with span(str(identifier), "render", analysis=analysis.name, vis_type=type(vis_settings).__name__):
+                    fig = plot_figure(spec)
+                    data_repo.add(vis_identifier, fig)
+                    plt.close(fig)
+                continue
+
+            fingerprint = get_figure_fingerprint(spec)
+            if(figure_cache is not None and figure_cache.contains(fingerprint)):
+                data_repo.add(vis_identifier, RenderedFigure(None, fingerprint, figure_cache.get_path(fingerprint)))
+                cached_count += 1
+            elif(render_mode == "process"):
+                pending.append((vis_identifier, spec, fingerprint))
+            else:
+                with span(str(identifier), "render", analysis=analysis.name, vis_type=type(vis_settings).__name__):
+                    png = render_png(spec, fingerprint)
+                self.add_rendered_figure(data_repo, figure_cache, vis_identifier, png, fingerprint)
+
+        if(len(pending) > 0):
+            with span(analysis.name, "render", analysis=analysis.name, figures=len(pending), workers=render_workers):
+                pngs = render_pngs([spec for _, spec, _ in pending], render_workers, [fingerprint for _, _, fingerprint in pending])
+
+            for (vis_identifier, _, fingerprint), png in zip(pending, pngs):
+                self.add_rendered_figure(data_repo, figure_cache, vis_identifier, png, fingerprint)
+
+        if(figure_cache is not None):
+            print(f"  Reused {cached_count}/{len(identifiers)} figure(s) of {analysis.name} from the figure cache")
+
+    def add_rendered_figure(self, data_repo: DataRepository, figure_cache: FigureCache, vis_identifier: VisIdentifier, png: bytes, fingerprint: str):
+        """ Store a rendered figure, keeping only the cached copy when there's a figure cache. """
+        if(figure_cache is None):
+            data_repo.add(vis_identifier, RenderedFigure(png, fingerprint))
+            return
+
+        cache_path = figure_cache.put(fingerprint, png)
+        data_repo.add(vis_identifier, RenderedFigure(None, fingerprint, cache_path))
+
+    def explain_analysis(self, analysis: VisualAnalysis, plan_repo: DataRepository):
+        identifiers = plan_repo.filter_ids(analysis.filter)
+        return AnalysisPlan(
+            inputs=len(identifiers),
+            calls=len(identifiers),
+            outputs=[VisIdentifier(identifier, type(VisSettings).__name__) for identifier in identifiers],
+            work=f"{len(identifiers)} figure(s)"
+        )
@@ -2,9 +2,10 @@ from abc import ABC
 from typing import Callable
 
 from src.data.filters import *
+from src.data.identifier_codec import register_identifier_type
 from src.plugin_mgmt.plugins import Analysis
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VisIdentifier(Identifier):
     """ An identifier for a visualization of an analysis. """
     of: Identifier
@@ -38,8 +39,30 @@ class VisTimeSettings(VisSettings):
     """ Visualization settings for a time series plot, adds a color dict. """
     color: dict
 
+@dataclass(frozen=True)
+class RenderedFigure():
+    """ A figure rendered to PNG bytes. The VisualAnalysisDriver stores these instead of matplotlib
+            Figures when its render mode is png or process, see VisualAnalysisDriver. """
+    png: bytes
+    """ The PNG bytes, None when the figure is only kept in the figure cache. """
+    fingerprint: str = None
+    """ The fingerprint of the figure's inputs, see get_figure_fingerprint. """
+    cache_path: str = None
+    """ The figure's PNG in the figure cache, if there is one. """
+
+    def get_png(self) -> bytes:
+        if(self.png is not None):
+            return self.png
+        with open(self.cache_path, "rb") as file:
+            return file.read()
+
 @dataclass(frozen=True)
 class VisualAnalysis(Analysis):
     """ The VisualAnalysis facilitates the generation of visualizations. """
     filter: Callable[[Identifier], bool]
-    vis_settings: VisSettings
\ No newline at end of file
+    vis_settings: VisSettings
+
+# The plugin loader runs this file as a second module, register the class from the imported module
+#   so both copies register the same type.
+import src.builtin_plugins.vis_dataclasses as pkg
+register_identifier_type(pkg.VisIdentifier, "VisIdentifier")
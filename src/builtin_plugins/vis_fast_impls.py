@@ -0,0 +1,264 @@
+""" The fast rendering engine for the built-in bar and time series visualizations. Plots are drawn
+        onto figure templates that are built once per shape and reused, value labels are drawn in
+        batches by a single artist, and the figure layout is fixed instead of computed for every
+        figure.
+
+    The figures show the same thing as the standard engine in vis_impls, with two differences: the
+        axes margins are fixed instead of tight, and the legend's best location avoids the plotted
+        data but not the value labels.
+"""
+from collections import OrderedDict
+import datetime
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.artist import Artist
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox, offset_copy
+from pandas.io.formats.printing import pprint_thing
+
+# The amount of templates kept per process, the least recently used one is dropped past this
+TEMPLATE_CACHE_SIZE = 8
+# Fixed bar chart margins, replacing the tight_layout pass. Saving with bbox_inches='tight' still
+#   crops the figure to its contents so long labels aren't cut off.
+BAR_SUBPLOT_PARAMS = {"left": 0.12, "right": 0.98, "bottom": 0.1, "top": 0.92}
+
+class LabelBatch(Artist):
+    """
+    Draws many text labels with one Text artist, moving it to each label in turn instead of adding
+        a Text artist per label to the axes. The labels are not clipped, like ax.text labels.
+    """
+    zorder = Text.zorder
+
+    def __init__(self, ax, transform, **text_kwargs):
+        """
+        Args:
+            ax (Axes): The axes to add the batch to.
+            transform (Transform): Transforms label positions to display coordinates.
+            **text_kwargs: Text properties shared by every label, e.g. ha, va, fontsize.
+        """
+        super().__init__()
+        self._text = Text(**text_kwargs)
+        self._text.set_figure(ax.figure)
+        self._text.set_transform(transform)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.labels = []
+
+        ax.add_artist(self)
+        # add_artist clips to the axes patch, which would also drop the batch from the tight bbox
+        self.set_clip_on(False)
+
+    def set_labels(self, x, y, labels: list[str]):
+        """ Replace the labels, labels at a non-finite position are skipped like Text skips them. """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        self.x = x[finite]
+        self.y = y[finite]
+        self.labels = [label for label, keep in zip(labels, finite) if keep]
+        self.stale = True
+
+    def set_color(self, color):
+        self._text.set_color(color)
+        self.stale = True
+
+    def _iter_labels(self):
+        for x, y, label in zip(self.x, self.y, self.labels):
+            self._text.set_position((x, y))
+            self._text.set_text(label)
+            yield self._text
+
+    def draw(self, renderer):
+        if(not self.get_visible()):
+            return
+        for text in self._iter_labels():
+            text.draw(renderer)
+        self.stale = False
+
+    def get_window_extent(self, renderer=None):
+        bboxes = [text.get_window_extent(renderer) for text in self._iter_labels()]
+        if(len(bboxes) == 0):
+            # Zero sized bboxes are left out of tight bboxes
+            return Bbox.from_bounds(0, 0, 0, 0)
+        return Bbox.union(bboxes)
+
+#region Templates
+class BarTemplate():
+    """ A horizontal bar chart for DataFrames with a set amount of rows and numeric columns, laid
+            out like DataFrame.plot(kind='barh'). """
+
+    def __init__(self, rows: int, columns: int):
+        self.fig = Figure(figsize=(12, 8))
+        self.fig.subplots_adjust(**BAR_SUBPLOT_PARAMS)
+        self.ax = self.fig.add_subplot()
+        ax = self.ax
+
+        # Each row's bars share half of the row's height, centered on the row's tick
+        bar_height = 0.5/columns
+        self.containers = [ax.barh(np.arange(rows) - 0.25 + (column+0.5)*bar_height, np.zeros(rows), bar_height) for column in range(columns)]
+        ax.set_ylim(-0.5, rows-0.5)
+        ax.set_yticks(np.arange(rows))
+
+        self.value_labels = LabelBatch(ax, ax.transData, ha='left', va='center')
+        self.subtext = ax.text(0.02, -0.1, "", transform=ax.transAxes, color='black', fontsize=12)
+
+        ax.xaxis.set_label_position('top')
+        ax.xaxis.tick_top()
+        ax.grid(True)
+
+    def fill(self, df: pd.DataFrame, title, subtext, color):
+        """ Draw the DataFrame onto the template, see plot_fast_bargraph. """
+        ax = self.ax
+        plot_df = df.select_dtypes(include="number")
+        widths = plot_df.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        for index, container in enumerate(self.containers):
+            bar_color = color if color is not None else f"C{index}"
+            for rect, width in zip(container.patches, widths[:, index]):
+                rect.set_width(width)
+                rect.set_facecolor(bar_color)
+
+        ax.set_yticklabels([pprint_thing(key) for key in df.index])
+        ax.set_ylabel(pprint_thing(df.index.name) if df.index.name is not None else "")
+
+        # Every bar starts at 0, so the x data limits are the widths and 0. Setting them directly
+        #   skips relim's pass over every bar.
+        finite_widths = widths[np.isfinite(widths)]
+        ax.dataLim.intervalx = (min(0, finite_widths.min(initial=0)), max(0, finite_widths.max(initial=0)))
+        ax.autoscale_view(scaley=False)
+        ax.legend(self.containers, [pprint_thing(column) for column in plot_df.columns], loc="best")
+        ax.set_title(title)
+
+        # Annotate the bars with the first column's values
+        values = df.values[:, 0]
+        labels = [f'{value:.2f}' if isinstance(value, float) else str(value) for value in values]
+        self.value_labels.set_labels(values, np.arange(len(values)), labels)
+
+        self.subtext.set_text(subtext)
+
+class TimeTemplate():
+    """ A time series line chart for DataFrames with a set amount of periods and set columns, see
+            plot_fast_time_series. """
+
+    def __init__(self, columns: tuple):
+        self.fig = Figure(figsize=(15, 8))
+        self.ax = self.fig.add_subplot()
+        ax = self.ax
+
+        self.lines = []
+        self.value_labels = []
+        # Value labels sit 5 points above their point
+        label_transform = offset_copy(ax.transData, fig=self.fig, x=0, y=5, units='points')
+        for column in columns:
+            self.lines.append(ax.plot([], [], label=column)[0])
+            self.value_labels.append(LabelBatch(ax, label_transform, ha='center', va='bottom', fontsize=8))
+
+        # Periods are plotted as matplotlib date numbers, the locator and formatter read them as dates
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+        ax.grid(True)
+        ax.xaxis.tick_top()
+
+    def fill(self, df: pd.DataFrame, periods: list[tuple[int, int]], title, colors, default_color):
+        """ Draw the DataFrame onto the template, see plot_fast_time_series. """
+        ax = self.ax
+
+        period_datetimes = [datetime.datetime.fromtimestamp(period[0]) for period in periods]
+        period_numbers = mdates.date2num(period_datetimes)
+        ax.set_xlim(mdates.date2num(min(period_datetimes) - datetime.timedelta(days=3)),
+                    mdates.date2num(max(period_datetimes) + datetime.timedelta(days=3)))
+
+        value_columns = [column for column in df.columns if column != "Period"]
+        min_value = min([df[column].min() for column in value_columns])
+        max_value = max([df[column].max() for column in value_columns])
+        padding = (max_value-min_value)*0.1
+        ax.set_ylim(min_value - padding, max_value + padding)
+
+        for line, value_labels, column in zip(self.lines, self.value_labels, value_columns):
+            color = colors[column] if column in colors else default_color
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+            line.set_data(period_numbers, values)
+            line.set_color(color)
+            value_labels.set_labels(period_numbers, values, [f'{value:.0f}' for value in values])
+            value_labels.set_color(color)
+
+        ax.set_title(title)
+        # Rebuilt so the legend handles pick up this figure's colors
+        ax.legend()
+
+_templates = OrderedDict()
+
+def get_template(key: tuple, build):
+    """ Get the cached template for the key, building it with build() if there isn't one. """
+    template = _templates.pop(key, None)
+    if(template is None):
+        template = build()
+
+    _templates[key] = template
+    if(len(_templates) > TEMPLATE_CACHE_SIZE):
+        _templates.popitem(last=False)
+
+    return template
+#endregion
+
+def plot_fast_bargraph(df: pd.DataFrame, title, subtext, color, reuse=False) -> Figure:
+    """
+    Plot a bargraph like plot_simple_bargraph with the fast engine.
+
+    Args:
+        df (pd.DataFrame): The first column is the bar name, the following columns are bar values.
+        title (str): The figure's title.
+        subtext (str): The text under the figure.
+        color (object): The bar color, None uses the default color cycle.
+        reuse (bool): Draw onto a cached template. The returned figure is redrawn by the next plot
+            with the same shape, so it has to be saved before then.
+    Returns:
+        Figure: The figure, it isn't registered with pyplot.
+    """
+    df = df.set_index(df.columns[0])
+    df = df.iloc[::-1]
+
+    shape = (len(df), len(df.select_dtypes(include="number").columns))
+    if(reuse):
+        template = get_template(("bar",) + shape, lambda: BarTemplate(*shape))
+    else:
+        template = BarTemplate(*shape)
+
+    template.fill(df, title, subtext, color)
+    return template.fig
+
+def plot_fast_time_series(df: pd.DataFrame, meta_data: dict, title, colors={}, default_color="blue", reuse=False) -> Figure:
+    """
+    Plot a time series like plot_time_series with the fast engine.
+
+    Args:
+        df (pd.DataFrame): The Period column and one column per line.
+        meta_data (dict): The meta analysis' metadata, its periods hold the (start_ts, end_ts) of
+            each row.
+        title (str): The figure's title.
+        colors (dict): Line colors by column name.
+        default_color (str): The color of columns that aren't in colors.
+        reuse (bool): Draw onto a cached template, see plot_fast_bargraph.
+    Returns:
+        Figure: The figure, it isn't registered with pyplot.
+    Raises:
+        ValueError: The DataFrame can't be plotted as a time series.
+    """
+    if(meta_data.get("long_format", False)):
+        raise ValueError("Can't plot horizontal series of a long format meta analysis, plot a per key meta analysis instead.")
+    if(len(df.columns) < 2):
+        raise ValueError("Can't plot horizontal series, DataFrame has less than 2 columns!")
+    if("Period" not in df.columns):
+        raise ValueError("Can't plot horizontal series, DataFrame doesn't have a Period column.")
+
+    columns = tuple([column for column in df.columns if column != "Period"])
+    if(reuse):
+        template = get_template(("time", len(df), columns), lambda: TimeTemplate(columns))
+    else:
+        template = TimeTemplate(columns)
+
+    template.fill(df, meta_data["periods"], title, colors, default_color)
+    return template.fig
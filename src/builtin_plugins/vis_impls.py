@@ -1,18 +1,174 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 import datetime
+import hashlib
+import io
+import matplotlib
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
+import os
+import pandas as pd
+import struct
 
-from src.data.data_repository import DataRepository
+from src.builtin_plugins.vis_fast_impls import plot_fast_bargraph, plot_fast_time_series
+from src.utils.fileutils import write_bytes_atomic
+from src.utils.processes import get_worker_context
 
-def plot_simple_bargraph(data_repo: DataRepository, identifier, title, subtext, color):
+RENDER_MODE_CHOICES = ['inline', 'png', 'process']
+RENDER_ENGINE_CHOICES = ['standard', 'fast']
+# Part of every figure fingerprint, bump it when a plot function's output changes so figures from
+#   earlier versions aren't reused.
+FIGURE_RENDER_VERSION = 1
+# The PNG text chunk rendered figures keep their fingerprint in
+FINGERPRINT_PNG_KEY = "AutoMetrics-Fingerprint"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+@dataclass(frozen=True)
+class FigureSpec():
+    """ Everything needed to plot a figure without the DataRepository, so the figure can be
+            plotted by a render worker process. Only holds plain data so it pickles with any start
+            method. """
+    kind: str
+    """ The plot to make, "bar" or "time". """
+    df: pd.DataFrame
+    metadata: dict
+    title: str
+    subtext: str
+    color: object
+    engine: str = "standard"
+    """ The rendering engine, one of RENDER_ENGINE_CHOICES. """
+
+def plot_figure(spec: FigureSpec, reuse=False):
+    """ Plot the figure described by the spec, returning the matplotlib Figure. With reuse the fast
+            engine draws onto a cached template, so the figure has to be saved before the next
+            plot. """
+    if(spec.engine == "fast"):
+        if(spec.kind == "bar"):
+            return plot_fast_bargraph(spec.df, spec.title, spec.subtext, spec.color, reuse=reuse)
+        elif(spec.kind == "time"):
+            return plot_fast_time_series(spec.df, spec.metadata, spec.title, spec.color, reuse=reuse)
+    elif(spec.kind == "bar"):
+        return plot_simple_bargraph(spec.df, spec.title, spec.subtext, spec.color)
+    elif(spec.kind == "time"):
+        return plot_time_series(spec.df, spec.metadata, spec.title, spec.color)
+
+    raise ValueError(f"Don't know how to plot figure kind \"{spec.kind}\"")
+
+def render_png(spec: FigureSpec, fingerprint: str = None) -> bytes:
+    """ Plot the figure described by the spec and encode it as PNG bytes, the same bytes
+            savefig(path, bbox_inches='tight') writes. The figure is closed afterwards. A
+            fingerprint is written into the PNG's FINGERPRINT_PNG_KEY text chunk. """
+    fig = plot_figure(spec, reuse=True)
+    try:
+        buffer = io.BytesIO()
+        metadata = {FINGERPRINT_PNG_KEY: fingerprint} if fingerprint is not None else None
+        fig.savefig(buffer, format="png", bbox_inches='tight', metadata=metadata)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+def render_pngs(specs: list[FigureSpec], workers: int, fingerprints: list[str] = None) -> list[bytes]:
+    """
+    Render figures to PNG bytes in a pool of worker processes using the Agg backend.
+
+    Args:
+        specs (list[FigureSpec]): The figures to render.
+        workers (int): The maximum amount of worker processes.
+        fingerprints (list[str]): The fingerprint of each figure, see render_png.
+    Returns:
+        list[bytes]: The PNG bytes of each figure, in the order of specs.
+    """
+    if(len(specs) == 0):
+        return []
+    if(fingerprints is None):
+        fingerprints = [None]*len(specs)
+
+    workers = max(1, min(workers, len(specs)))
+    # Hand out small batches so the pickling overhead doesn't outweigh the plotting
+    chunksize = max(1, len(specs) // (workers*4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_worker_context(), initializer=_init_render_worker) as executor:
+        return list(executor.map(render_png, specs, fingerprints, chunksize=chunksize))
+
+def _init_render_worker():
+    matplotlib.use("Agg")
+
+#region Fingerprints
+def get_figure_fingerprint(spec: FigureSpec) -> str:
+    """
+    Fingerprint everything that decides a figure's PNG: the DataFrame's content, the resolved title
+        and subtext, colors, the figure kind and engine, the periods a time series is plotted
+        against, and the renderer version (FIGURE_RENDER_VERSION, matplotlib, and pandas).
+
+    Returns:
+        str: The fingerprint as a hex string, figures with the same fingerprint render the same.
+    """
+    df = spec.df
+    color = sorted(spec.color.items(), key=str) if isinstance(spec.color, dict) else spec.color
+    header = [FIGURE_RENDER_VERSION, matplotlib.__version__, pd.__version__, spec.kind, spec.engine,
+              spec.title, spec.subtext, color, list(df.columns), [str(dtype) for dtype in df.dtypes], df.index.name, df.shape]
+    if(spec.kind == "time"):
+        # Periods are plotted at local times, so the fingerprint follows the timezone
+        header.append([datetime.datetime.fromtimestamp(period[0]).isoformat() for period in spec.metadata.get("periods", [])])
+        header.append(spec.metadata.get("long_format", False))
+
+    digest = hashlib.blake2b(repr(header).encode("utf-8"), digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def read_png_fingerprint(path: str) -> str:
+    """ Read the fingerprint written by render_png from a PNG file's header, only reading the
+            chunks before the image data. Returns None if the file doesn't exist, isn't a PNG, or
+            has no fingerprint. """
+    try:
+        with open(path, "rb") as file:
+            if(file.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE):
+                return None
+
+            while(True):
+                chunk_header = file.read(8)
+                if(len(chunk_header) < 8):
+                    return None
+                length, chunk_type = struct.unpack(">I4s", chunk_header)
+                if(chunk_type in (b"IDAT", b"IEND")):
+                    return None
+
+                data = file.read(length)
+                file.seek(4, os.SEEK_CUR) # CRC
+                if(chunk_type == b"tEXt"):
+                    key, _, value = data.partition(b"\x00")
+                    if(key == FINGERPRINT_PNG_KEY.encode("latin-1")):
+                        return value.decode("latin-1")
+    except OSError:
+        return None
+
+class FigureCache():
+    """ A directory of rendered PNGs named by their fingerprint. The directory is kept between
+            runs, so figures whose inputs didn't change are read from it instead of rendered. """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def get_path(self, fingerprint: str) -> str:
+        return os.path.join(self.path, f"{fingerprint}.png")
+
+    def contains(self, fingerprint: str) -> bool:
+        return os.path.exists(self.get_path(fingerprint))
+
+    def put(self, fingerprint: str, png: bytes) -> str:
+        """ Store a rendered PNG, returning its path in the cache. """
+        path = self.get_path(fingerprint)
+        write_bytes_atomic(path, png)
+        return path
+#endregion
+
+def plot_simple_bargraph(df: pd.DataFrame, title, subtext, color):
     """
     Plots a bargraph comparing values between rows.
     Expects a dataframe with the first column being bar name, and the following column being bar
         value.
     """
 
-    df, meta_data = data_repo.get(identifier)
-
     df = df.set_index(df.columns[0])
     df = df.iloc[::-1]
 
@@ -48,17 +204,17 @@ def plot_simple_bargraph(data_repo: DataRepository, identifier, title, subtext,
 
     return fig  # Return the figure object
             
-def plot_time_series(data_repo: DataRepository, identifier, title, colors={}, default_color="blue"):
+def plot_time_series(df: pd.DataFrame, meta_data: dict, title, colors={}, default_color="blue"):
     """
     Plots a horizontal line showing the data points at each time.
     Expects a dataframe with the first column being period, each following column will be a new line
-      on the graph.
+      on the graph. The metadata's periods hold the (start_ts, end_ts) of each row.
     Assign colors to each line by adding in entry to dictionary:
       colors[<column name>] = "<color name>"
     """
 
-    df, meta_data = data_repo.get(identifier)
-
+    if(meta_data.get("long_format", False)):
+        raise ValueError("Can't plot horizontal series of a long format meta analysis, plot a per key meta analysis instead.")
     if(len(df.columns) < 2):
         raise ValueError("Can't plot horizontal series, DataFrame has less than 2 columns!")
     if("Period" not in df.columns):
@@ -87,8 +243,8 @@ def plot_time_series(data_repo: DataRepository, identifier, title, colors={}, de
     padding = (max_value-min_value)*0.1
     ax.set_ylim(min_value - padding, max_value + padding)
     
-    # Change the period column from a timestamp tuple to a datetime object based off of the starting timestamp
-    df.loc[:, "Period"] = [datetime.datetime.fromtimestamp(period[0]) for period in meta_data["periods"]]
+    # Plot against the start of each period, the Period column holds readable strings
+    period_datetimes = [datetime.datetime.fromtimestamp(period[0]) for period in meta_data["periods"]]
 
     # Plot and annotate each line
     for column in df.columns:
@@ -100,12 +256,12 @@ def plot_time_series(data_repo: DataRepository, identifier, title, colors={}, de
             color = colors[column]
 
         # Plot line
-        ax.plot(df["Period"], df[column], color=color, label=column)
+        ax.plot(period_datetimes, df[column], color=color, label=column)
 
         # Add number annotation above each point
-        for i, row in df.iterrows():
-            ax.annotate(f'{row[column]:.0f}',
-                (row['Period'], row[column]),
+        for period_datetime, value in zip(period_datetimes, df[column]):
+            ax.annotate(f'{value:.0f}',
+                (period_datetime, value),
                 xytext=(0, 5),
                 textcoords='offset points',
                 ha='center',
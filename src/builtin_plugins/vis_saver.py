@@ -1,45 +1,138 @@
+import io
 from matplotlib.figure import Figure
 import os
 
 from src.builtin_plugins.vis_analysis_driver import VisIdentifier
+from src.builtin_plugins.vis_dataclasses import RenderedFigure
+from src.builtin_plugins.vis_impls import read_png_fingerprint
 from src.data.data_repository import DataRepository
 from src.data.filters import *
 from src.plugin_mgmt.plugins import Saver
 from src.program_data import ProgramData
+from src.utils.content_manifest import ContentManifest, is_incremental
+from src.utils.fileutils import link_or_copy_file
+from src.utils.tracing import span
 
 class VizualizationsSaver(Saver):
     """ The VisualizationsSaver will save generated visualizations as pngs. Only looking for
             VisIdentifiers and saving them.
+        Rendered figures with a fingerprint aren't written again when the existing file has the
+            same fingerprint, and figures in the figure cache are hard linked from it. With
+            saving.incremental set, the other figures are only written when their PNG changed.
+            With saving.stream set, figures rendered to PNG bytes are written while the analyses
+            are still running.
     """ 
+
+    CONCURRENT = True
+
     def save(self, prog_data: ProgramData, config_section: dict, base_path: str):
 
+        # With saving.stream set the saver was started before the analyses, see start_stream
+        streamed = getattr(self, "streamed", None)
+        self.streamed = None
+
         data_repo: DataRepository = prog_data.data_repo
         identifiers = data_repo.filter_ids(filter_type(VisIdentifier))
 
         if(len(identifiers) == 0):
+            self.manifest = None
             return
 
-        out_path = base_path
-        if(not os.path.exists(out_path)):
-            os.mkdir(out_path)
-
-        saved_files = []
+        if(streamed is None):
+            self.start(prog_data, base_path)
+            streamed = {}
 
         for identifier in identifiers:
+            # Streamed figures were already written, their paths keep the analysis order
+            if(identifier in streamed):
+                self.saved_files.append(streamed[identifier])
+                continue
+
+            fig: Figure | RenderedFigure = data_repo.get_data(identifier)
+            self.saved_files.append(self.save_figure(identifier, fig))
+
+        if(self.unchanged_count > 0):
+            print(f"  {self.unchanged_count}/{len(identifiers)} visualization file(s) were unchanged")
+
+        if(self.manifest is not None):
+            self.manifest.save()
+            self.manifest.print_summary()
+        
+        return self.saved_files
+
+    def start(self, prog_data: ProgramData, base_path: str):
+        """ Set up the saver's state for a run. """
+        self.out_path = base_path
+        self.manifest = ContentManifest(self.out_path, "VizualizationsSaver") if is_incremental(prog_data) else None
+        self.saved_files = []
+        self.unchanged_count = 0
+        # Made by the first figure, so a streamed run without figures doesn't leave the directory
+        self.made_out_path = False
 
-            analysis_id: AnalysisIdentifier = identifier.of
-            if(not isinstance(analysis_id, MetaAnalysisIdentifier)):
-                src_id = analysis_id.find_base()
-                name_prefix = src_id.fs_str()
+    def start_stream(self, prog_data: ProgramData, config_section: dict, base_path: str):
+        self.start(prog_data, base_path)
+        # The paths of the figures written by save_streamed by identifier, save() skips them
+        self.streamed = {}
+        return filter_type(VisIdentifier)
+
+    def save_streamed(self, identifier: VisIdentifier, data):
+        # matplotlib isn't thread safe and the analyses are still drawing, so only figures that
+        #   are already rendered to PNG bytes are streamed. save() writes the rest.
+        if(not isinstance(data, RenderedFigure)):
+            self.streamed.pop(identifier, None)
+            return False
+
+        self.streamed[identifier] = self.save_figure(identifier, data)
+        return True
+
+    def save_figure(self, identifier: VisIdentifier, fig: Figure | RenderedFigure) -> str:
+        """ Write one figure, returning its path. """
+        analysis_id: AnalysisIdentifier = identifier.of
+        if(not isinstance(analysis_id, MetaAnalysisIdentifier)):
+            src_id = analysis_id.find_base()
+            name_prefix = src_id.fs_str()
+        else:
+            name_prefix = "Entire period"
+
+        if(not self.made_out_path):
+            os.makedirs(self.out_path, exist_ok=True)
+            self.made_out_path = True
+
+        path = os.path.join(self.out_path, f"{name_prefix} {analysis_id.analysis}.png")
+        print(f"  Saving visualization file \"{path}\"")
+
+        with span(path, "write", identifier=identifier):
+            if(isinstance(fig, RenderedFigure) and fig.fingerprint is not None and read_png_fingerprint(path) == fig.fingerprint):
+                # The file already holds this figure, e.g. from the previous run
+                self.unchanged_count += 1
+                if(self.manifest is not None):
+                    self.manifest.record(path, None, written=False)
+            elif(isinstance(fig, RenderedFigure) and fig.cache_path is not None):
+                link_or_copy_file(fig.cache_path, path)
+                if(self.manifest is not None):
+                    self.manifest.record(path, None, written=True)
+            elif(self.manifest is not None):
+                if(not self.manifest.write(path, self.get_png(fig))):
+                    self.unchanged_count += 1
+            elif(isinstance(fig, RenderedFigure)):
+                # Rendered figures are already encoded, write the bytes as they are
+                with open(path, "wb") as file:
+                    file.write(fig.png)
             else:
-                name_prefix = "Entire period"
+                fig.savefig(path, bbox_inches='tight')
 
-            fig: Figure = data_repo.get_data(identifier)
-            path = os.path.join(out_path, f"{name_prefix} {analysis_id.analysis}.png")
-            print(f"  Saving visualization file \"{path}\"")
+        return path
 
-            fig.savefig(path, bbox_inches='tight')
+    def get_png(self, fig: Figure | RenderedFigure) -> bytes:
+        """ Get the PNG bytes of a figure, encoding matplotlib figures like savefig(path) does. """
+        if(isinstance(fig, RenderedFigure)):
+            return fig.get_png()
 
-            saved_files.append(path)
-        
-        return saved_files
\ No newline at end of file
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches='tight')
+        return buffer.getvalue()
+
+    def get_write_stats(self):
+        if(getattr(self, "manifest", None) is None):
+            return None
+        return self.manifest.get_stats()
\ No newline at end of file
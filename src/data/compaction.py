@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+from src.data.data_repository import DataRepository
+
+# standard and arrow keep every value and every numeric dtype, so arithmetic in analyses is
+#   unchanged. downcast also shrinks numeric columns, see compact_dataframe.
+COMPACT_MODE_CHOICES = ['standard', 'arrow', 'downcast']
+# String columns with at most this many unique values per row become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+def get_frame_bytes(df: pd.DataFrame) -> int:
+    """ Get the memory used by a DataFrame in bytes, including the index and string contents. """
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+def compact_dataframe(df: pd.DataFrame, mode="standard") -> pd.DataFrame:
+    """
+    Get a copy of the DataFrame that uses less memory without changing its values:
+        - string columns with few unique values become categoricals
+        - in arrow mode, the remaining string columns become Arrow backed strings
+        - in downcast mode, integer columns are downcast to the smallest type that holds every
+            value and float columns become float32 when every value survives the round trip
+    Numeric columns are only changed in downcast mode. The stored values are the same, but
+        arithmetic on them in analyses isn't: adding two int8 columns wraps around instead of
+        growing, and float32 results are rounded to float32. Only use it for plugins whose
+        analyses cast before doing arithmetic.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to compact, it isn't modified.
+        mode (str): One of COMPACT_MODE_CHOICES.
+    Returns:
+        pd.DataFrame: The compacted DataFrame.
+    Raises:
+        ValueError: The mode is not one of COMPACT_MODE_CHOICES, or it's arrow and pyarrow isn't
+            installed.
+    """
+    if(mode not in COMPACT_MODE_CHOICES):
+        raise ValueError(f"Unknown compaction mode \"{mode}\", the choices are: {", ".join(COMPACT_MODE_CHOICES)}")
+    if(mode == "arrow" and not pyarrow_available):
+        raise ValueError("Can't compact with Arrow dtypes, pyarrow is not installed.")
+
+    out_df = df.copy(deep=False)
+    # Columns are replaced by position so duplicate column names are handled
+    for position in range(len(df.columns)):
+        column = df.iloc[:, position]
+        compacted = compact_series(column, mode)
+        if(compacted is not column):
+            out_df.isetitem(position, compacted)
+
+    return out_df
+
+def compact_series(series: pd.Series, mode: str) -> pd.Series:
+    """ Compact a single column, see compact_dataframe. Returns the series itself when it can't be
+            compacted. """
+    dtype = series.dtype
+
+    if(dtype == object):
+        if(pd.api.types.infer_dtype(series, skipna=True) != "string"):
+            return series
+        # Sorted categories keep groupby and sort_values ordering the same as the strings
+        codes, categories = pd.factorize(series, sort=True)
+        if(len(series) > 0 and len(categories) <= len(series)*CATEGORY_MAX_RATIO):
+            return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+        if(mode == "arrow"):
+            return series.astype(pd.ArrowDtype(pa.string()))
+        return series
+
+    if(mode != "downcast" or pd.api.types.is_bool_dtype(dtype) or not isinstance(dtype, np.dtype)):
+        return series
+
+    if(pd.api.types.is_signed_integer_dtype(dtype)):
+        return pd.to_numeric(series, downcast="integer")
+    if(pd.api.types.is_unsigned_integer_dtype(dtype)):
+        return pd.to_numeric(series, downcast="unsigned")
+
+    if(dtype == np.float64):
+        with np.errstate(over="ignore"):
+            downcast = series.astype(np.float32)
+        if(np.array_equal(downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True)):
+            return downcast
+
+    return series
+
+def compact_repository(data_repo: DataRepository, mode: str, name: str, verbose=False):
+    """
+    Compact every DataFrame in the repository in place with compact_dataframe, printing the
+        memory saved.
+
+    Args:
+        data_repo (DataRepository): The repository, usually one an ingest plugin just returned.
+        mode (str): One of COMPACT_MODE_CHOICES.
+        name (str): The ingest plugin's name, used in the printout.
+        verbose (bool): Print the before and after size of every DataFrame.
+    Returns:
+        tuple[int, int]: The total bytes before and after compaction.
+    """
+    frame_count = 0
+    total_before = 0
+    total_after = 0
+
+    for identifier in list(data_repo.get_ids()):
+        data = data_repo.get_data(identifier)
+        if(not isinstance(data, pd.DataFrame)):
+            continue
+
+        compacted = compact_dataframe(data, mode)
+        before = get_frame_bytes(data)
+        after = get_frame_bytes(compacted)
+        data_repo.update_data(identifier, compacted)
+
+        frame_count += 1
+        total_before += before
+        total_after += after
+        if(verbose):
+            print(f"  Compacted {identifier}: {before} -> {after} bytes")
+
+    if(frame_count > 0):
+        saved_percent = (1 - total_after/total_before)*100 if total_before > 0 else 0
+        print(f"Compacted {frame_count} DataFrame(s) from {name} ({mode}): {total_before/(1024*1024):.2f} MB -> {total_after/(1024*1024):.2f} MB, {saved_percent:.1f}% smaller")
+
+    return total_before, total_after
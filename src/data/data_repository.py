@@ -1,18 +1,48 @@
+from contextlib import contextmanager
 import pandas as pd
+import sys
+import time
 
 from src.data.filters import *
 from src.data.identifier import Identifier
+from src.data.repository_events import EVENT_ADD, EVENT_UPDATE_DATA, EVENT_UPDATE_METADATA, EVENT_REMOVE, EVENT_JOIN, QueuedSubscription, RepositorySubscription
+from src.data.repository_stats import RepositoryStats
+from src.data.scalar_store import ScalarStore, STORED_SCALAR
+from src.data.views import get_read_only_view, get_read_only_metadata
 
 class DataRepository():
     """
     The DataRepository can hold any data, along with optional metadata; both identified by a 
       string identifier. You can also retrieve lists of identifiers based off of a filtering
       function with the filter calls.
+    Numeric results of per period analyses are kept in a columnar ScalarStore, they are read
+      the same way as any other data and can be read in bulk with get_scalar_vectors.
     """
 
     def __init__(self):
         self._data = {}
         self._metadata = {}
+        self._scalars = ScalarStore()
+        # Access statistics, None unless enable_stats is called
+        self.stats: RepositoryStats = None
+        # The RepositorySubscriptions, replaced instead of changed so events can be sent while
+        #   another thread subscribes. Events are only made when there is a subscription.
+        self._subscriptions = ()
+        # The events held for each subscription by batch_events, None outside of a batch
+        self._held_events = None
+
+    def __getstate__(self):
+        # Subscriptions belong to the process that made them, a pickled copy starts without any
+        state = self.__dict__.copy()
+        state["_subscriptions"] = ()
+        state["_held_events"] = None
+        return state
+
+    def enable_stats(self):
+        """ Start counting filter_ids, get_data, and contains calls, see RepositoryStats. """
+        if(self.stats is None):
+            self.stats = RepositoryStats()
+        return self.stats
     
     def add(self, identifier: Identifier, data: object, metadata: dict = None):
         """
@@ -26,21 +56,114 @@ class DataRepository():
         Returns:
             tuple[object, dict]: The data/metadata tuple.
         Raises:
-            ValueError: The identifier is already in the repository, the metadata is None.
+            ValueError: The identifier is already in the repository.
         """
-        
-        if(metadata is None):
-            metadata = {}
 
         if(not isinstance(identifier, Identifier)):
             raise ValueError(f"Cannot add data for \"{identifier}\" identifier type \"{type(identifier)}\" is not a subclass of Identifier.")
-        if(self.contains(identifier)):
+        self._add(identifier, data, metadata)
+        if(self._subscriptions):
+            self._emit(EVENT_ADD, [identifier], [data], [metadata])
+
+    def _add(self, identifier: Identifier, data: object, metadata: dict):
+        """ Add without making an event, see add. """
+        # Internal checks use the dictionary directly so they aren't counted in the stats
+        if(identifier in self._data):
             raise ValueError(f"Cannot add data for \"{identifier}\" it already exists in the repo.\nCurrent repo:\n  {"\n  ".join(str(key) for key in self._data.keys())}")
-        if(metadata is None):
-            raise ValueError(f"Metadata cannot be none.")
 
-        self._data[identifier] = data
-        self._metadata[identifier] = metadata
+        # Scalars are held by the store, the dictionary keeps a placeholder so the identifier is
+        #   still found by get_ids and filter_ids
+        self._data[identifier] = STORED_SCALAR if self._scalars.try_add(identifier, data) else data
+        # Missing metadata is created by get_metadata when it's first asked for
+        if(metadata is not None):
+            self._metadata[identifier] = metadata
+
+    def subscribe(self, callback, operation=None, events: set[str] = None) -> RepositorySubscription:
+        """
+        Call callback(events) with each batch of RepositoryEvents for the changed identifiers that
+          satisfy operation. The callback runs on the thread changing the repository and gets a
+          list of one event, or every event made inside of batch_events when it ends. Slow work
+          should be handed off to another thread, or use subscribe_queue.
+
+        Args:
+            callback (function): Called with a list of RepositoryEvents.
+            operation (function): The filter operation, like the ones passed to filter_ids. None
+              receives every identifier.
+            events (set[str]): The EVENT_ kinds to receive, None for all of them.
+        Returns:
+            RepositorySubscription: The subscription, pass it to unsubscribe to stop the calls.
+        """
+        return self._subscribe(RepositorySubscription(events, operation, callback))
+
+    def subscribe_queue(self, operation=None, events: set[str] = None) -> QueuedSubscription:
+        """
+        Queue the RepositoryEvents for the changed identifiers that satisfy operation, to be read
+          in batches by another thread, see QueuedSubscription. The arguments are the same as
+          subscribe's.
+
+        Returns:
+            QueuedSubscription: The subscription to read the events from, unsubscribing ends its
+              iteration once the queued events are read.
+        """
+        return self._subscribe(QueuedSubscription(events, operation))
+
+    def _subscribe(self, subscription: RepositorySubscription):
+        self._subscriptions = (*self._subscriptions, subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: RepositorySubscription):
+        """ Stop sending events to a subscription made with subscribe or subscribe_queue. """
+        self._subscriptions = tuple([other for other in self._subscriptions if other is not subscription])
+        subscription.close()
+
+    @contextmanager
+    def batch_events(self):
+        """ Hold the events made inside of the context and deliver them to each subscription in
+              one batch when it ends. Batches inside of a batch join the outer one. """
+        if(self._held_events is not None):
+            yield
+            return
+
+        self._held_events = {}
+        try:
+            yield
+        finally:
+            held_events, self._held_events = self._held_events, None
+            for subscription, events in held_events.items():
+                if(subscription in self._subscriptions):
+                    subscription.deliver(events)
+
+    def _emit(self, kind: str, identifiers: list, data: list, metadata: list):
+        """ Send an event to every subscription that receives it, only called when there are
+              subscriptions. """
+        for subscription in self._subscriptions:
+            event = subscription.filter_event(kind, identifiers, data, metadata)
+            if(event is None):
+                continue
+
+            if(self._held_events is not None):
+                self._held_events.setdefault(subscription, []).append(event)
+            else:
+                subscription.deliver([event])
+
+    def update_data(self, identifier: Identifier, data: object):
+        """
+        Replace the data for a specific identifier, keeping its metadata.
+
+        Args:
+            identifier (Identifier): The identifier for the data and metadata.
+            data (object): The new data.
+        Raises:
+            ValueError: The identifier is not in the repository.
+        """
+        if(identifier not in self._data):
+            raise ValueError(f"Cannot update data for \"{identifier}\" it is not in the repo.")
+
+        self._scalars.remove(identifier, self._data[identifier] is STORED_SCALAR)
+        self._data[identifier] = STORED_SCALAR if self._scalars.try_add(identifier, data) else data
+
+        if(self._subscriptions):
+            self._emit(EVENT_UPDATE_DATA, [identifier], [data], None)
 
     def update_metadata(self, identifier: Identifier, metadata):
         """
@@ -53,11 +176,14 @@ class DataRepository():
         Raises:
             ValueError: The identifier is already in the repository, the metadata is None.
         """
-        if(not self.contains(identifier)):
+        if(identifier not in self._data):
             raise ValueError(f"Cannot update metadata for \"{identifier}\" it is not in the repo.")
 
         self._metadata[identifier] = metadata
 
+        if(self._subscriptions):
+            self._emit(EVENT_UPDATE_METADATA, [identifier], None, [metadata])
+
     def remove(self, identifier: Identifier):
         """
         Remove the corresponding data and metadata from the repository.
@@ -67,12 +193,19 @@ class DataRepository():
         Raises:
             ValueError: The identifier is not in the repository.
         """
-        if(not self.contains(identifier)):
+        if(identifier not in self._data):
             raise ValueError(f"Cannot remove data for \"{identifier}\" it is not in the repo.")
 
-        self._data.pop(identifier)
-        if(identifier in self._metadata):
-            self._metadata.pop(identifier)
+        if(self._subscriptions):
+            # Read before the scalar store lets go of it
+            removed_data = self._scalars.get(identifier) if self._data[identifier] is STORED_SCALAR else self._data[identifier]
+
+        data = self._data.pop(identifier)
+        self._scalars.remove(identifier, data is STORED_SCALAR)
+        metadata = self._metadata.pop(identifier, None)
+
+        if(self._subscriptions):
+            self._emit(EVENT_REMOVE, [identifier], [removed_data], [metadata])
 
     def contains(self, identifier: Identifier) -> bool:
         """
@@ -83,7 +216,10 @@ class DataRepository():
         Returns:
             bool: Contains status.
         """
-        return identifier in self._data.keys()
+        contained = identifier in self._data
+        if(self.stats is not None):
+            self.stats.record_lookup("contains", contained)
+        return contained
 
     def get(self, identifier: Identifier) -> tuple[object, dict]:
         """
@@ -97,7 +233,7 @@ class DataRepository():
         Raises:
             KeyError: The identifier is not in the repository.
         """
-        if(not self.contains(identifier)):
+        if(identifier not in self._data):
             raise KeyError(f"Cannot get data/metadata for \"{identifier}\" it is not in the repo.")
 
         return (self.get_data(identifier), self.get_metadata(identifier))
@@ -113,10 +249,45 @@ class DataRepository():
         Raises:
             KeyError: The identifier is not in the repository.
         """
-        if(not self.contains(identifier)):
+        contained = identifier in self._data
+        if(self.stats is not None):
+            self.stats.record_lookup("get_data", contained)
+
+        if(not contained):
             raise KeyError(f"Cannot get data for \"{identifier}\" it is not in the repo.")
 
-        return self._data[identifier]
+        data = self._data[identifier]
+        if(data is STORED_SCALAR):
+            return self._scalars.get(identifier)
+        return data
+
+    def get_data_view(self, identifier: Identifier) -> object:
+        """
+        Get a read-only view of the corresponding data object. DataFrames and Series share memory
+          with the stored object and copy on write, NumPy arrays can't be written to, so the view
+          can be used freely without changing the stored result. Prefer this over get_data when
+          the data is only read.
+
+        Args:
+            identifier (Identifier): The identifier for the data and metadata.
+        Returns:
+            object: The read-only view of the data object.
+        Raises:
+            KeyError: The identifier is not in the repository.
+        """
+        return get_read_only_view(self.get_data(identifier))
+
+    def get_view(self, identifier: Identifier) -> tuple[object, dict]:
+        """
+        Get a read-only view of the data and metadata as a tuple, see get_data_view. The metadata
+          is a read-only mapping.
+
+        Returns:
+            tuple[object, MappingProxyType]: The data/metadata view tuple.
+        Raises:
+            KeyError: The identifier is not in the repository.
+        """
+        return (self.get_data_view(identifier), get_read_only_metadata(self.get_metadata(identifier)))
 
     def get_metadata(self, identifier: Identifier) -> dict:
         """
@@ -129,7 +300,7 @@ class DataRepository():
         Raises:
             KeyError: The identifier is not in the repository.
         """
-        if(not self.contains(identifier)):
+        if(identifier not in self._data):
             raise KeyError(f"Cannot get metadata for \"{identifier}\" it is not in the repo.")
         if(identifier not in self._metadata.keys()):
             self._metadata[identifier] = {}
@@ -159,13 +330,45 @@ class DataRepository():
         if(operation is None):
             raise ValueError("Operation cannot be None.")
 
+        if(self.stats is not None):
+            start = time.perf_counter()
+
         out_list = []
         for identifier in self._data.keys():
             if(operation(identifier)):
                 out_list.append(identifier)
 
+        if(self.stats is not None):
+            self.stats.record_filter(sys._getframe(1), operation, len(self._data), len(out_list), time.perf_counter()-start)
+
         return out_list
 
+    def get_scalar_vectors(self, analysis_name: str, periods: list[tuple[int, int]], key_method=None):
+        """
+        Read the scalar results of an analysis as vectors over periods, one vector per key. This
+          reads the analysis' column in one pass instead of resolving each period and key.
+
+        Args:
+            analysis_name (str): The analysis to read.
+            periods (list[tuple[int, int]]): The (start_ts, end_ts) periods, in vector order.
+            key_method (Callable[[Identifier], object]): Groups the results by key, None puts
+                every result under the None key.
+        Returns:
+            dict[object, tuple[np.ndarray, np.ndarray]]: Each key's float64 values and a mask of
+                the periods that have a non-None result. None if the analysis has results that
+                aren't scalars, those have to be read with get_data.
+        """
+        if(self.stats is not None):
+            start = time.perf_counter()
+
+        vectors = self._scalars.get_vectors(analysis_name, periods, key_method)
+
+        if(self.stats is not None and vectors is not None):
+            column = self._scalars.columns.get(analysis_name)
+            self.stats.record_filter(sys._getframe(1), self.get_scalar_vectors, 0 if column is None else column.count, len(vectors), time.perf_counter()-start)
+
+        return vectors
+
     def count(self):
         return len(self._data.keys())
     
@@ -183,14 +386,29 @@ class DataRepository():
         if not isinstance(other_repo, DataRepository):
             raise TypeError("Expected other_repo to be an instance of DataRepository.")
 
-        overlapping_ids = [id_ for id_ in other_repo.get_ids() if self.contains(id_)]
+        overlapping_ids = [id_ for id_ in other_repo.get_ids() if id_ in self._data]
         if overlapping_ids:
             overlap_str = "\n  ".join(str(id_) for id_ in overlapping_ids)
             raise ValueError(f"Cannot join repositories. The following identifiers already exist:\n  {overlap_str}")
         
-        for id_ in other_repo.get_ids():
-            data, metadata = other_repo.get(id_)
-            self.add(id_, data, metadata)
+        # The other repository is read directly, get would count its lookups in the stats merged
+        #   below and create empty metadata for every identifier
+        joined = ([], [], []) if self._subscriptions else None
+        for id_, data in other_repo._data.items():
+            if(data is STORED_SCALAR):
+                data = other_repo._scalars.get(id_)
+            metadata = other_repo._metadata.get(id_)
+            self._add(id_, data, metadata)
+            if(joined is not None):
+                for values, value in zip(joined, (id_, data, metadata)):
+                    values.append(value)
+
+        # One event for every joined identifier
+        if(joined is not None and len(joined[0]) > 0):
+            self._emit(EVENT_JOIN, *joined)
+
+        if(self.stats is not None and other_repo.stats is not None):
+            self.stats.merge(other_repo.stats)
 
     def print_contents(self, include_metadata=False, print_dfs=False):
         print("Summary of DataRepository:")
@@ -1,8 +1,109 @@
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from abc import ABC, ABCMeta, abstractmethod
+from dataclasses import dataclass, fields
+import functools
+import weakref
+
+# Every live identifier, keyed by its class and field values. See IdentifierMeta.
+_interned_identifiers = weakref.WeakValueDictionary()
+# The init field names of each identifier class, in constructor order.
+_identifier_field_names = {}
+
+def get_identifier_field_names(cls) -> tuple[str]:
+    """ Get the names of an identifier class' init fields, in the order its constructor takes them. """
+    if(cls not in _identifier_field_names):
+        _identifier_field_names[cls] = tuple([field.name for field in fields(cls) if field.init])
+    return _identifier_field_names[cls]
+
+def _get_value_type(value):
+    """ Get what tells apart field values that are equal but print differently, like 1, 1.0, and
+            numpy.int64(1). Identifiers are told apart by identity, equal identifiers with
+            different field types aren't the same object. """
+    value_type = type(value)
+    if(value_type is tuple):
+        return tuple([_get_value_type(item) for item in value])
+    if(type(value_type) is IdentifierMeta):
+        return id(value)
+    return value_type
+
+class IdentifierMeta(ABCMeta):
+    """
+    The IdentifierMeta interns identifiers. Constructing an identifier with the same class, field
+        values, and field value types as a live identifier returns the live identifier, so equal
+        identifiers are usually the same object and comparisons stop at the identity check. The
+        types are part of the key so an identifier made with 1.0 doesn't become the one made with
+        1, which would change its str() and fs_str().
+    """
+
+    def __call__(cls, *args, **kwargs):
+        identifier = super().__call__(*args, **kwargs)
+
+        values = [getattr(identifier, name) for name in get_identifier_field_names(cls)]
+        # The key holds the values, so identifiers keyed by id() stay alive while it's interned
+        key = (cls, *values, *[_get_value_type(value) for value in values])
+        try:
+            interned = _interned_identifiers.get(key)
+            if(interned is not None):
+                return interned
+
+            _interned_identifiers[key] = identifier
+        except TypeError:
+            # Unhashable field values can't be interned, the identifier still works on its own
+            pass
+
+        return identifier
+
+def _cache_hash(hash_method):
+    """ Wrap an identifier's __hash__ so it's only computed once per identifier. """
+    @functools.wraps(hash_method)
+    def cached_hash(self):
+        try:
+            return self._hash_cache
+        except AttributeError:
+            hash_value = hash_method(self)
+            object.__setattr__(self, "_hash_cache", hash_value)
+            return hash_value
+
+    cached_hash._identifier_wrapped = True
+    return cached_hash
+
+def _identity_eq(eq_method):
+    """ Wrap an identifier's __eq__ with an identity check, interned identifiers are usually equal
+            because they are the same object. """
+    @functools.wraps(eq_method)
+    def identity_eq(self, other):
+        if(self is other):
+            return True
+        return eq_method(self, other)
+
+    identity_eq._identifier_wrapped = True
+    return identity_eq
 
 @dataclass(frozen=True)
-class Identifier(ABC):
+class Identifier(ABC, metaclass=IdentifierMeta):
+    """
+    The base of every identifier. Subclasses are frozen dataclasses that define __hash__, __eq__,
+        and __str__; the hash is cached after its first use and __eq__ checks identity first, so
+        subclasses only have to describe their fields. Identifiers are interned by IdentifierMeta.
+    """
+    __slots__ = ("_hash_cache", "_base_cache", "__weakref__")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # dataclass(slots=True) creates the class again, the methods are already wrapped then
+        hash_method = cls.__dict__.get("__hash__")
+        if(hash_method is not None and not getattr(hash_method, "_identifier_wrapped", False)):
+            cls.__hash__ = _cache_hash(hash_method)
+
+        eq_method = cls.__dict__.get("__eq__")
+        if(eq_method is not None and not getattr(eq_method, "_identifier_wrapped", False)):
+            cls.__eq__ = _identity_eq(eq_method)
+
+    def __reduce__(self):
+        # Rebuild from the field values so unpickled identifiers are interned and rehashed in the
+        #   receiving process, string hashes differ between processes.
+        return (type(self), tuple([getattr(self, name) for name in get_identifier_field_names(type(self))]))
+
     @abstractmethod
     def __hash__(self) -> int:
         pass
@@ -18,7 +119,7 @@ class Identifier(ABC):
     def fs_str(self) -> str:
         return str(self).replace("/", "_")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TimeStampIdentifier(Identifier):
     """
     Identifier for a time range.
@@ -35,7 +136,7 @@ class TimeStampIdentifier(Identifier):
     def __str__(self) -> str:
         return f"timestamps {self.start_ts}-{self.end_ts}"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AnalysisIdentifier(Identifier):
     """
     Identifier for an anlysis of something else, can either be a SourceIdentifier or another
@@ -65,38 +166,46 @@ class AnalysisIdentifier(Identifier):
         """
         Find the base identifier for this analysis (follow the AnalysisIdentifier.on tree until 
           root is found). This is necessary as there can be multiple nested AnalysisIdentifiers.
+          The base is cached after the first call.
 
         Returns:
             Identifier: The base identifier that this analysis is based off of.
         """
+        try:
+            return self._base_cache
+        except AttributeError:
+            pass
+
         on = self.on
         while(on is not None and isinstance(on, AnalysisIdentifier)):
             on = on.on
 
+        object.__setattr__(self, "_base_cache", on)
         return on
     
-@dataclass(frozen=True)
+# Slotted dataclasses are recreated, so zero argument super() can't be used in their methods
+@dataclass(frozen=True, slots=True)
 class MetaAnalysisIdentifier(AnalysisIdentifier):
     key: str
 
     def __hash__(self) -> int:
-        return hash((super().__hash__(), self.key))
+        return hash((self.on, self.analysis, self.key))
 
     def __eq__(self, other) -> bool:
-        return isinstance(other, MetaAnalysisIdentifier) and super().__eq__(other) and self.key == other.key
+        return isinstance(other, MetaAnalysisIdentifier) and self.on == other.on and self.analysis == other.analysis and self.key == other.key
 
     def __str__(self) -> str:
         return f"{self.analysis}-{self.key}({self.on})"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AggregateAnalysisIdentifier(AnalysisIdentifier):
     key: str
 
     def __hash__(self) -> int:
-        return hash((super().__hash__(), self.key))
+        return hash((self.on, self.analysis, self.key))
 
     def __eq__(self, other) -> bool:
-        return isinstance(other, AggregateAnalysisIdentifier) and super().__eq__(other) and self.key == other.key
+        return isinstance(other, AggregateAnalysisIdentifier) and self.on == other.on and self.analysis == other.analysis and self.key == other.key
 
     def __str__(self) -> str:
         return f"{self.analysis}-{self.key}"
\ No newline at end of file
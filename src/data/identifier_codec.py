@@ -0,0 +1,341 @@
+""" A compact binary encoding for identifiers, used to move identifiers between processes or onto
+        disk without losing their type or fields the way str() does.
+
+    Layout of an encoded payload, integers are unsigned LEB128 varints:
+        magic b"AMID", format version byte
+        type count, then per type: name length, UTF-8 name, type version
+        node count, then per node: type index, then each init field as a tagged value
+        root count, then per root: node index
+
+    Each unique identifier is a node and is written once, identifiers that share an .on subtree
+        reference the same node. Strings are written once and referenced by index afterwards.
+
+    Numbers are written by kind instead of by type: every numbers.Integral, like numpy.int64, is
+        written as an int and every other numbers.Real, like numpy.float32, as a float. They decode
+        as Python ints and floats, which compare and hash equal to the values that were encoded.
+"""
+import numbers
+import struct
+
+from src.data.identifier import Identifier, TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier, AggregateAnalysisIdentifier, get_identifier_field_names
+
+CODEC_MAGIC = b"AMID"
+CODEC_FORMAT_VERSION = 1
+
+# Value tags
+_TAG_NONE = 0
+_TAG_FALSE = 1
+_TAG_TRUE = 2
+_TAG_INT = 3
+_TAG_FLOAT = 4
+_TAG_NEW_STR = 5
+_TAG_STR_REF = 6
+_TAG_IDENTIFIER = 7
+_TAG_TUPLE = 8
+
+_FLOAT_STRUCT = struct.Struct("<d")
+# Field value types that can't contain identifiers
+_PLAIN_TYPES = {str, int, float, bool, type(None)}
+
+# Registered names and versions, see register_identifier_type.
+_type_by_name = {}
+_name_by_type = {}
+_version_by_name = {}
+
+def register_identifier_type(identifier_type: type, name: str, version: int = 1):
+    """
+    Register an identifier type with the codec under a stable name. Unregistered types are encoded
+        with their module and qualified name instead, which only decodes in a process that loaded
+        the same module.
+
+    Args:
+        identifier_type (type): The Identifier subclass.
+        name (str): The name written into encoded payloads.
+        version (int): Bump this when the type's init fields change, payloads with another
+            version fail to decode instead of decoding into the wrong fields.
+    Raises:
+        ValueError: The type isn't an Identifier, or the name is taken by another type.
+    """
+    if(not isinstance(identifier_type, type) or not issubclass(identifier_type, Identifier)):
+        raise ValueError(f"Can't register \"{identifier_type}\" with the identifier codec, it is not a subclass of Identifier.")
+    if(name in _type_by_name and _type_by_name[name] is not identifier_type):
+        raise ValueError(f"Can't register \"{identifier_type.__qualname__}\" as \"{name}\", the name is already registered to {_type_by_name[name]}.")
+
+    _type_by_name[name] = identifier_type
+    _name_by_type[identifier_type] = name
+    _version_by_name[name] = version
+
+def get_type_name(identifier_type: type):
+    """ Get the name an identifier type is encoded with. """
+    if(identifier_type in _name_by_type):
+        return _name_by_type[identifier_type]
+    return f"{identifier_type.__module__}:{identifier_type.__qualname__}"
+
+def get_type_by_name(name: str):
+    """
+    Get the identifier type for an encoded name.
+
+    Raises:
+        ValueError: No loaded identifier type has the name.
+    """
+    if(name in _type_by_name):
+        return _type_by_name[name]
+
+    # Unregistered types are found by walking the loaded Identifier subclasses
+    pending = list(Identifier.__subclasses__())
+    while(len(pending) > 0):
+        identifier_type = pending.pop()
+        if(f"{identifier_type.__module__}:{identifier_type.__qualname__}" == name):
+            _type_by_name[name] = identifier_type
+            return identifier_type
+        pending.extend(identifier_type.__subclasses__())
+
+    raise ValueError(f"Can't decode identifier type \"{name}\", it isn't registered or loaded in this process.")
+
+#region Encoding
+def _write_varint(out: bytearray, value: int):
+    if(value < 0x80):
+        out.append(value)
+        return
+    while(value > 0x7F):
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+class _Encoder():
+    def __init__(self):
+        self.types = {}
+        self.strings = {}
+        self.nodes = {}
+        self.node_bytes = bytearray()
+
+    def encode_node(self, identifier: Identifier) -> int:
+        """ Write the identifier and its children as nodes if they haven't been written, returning
+                the identifier's node index. Children are always written before their parents. """
+        if(identifier in self.nodes):
+            return self.nodes[identifier]
+
+        identifier_type = type(identifier)
+        field_values = [getattr(identifier, name) for name in get_identifier_field_names(identifier_type)]
+
+        # Write the child identifiers first so the node only references earlier nodes
+        for value in field_values:
+            self.encode_children(value)
+
+        if(identifier_type not in self.types):
+            self.types[identifier_type] = len(self.types)
+
+        _write_varint(self.node_bytes, self.types[identifier_type])
+        for value in field_values:
+            self.encode_value(value)
+
+        node_index = len(self.nodes)
+        self.nodes[identifier] = node_index
+        return node_index
+
+    def encode_children(self, value):
+        if(type(value) in _PLAIN_TYPES):
+            return
+        if(isinstance(value, Identifier)):
+            self.encode_node(value)
+        elif(isinstance(value, tuple)):
+            for item in value:
+                self.encode_children(item)
+
+    def encode_value(self, value):
+        out = self.node_bytes
+        # Exact type checks first, isinstance against the Identifier ABC is slow
+        value_type = type(value)
+        if(value_type is str):
+            if(value in self.strings):
+                out.append(_TAG_STR_REF)
+                _write_varint(out, self.strings[value])
+            else:
+                self.strings[value] = len(self.strings)
+                encoded = value.encode("utf-8")
+                out.append(_TAG_NEW_STR)
+                _write_varint(out, len(encoded))
+                out.extend(encoded)
+        elif(value is None):
+            out.append(_TAG_NONE)
+        elif(value is True):
+            out.append(_TAG_TRUE)
+        elif(value is False):
+            out.append(_TAG_FALSE)
+        elif(isinstance(value, numbers.Integral)):
+            value = int(value)
+            out.append(_TAG_INT)
+            # Zigzag so negative values stay small
+            _write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+        elif(isinstance(value, numbers.Real)):
+            out.append(_TAG_FLOAT)
+            out.extend(_FLOAT_STRUCT.pack(float(value)))
+        elif(isinstance(value, str)):
+            self.encode_value(str(value))
+        elif(isinstance(value, Identifier)):
+            out.append(_TAG_IDENTIFIER)
+            _write_varint(out, self.nodes[value])
+        elif(isinstance(value, tuple)):
+            out.append(_TAG_TUPLE)
+            _write_varint(out, len(value))
+            for item in value:
+                self.encode_value(item)
+        else:
+            raise ValueError(f"Can't encode identifier field value \"{value}\" of type {type(value).__name__}.")
+
+def encode_identifiers(identifiers) -> bytes:
+    """
+    Encode identifiers into a single payload, shared subtrees and repeated strings are written once.
+
+    Args:
+        identifiers (Iterable[Identifier]): The identifiers to encode.
+    Returns:
+        bytes: The encoded payload, decode it with decode_identifiers.
+    Raises:
+        ValueError: A field value can't be encoded, supported values are None, bool, integral and
+            real numbers (see the module docstring), str, tuples of those, and identifiers.
+    """
+    encoder = _Encoder()
+    roots = [encoder.encode_node(identifier) for identifier in identifiers]
+
+    out = bytearray(CODEC_MAGIC)
+    out.append(CODEC_FORMAT_VERSION)
+
+    _write_varint(out, len(encoder.types))
+    for identifier_type in encoder.types.keys():
+        name = get_type_name(identifier_type).encode("utf-8")
+        _write_varint(out, len(name))
+        out.extend(name)
+        _write_varint(out, _version_by_name.get(get_type_name(identifier_type), 1))
+
+    _write_varint(out, len(encoder.nodes))
+    out.extend(encoder.node_bytes)
+
+    _write_varint(out, len(roots))
+    for root in roots:
+        _write_varint(out, root)
+
+    return bytes(out)
+
+def encode_identifier(identifier: Identifier) -> bytes:
+    """ Encode a single identifier, see encode_identifiers. """
+    return encode_identifiers([identifier])
+#endregion
+
+#region Decoding
+class _Decoder():
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+        self.strings = []
+        self.nodes = []
+
+    def read_varint(self) -> int:
+        data = self.data
+        position = self.position
+
+        byte = data[position]
+        position += 1
+        value = byte & 0x7F
+        shift = 7
+        while(byte & 0x80):
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+        self.position = position
+        return value
+
+    def read_bytes(self, length: int) -> bytes:
+        start = self.position
+        self.position += length
+        if(self.position > len(self.data)):
+            raise ValueError("Can't decode identifiers, the payload is truncated.")
+        return self.data[start:self.position]
+
+    def read_value(self):
+        tag = self.data[self.position]
+        self.position += 1
+
+        if(tag == _TAG_STR_REF):
+            return self.strings[self.read_varint()]
+        elif(tag == _TAG_IDENTIFIER):
+            return self.nodes[self.read_varint()]
+        elif(tag == _TAG_INT):
+            value = self.read_varint()
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        elif(tag == _TAG_NEW_STR):
+            value = self.read_bytes(self.read_varint()).decode("utf-8")
+            self.strings.append(value)
+            return value
+        elif(tag == _TAG_NONE):
+            return None
+        elif(tag == _TAG_TRUE):
+            return True
+        elif(tag == _TAG_FALSE):
+            return False
+        elif(tag == _TAG_FLOAT):
+            return _FLOAT_STRUCT.unpack(self.read_bytes(_FLOAT_STRUCT.size))[0]
+        elif(tag == _TAG_TUPLE):
+            return tuple([self.read_value() for _ in range(self.read_varint())])
+
+        raise ValueError(f"Can't decode identifiers, unknown value tag {tag} at byte {self.position-1}.")
+
+def decode_identifiers(data: bytes) -> list[Identifier]:
+    """
+    Decode a payload made by encode_identifiers.
+
+    Args:
+        data (bytes): The encoded payload.
+    Returns:
+        list[Identifier]: The identifiers, in the order they were encoded. Decoded identifiers are
+            interned like constructed ones.
+    Raises:
+        ValueError: The payload is malformed, was made by another format version, or has a type
+            that isn't loaded or has another version.
+    """
+    if(len(data) <= len(CODEC_MAGIC) or data[:len(CODEC_MAGIC)] != CODEC_MAGIC):
+        raise ValueError("Can't decode identifiers, the payload doesn't start with the codec magic bytes.")
+    if(data[len(CODEC_MAGIC)] != CODEC_FORMAT_VERSION):
+        raise ValueError(f"Can't decode identifiers, the payload has format version {data[len(CODEC_MAGIC)]} and this codec reads version {CODEC_FORMAT_VERSION}.")
+
+    decoder = _Decoder(data)
+    decoder.position = len(CODEC_MAGIC)+1
+
+    try:
+        return _decode_payload(decoder)
+    except IndexError:
+        raise ValueError("Can't decode identifiers, the payload is truncated.")
+
+def _decode_payload(decoder: _Decoder):
+    types = []
+    for _ in range(decoder.read_varint()):
+        name = decoder.read_bytes(decoder.read_varint()).decode("utf-8")
+        version = decoder.read_varint()
+        identifier_type = get_type_by_name(name)
+
+        registered_version = _version_by_name.get(name, 1)
+        if(version != registered_version):
+            raise ValueError(f"Can't decode identifier type \"{name}\" version {version}, the loaded type is version {registered_version}.")
+
+        types.append((identifier_type, len(get_identifier_field_names(identifier_type))))
+
+    for _ in range(decoder.read_varint()):
+        identifier_type, field_count = types[decoder.read_varint()]
+        decoder.nodes.append(identifier_type(*[decoder.read_value() for _ in range(field_count)]))
+
+    return [decoder.nodes[decoder.read_varint()] for _ in range(decoder.read_varint())]
+
+def decode_identifier(data: bytes) -> Identifier:
+    """ Decode a payload made by encode_identifier. """
+    identifiers = decode_identifiers(data)
+    if(len(identifiers) != 1):
+        raise ValueError(f"Expected a single identifier in the payload, found {len(identifiers)}.")
+    return identifiers[0]
+#endregion
+
+register_identifier_type(TimeStampIdentifier, "TimeStampIdentifier")
+register_identifier_type(AnalysisIdentifier, "AnalysisIdentifier")
+register_identifier_type(MetaAnalysisIdentifier, "MetaAnalysisIdentifier")
+register_identifier_type(AggregateAnalysisIdentifier, "AggregateAnalysisIdentifier")
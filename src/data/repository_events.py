@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+import queue
+
+from src.data.identifier import Identifier
+from src.data.views import get_read_only_view
+
+EVENT_ADD = "add"
+EVENT_UPDATE_DATA = "update_data"
+EVENT_UPDATE_METADATA = "update_metadata"
+EVENT_REMOVE = "remove"
+EVENT_JOIN = "join"
+REPOSITORY_EVENTS = frozenset({EVENT_ADD, EVENT_UPDATE_DATA, EVENT_UPDATE_METADATA, EVENT_REMOVE, EVENT_JOIN})
+
+# Not compared, the data can hold DataFrames
+@dataclass(frozen=True, slots=True, eq=False)
+class RepositoryEvent:
+    """ A change to a DataRepository. Every kind of event holds a list of identifiers, a join is
+            one event for all of the identifiers it added. """
+    kind: str
+    """ One of the EVENT_ constants. """
+    identifiers: list[Identifier]
+    data: list[object]
+    """ A read-only view of each identifier's data, see get_read_only_view. The new data for add,
+            join, and update_data, the removed data for remove, and None for update_metadata. """
+    metadata: list[dict]
+    """ Each identifier's metadata, None for update_data and for identifiers added without any. """
+
+    def __iter__(self):
+        """ Iterate the (identifier, data, metadata) of each changed identifier. """
+        return zip(self.identifiers, self.data, self.metadata)
+
+class RepositorySubscription():
+    """
+    A subscription to a DataRepository's events, made with DataRepository.subscribe. The callback
+        is called with a list of events on the thread that changed the repository, usually a list
+        of one; events made inside of DataRepository.batch_events arrive in one list when it ends.
+        Events only hold the identifiers that satisfy the subscription's filter.
+    """
+
+    def __init__(self, kinds: set[str], operation, callback):
+        """
+        Args:
+            kinds (set[str]): The EVENT_ kinds to receive, None for every kind.
+            operation (function): The filter operation, like the ones passed to filter_ids. None
+                receives every identifier.
+            callback (function): Called with each batch of events.
+        Raises:
+            ValueError: One of the kinds isn't a repository event.
+        """
+        kinds = REPOSITORY_EVENTS if kinds is None else frozenset(kinds)
+        if(not kinds <= REPOSITORY_EVENTS):
+            raise ValueError(f"Unknown repository event(s) {", ".join(sorted(kinds - REPOSITORY_EVENTS))}, the choices are: {", ".join(sorted(REPOSITORY_EVENTS))}")
+
+        self.kinds = kinds
+        self.operation = operation
+        self.callback = callback
+
+    def filter_event(self, kind: str, identifiers: list, data: list, metadata: list) -> RepositoryEvent:
+        """ Make the event this subscription receives for a change, None when it doesn't receive
+                the change. data and metadata may be None for every identifier. """
+        if(kind not in self.kinds):
+            return None
+
+        if(self.operation is None):
+            indices = range(len(identifiers))
+        else:
+            indices = [index for index, identifier in enumerate(identifiers) if self.operation(identifier)]
+            if(len(indices) == 0):
+                return None
+
+        return RepositoryEvent(
+            kind,
+            [identifiers[index] for index in indices],
+            [None if data is None else get_read_only_view(data[index]) for index in indices],
+            [None if metadata is None else metadata[index] for index in indices]
+        )
+
+    def deliver(self, events: list[RepositoryEvent]):
+        self.callback(events)
+
+    def close(self):
+        """ Called by DataRepository.unsubscribe, nothing is delivered afterwards. """
+        pass
+
+class QueuedSubscription(RepositorySubscription):
+    """
+    A subscription that queues its events instead of calling back, made with
+        DataRepository.subscribe_queue. The repository's thread only pays for putting the event on
+        the queue, another thread reads the events in batches with get_batch or by iterating the
+        subscription until it's closed by DataRepository.unsubscribe.
+    """
+
+    # Put on the queue by close(), ends the iteration
+    _CLOSED = object()
+
+    def __init__(self, kinds: set[str], operation):
+        super().__init__(kinds, operation, None)
+        self._queue = queue.SimpleQueue()
+        self.closed = False
+
+    def deliver(self, events: list[RepositoryEvent]):
+        for event in events:
+            self._queue.put(event)
+
+    def close(self):
+        # The events queued before it are still read
+        self._queue.put(self._CLOSED)
+
+    def get_batch(self, timeout: float = None) -> list[RepositoryEvent]:
+        """
+        Wait for at least one event and take every event that's queued.
+
+        Args:
+            timeout (float): The seconds to wait for an event, None waits until one arrives.
+        Returns:
+            list[RepositoryEvent]: The events in the order they happened, empty on a timeout or
+                once the subscription is closed and every event was read.
+        """
+        if(self.closed):
+            return []
+
+        try:
+            event = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+        batch = []
+        while(True):
+            # Nothing is delivered after close
+            if(event is self._CLOSED):
+                self.closed = True
+                break
+
+            batch.append(event)
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch
+
+    def __iter__(self):
+        """ Iterate the batches of events until the subscription is closed. """
+        while(len(batch := self.get_batch()) > 0):
+            yield batch
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+import os
+import threading
+
+class RepositoryStats():
+    """
+    RepositoryStats counts how a DataRepository is accessed. filter_ids calls are grouped by the
+        context (usually the analysis that is running), the call site that called filter_ids, and
+        the filter that was applied, so expensive lambdas can be traced back to the plugin that
+        defined them. get_data and contains calls are counted as hits and misses per context.
+        The context is kept per thread, so accesses from stream or saver threads aren't charged
+        to the analysis the main thread is running.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self.filters = {}
+        self.lookups = {}
+
+    def __getstate__(self):
+        # Thread locals can't be pickled, an unpickled RepositoryStats starts without a context
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def context(self):
+        """ The context of the calling thread, see in_context. """
+        return getattr(self._local, "context", None)
+
+    @context.setter
+    def context(self, context: str):
+        self._local.context = context
+
+    @contextmanager
+    def in_context(self, context: str):
+        """ Attribute the accesses the calling thread makes inside of the context to context, like
+                an analysis name. """
+        previous = self.context
+        self.context = context
+        try:
+            yield
+        finally:
+            self.context = previous
+
+    def record_filter(self, caller_frame, operation, scanned: int, matched: int, seconds: float):
+        """
+        Record a scan of the repository, a filter_ids, resolve_analysis, or get_scalar_vectors call.
+
+        Args:
+            caller_frame (frame): The frame that called filter_ids or resolve_analysis.
+            operation (Callable): The filter that was applied.
+            scanned (int): The amount of identifiers the filter was applied to.
+            matched (int): The amount of identifiers the filter returned True for.
+            seconds (float): The time the call took.
+        """
+        key = (self.context, get_frame_location(caller_frame), get_callable_location(operation))
+        if(key not in self.filters):
+            self.filters[key] = {"calls": 0, "scanned": 0, "matched": 0, "seconds": 0.0}
+
+        filter_stats = self.filters[key]
+        filter_stats["calls"] += 1
+        filter_stats["scanned"] += scanned
+        filter_stats["matched"] += matched
+        filter_stats["seconds"] += seconds
+
+    def record_lookup(self, method: str, hit: bool):
+        """ Record a get_data or contains call, hit is whether the identifier was in the repository. """
+        key = (self.context, method)
+        if(key not in self.lookups):
+            self.lookups[key] = {"hits": 0, "misses": 0}
+
+        self.lookups[key]["hits" if hit else "misses"] += 1
+
+    def merge(self, other):
+        """ Add the counts from another RepositoryStats, like one from a shard's repository. """
+        for key, other_stats in other.filters.items():
+            if(key not in self.filters):
+                self.filters[key] = dict(other_stats)
+                continue
+            for stat, value in other_stats.items():
+                self.filters[key][stat] += value
+
+        for key, other_stats in other.lookups.items():
+            if(key not in self.lookups):
+                self.lookups[key] = dict(other_stats)
+                continue
+            for stat, value in other_stats.items():
+                self.lookups[key][stat] += value
+
+    def to_dict(self):
+        """ Get the stats as a JSON serializable dictionary. """
+        return {
+            "filters": [
+                {"context": context, "call_site": call_site, "filter": filter_location, **filter_stats}
+                for (context, call_site, filter_location), filter_stats in self.filters.items()
+            ],
+            "lookups": [
+                {"context": context, "method": method, **lookup_stats}
+                for (context, method), lookup_stats in self.lookups.items()
+            ]
+        }
+
+    def print_report(self, limit=15):
+        """ Print the filters that took the longest, then the lookups for each context. """
+        filters = sorted(self.filters.items(), key=lambda item: item[1]["seconds"], reverse=True)
+
+        total_calls = sum([filter_stats["calls"] for filter_stats in self.filters.values()])
+        total_scanned = sum([filter_stats["scanned"] for filter_stats in self.filters.values()])
+        print(f"Repository access: {total_calls} scan(s) of {total_scanned} identifier(s) by filter_ids, resolve_analysis, and get_scalar_vectors.")
+
+        if(len(filters) > 0):
+            print(f"Slowest filters:")
+        for (context, call_site, filter_location), filter_stats in filters[:limit]:
+            calls = filter_stats["calls"]
+            match_percent = filter_stats["matched"] / filter_stats["scanned"] * 100 if filter_stats["scanned"] > 0 else 0
+            print(f"  {context or "(no analysis)"}: {filter_stats["seconds"]*1000:.2f}ms, {calls} call(s), {filter_stats["scanned"]/calls:.0f} scanned/call, {match_percent:.1f}% matched")
+            print(f"    filter {filter_location} called from {call_site}")
+
+        if(len(filters) > limit):
+            print(f"  ...{len(filters)-limit} more")
+
+        if(len(self.lookups) > 0):
+            print(f"Lookups:")
+        for (context, method), lookup_stats in sorted(self.lookups.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            print(f"  {context or "(no analysis)"} {method}: {lookup_stats["hits"]} hit(s), {lookup_stats["misses"]} miss(es)")
+
+def get_frame_location(frame):
+    """ Get a "function (file:line)" string for a frame. """
+    if(frame is None):
+        return "unknown"
+    return f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+def get_callable_location(method):
+    """ Get a "name (file:line)" string for where a callable was defined. """
+    code = getattr(method, "__code__", None)
+    if(code is None):
+        return type(method).__name__
+    return f"{getattr(method, "__qualname__", code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
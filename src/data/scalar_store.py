@@ -0,0 +1,167 @@
+import numpy as np
+
+from src.data.identifier import Identifier, AnalysisIdentifier, TimeStampIdentifier
+
+# The scalar types kept in the ScalarStore, a value's type code is its index in the tuple.
+#   Values are rebuilt with their original type so get_data returns what the analysis returned.
+SCALAR_TYPES = (float, np.float64, int, np.int64, type(None))
+_SCALAR_TYPE_CODES = {scalar_type: code for code, scalar_type in enumerate(SCALAR_TYPES)}
+_NONE_CODE = _SCALAR_TYPE_CODES[type(None)]
+# Integers with a larger magnitude don't fit in a float64 exactly, they stay in the dictionary
+_MAX_EXACT_INT = 2**53
+_INITIAL_CAPACITY = 64
+
+class _StoredScalar():
+    """ Placeholder kept in the DataRepository's data dictionary for values held by the ScalarStore. """
+    def __repr__(self):
+        return "STORED_SCALAR"
+
+    def __reduce__(self):
+        # Unpickle as the module's instance so identity checks keep working in worker processes
+        return "STORED_SCALAR"
+
+STORED_SCALAR = _StoredScalar()
+
+class ScalarColumn():
+    """
+    The stored scalars of one analysis, one row per identifier in the order they were added. The
+        base of each row is kept next to its value so a whole analysis can be read as vectors, its
+        exact start_ts and end_ts are compared, float timestamps included.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.values = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self.type_codes = np.empty(_INITIAL_CAPACITY, dtype=np.uint8)
+        # The identifier of each row, None once the row is removed
+        self.identifiers = []
+        # The TimeStampIdentifier each row is based on, shared with the repository
+        self.bases = []
+        self.rows = {}
+
+    def append(self, identifier: AnalysisIdentifier, base: TimeStampIdentifier, value, type_code: int):
+        if(self.count == len(self.values)):
+            capacity = len(self.values)*2
+            self.values = np.resize(self.values, capacity)
+            self.type_codes = np.resize(self.type_codes, capacity)
+
+        row = self.count
+        self.values[row] = np.nan if type_code == _NONE_CODE else value
+        self.type_codes[row] = type_code
+        self.identifiers.append(identifier)
+        self.bases.append(base)
+        self.rows[identifier] = row
+        self.count += 1
+
+    def get(self, identifier: AnalysisIdentifier):
+        row = self.rows[identifier]
+        type_code = self.type_codes[row]
+        if(type_code == _NONE_CODE):
+            return None
+        return SCALAR_TYPES[type_code](self.values[row])
+
+    def remove(self, identifier: AnalysisIdentifier):
+        row = self.rows.pop(identifier)
+        self.identifiers[row] = None
+        self.bases[row] = None
+
+class ScalarStore():
+    """
+    The ScalarStore holds numeric analysis results in columns of NumPy arrays instead of one
+        Python object per result, one ScalarColumn per analysis. Results are stored when their
+        identifier is an AnalysisIdentifier based on a TimeStampIdentifier and the result is a
+        float, int, NumPy float64/int64, or None. The DataRepository keeps the identifier and
+        reads stored values from here, so get_data works the same for stored results.
+    """
+
+    def __init__(self):
+        self.columns: dict[str, ScalarColumn] = {}
+        # The amount of identifiers per analysis that are in the repository but not in the store,
+        #   bulk reads only work for analyses that are fully stored.
+        self.unstored_counts = {}
+
+    def try_add(self, identifier: Identifier, data) -> bool:
+        """ Store the data if it's a scalar result of a period, returning True if it was stored.
+                Non-stored analysis results are counted so bulk reads know to fall back. """
+        if(not isinstance(identifier, AnalysisIdentifier)):
+            return False
+
+        type_code = _SCALAR_TYPE_CODES.get(type(data))
+        base = identifier.find_base()
+        if(type_code is None or not isinstance(base, TimeStampIdentifier) or (isinstance(data, (int, np.int64)) and abs(int(data)) > _MAX_EXACT_INT)):
+            self.unstored_counts[identifier.analysis] = self.unstored_counts.get(identifier.analysis, 0)+1
+            return False
+
+        if(identifier.analysis not in self.columns):
+            self.columns[identifier.analysis] = ScalarColumn()
+        self.columns[identifier.analysis].append(identifier, base, data, type_code)
+        return True
+
+    def get(self, identifier: AnalysisIdentifier):
+        return self.columns[identifier.analysis].get(identifier)
+
+    def remove(self, identifier: Identifier, stored: bool):
+        """ Remove an identifier that was added with try_add, stored is what try_add returned. """
+        if(not isinstance(identifier, AnalysisIdentifier)):
+            return
+
+        if(stored):
+            self.columns[identifier.analysis].remove(identifier)
+        else:
+            self.unstored_counts[identifier.analysis] -= 1
+
+    def get_vectors(self, analysis_name: str, periods: list[tuple[int, int]], key_method=None):
+        """
+        Read an analysis as vectors over periods, one vector per key.
+
+        Args:
+            analysis_name (str): The analysis to read.
+            periods (list[tuple[int, int]]): The (start_ts, end_ts) periods, in vector order. A
+                result is on a period when its base's timestamps equal the period's.
+            key_method (Callable[[Identifier], object]): Groups the results by key, None puts
+                every result under the None key.
+        Returns:
+            dict[object, tuple[np.ndarray, np.ndarray]]: Each key's float64 values and a mask of
+                the periods that have a non-None result. When more than one result has the same
+                key and period, the first one added is used. None if some results of the
+                analysis aren't stored, the caller has to read those from the repository.
+        """
+        if(self.unstored_counts.get(analysis_name, 0) > 0):
+            return None
+
+        vectors = {}
+        if(analysis_name not in self.columns):
+            return vectors
+
+        column = self.columns[analysis_name]
+        period_indices = {period: index for index, period in enumerate(periods)}
+        # Filled tracks (key, period index) pairs that already have a result, even a None one
+        filled = set()
+
+        for row in range(column.count):
+            identifier = column.identifiers[row]
+            if(identifier is None):
+                continue
+
+            base = column.bases[row]
+            period_index = period_indices.get((base.start_ts, base.end_ts))
+            if(period_index is None):
+                continue
+
+            key = key_method(identifier) if key_method is not None else None
+            if((key, period_index) in filled):
+                continue
+            filled.add((key, period_index))
+
+            if(key not in vectors):
+                vectors[key] = (np.full(len(periods), np.nan), np.zeros(len(periods), dtype=bool))
+
+            if(column.type_codes[row] != _NONE_CODE):
+                values, found = vectors[key]
+                values[period_index] = column.values[row]
+                found[period_index] = True
+
+        return vectors
+
+    def get_stored_count(self):
+        return sum([len(column.rows) for column in self.columns.values()])
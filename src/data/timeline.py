@@ -57,6 +57,23 @@ class Timeline:
                 sub_periods.append(period)
         return sub_periods
 
+    def split_main_periods(self, count):
+        """ Split the main periods into at most count contiguous groups of (nearly) equal size.
+                Each group is returned as a single (start_ts, end_ts) tuple spanning its main
+                periods, so a Timeline built over that range has exactly those main periods.
+        """
+        count = max(1, min(count, self.get_period_count()))
+        group_size, remainder = divmod(self.get_period_count(), count)
+
+        groups = []
+        start_index = 0
+        for i in range(count):
+            end_index = start_index + group_size + (1 if i < remainder else 0)
+            groups.append((self.main_periods[start_index][0], self.main_periods[end_index-1][1]))
+            start_index = end_index
+
+        return groups
+
     def __str__(self):
         
         def ts_as_float(timestamp):
@@ -0,0 +1,38 @@
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+# Copy-on-write is the only mode from pandas 3 on, and its option is deprecated there
+PANDAS_ALWAYS_COPIES_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+def is_copy_on_write() -> bool:
+    """ Check if pandas copies DataFrames and Series on write. The "warn" mode of pandas 2.2 only
+            warns about writes that would change, it doesn't copy. """
+    return PANDAS_ALWAYS_COPIES_ON_WRITE or pd.options.mode.copy_on_write is True
+
+def get_read_only_view(data: object) -> object:
+    """
+    Get a view of data that can't change the original. With pandas copy-on-write enabled, see
+        main.py, DataFrames and Series are shallow copies that share memory until they're written
+        to, then the written columns are copied. NumPy arrays are views with writing disabled.
+        Other objects are returned as they are.
+
+    Args:
+        data (object): The data to view.
+    Returns:
+        object: The read-only view.
+    """
+    if(isinstance(data, (pd.DataFrame, pd.Series))):
+        # Without copy-on-write a shallow copy shares writes with the original, so copy it all
+        return data.copy(deep=not is_copy_on_write())
+
+    if(isinstance(data, np.ndarray)):
+        view = data.view()
+        view.flags.writeable = False
+        return view
+
+    return data
+
+def get_read_only_metadata(metadata: dict):
+    """ Get a read-only mapping over a metadata dictionary. """
+    return MappingProxyType(metadata)
@@ -0,0 +1,113 @@
+import json
+import os
+
+from src.data.data_repository import DataRepository
+from src.program_data import ProgramData
+
+def create_plan_repository(data_repo: DataRepository) -> DataRepository:
+    """ Create a repository with the same identifiers as data_repo but no data, explained analyses
+            add their placeholder outputs to it. """
+    plan_repo = DataRepository()
+    for identifier in data_repo.get_ids():
+        plan_repo.add(identifier, None)
+    return plan_repo
+
+def load_report_history(path: str):
+    """
+    Load a previous run's run_report.json, combining the entries of each analysis. Entries from
+        shards or backfill periods are summed.
+
+    Args:
+        path (str): The path to the run report.
+    Returns:
+        dict[str, dict]: The wall_seconds, rss_delta_mb, and identifiers_added of each analysis,
+            an empty dictionary if the report doesn't exist.
+    """
+    if(not os.path.isfile(path)):
+        return {}
+
+    with open(path, "r") as file:
+        report = json.load(file)
+
+    history = {}
+    for entry in report["entries"]:
+        if(entry["phase"] != "analysis"):
+            continue
+
+        analysis_history = history.setdefault(entry["name"], {"wall_seconds": 0.0, "rss_delta_mb": None, "identifiers_added": 0})
+        analysis_history["wall_seconds"] += entry["wall_seconds"]
+        analysis_history["identifiers_added"] += entry.get("identifiers_added", 0)
+        if(entry.get("rss_delta_mb") is not None):
+            analysis_history["rss_delta_mb"] = (analysis_history["rss_delta_mb"] or 0) + entry["rss_delta_mb"]
+
+    return history
+
+def predict_cost(plan, analysis_history: dict):
+    """
+    Predict the wall seconds and RSS delta of a planned analysis from its history, scaling
+        linearly by the amount of outputs. Analyses without outputs, like verifications, use the
+        historical values as is.
+
+    Returns:
+        tuple[float, float]: The predicted seconds and MB, each None when there is nothing to
+            predict from.
+    """
+    if(analysis_history is None):
+        return None, None
+
+    scale = 1
+    if(plan is not None and len(plan.outputs) > 0 and analysis_history["identifiers_added"] > 0):
+        scale = len(plan.outputs) / analysis_history["identifiers_added"]
+
+    seconds = analysis_history["wall_seconds"] * scale
+    memory = analysis_history["rss_delta_mb"] * scale if analysis_history["rss_delta_mb"] is not None else None
+    return seconds, memory
+
+def explain_analyses(prog_data: ProgramData, analysis_order: list, history: dict):
+    """
+    Print the estimated workload of each analysis without running it. Each driver's
+        explain_analysis is run against a plan repository that gets the placeholder outputs of
+        the analyses before it, so filters on earlier results count what the run would produce.
+
+    Args:
+        prog_data (ProgramData): The program data, prog_data.data_repo holds the ingested data.
+        analysis_order (list[Analysis]): The analyses, ordered by get_analysis_order.
+        history (dict): Previous analysis costs, see load_report_history.
+    Returns:
+        list[dict]: The estimate of each analysis.
+    """
+    plan_repo = create_plan_repository(prog_data.data_repo)
+
+    estimates = []
+    for analysis in analysis_order:
+        driver = prog_data.loaded_plugins.get_analysis_driver(type(analysis))
+        plan = driver.explain_analysis(analysis, plan_repo)
+
+        if(plan is not None):
+            for identifier in plan.outputs:
+                if(not plan_repo.contains(identifier)):
+                    plan_repo.add(identifier, None)
+
+        seconds, memory = predict_cost(plan, history.get(analysis.name))
+        estimates.append({"analysis": analysis.name, "driver": type(driver).__name__, "plan": plan, "seconds": seconds, "memory_mb": memory})
+
+        if(plan is None):
+            print(f"  {analysis.name} ({type(driver).__name__}): no estimate, the driver doesn't implement explain_analysis")
+            continue
+
+        cost_printable = ""
+        if(seconds is not None):
+            cost_printable = f", est. {seconds:.2f}s"
+        if(memory is not None):
+            cost_printable += f", {memory:+.1f} MB"
+
+        print(f"  {analysis.name} ({type(driver).__name__}): {plan.inputs} input(s) -> {len(plan.outputs)} output(s){cost_printable}")
+        print(f"    {plan.work}")
+
+    predicted = [estimate["seconds"] for estimate in estimates if estimate["seconds"] is not None]
+    if(len(history) == 0):
+        print("No run report history, run once without --explain to get time and memory estimates.")
+    else:
+        print(f"Estimated analysis time: {sum(predicted):.2f}s ({len(predicted)}/{len(estimates)} analyses have history)")
+
+    return estimates
@@ -2,181 +2,30 @@ import os
 import subprocess
 import sys
 import pandas as pd
-import traceback
 import time
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, project_root)
 
 from src.analysis import get_analysis_order
-from src.data.data_repository import DataRepository
 from src.parameter_utils import ConfigurationException
 from src.parameters import load_parameters
+from src.pipeline import run_ingest, run_analyses, run_savers, start_streams, get_base_path
 from src.plugin_mgmt.pluginloader import LoadedPlugins
 from src.program_data import ProgramData
+from src.sharding import run_sharded
+from src.backfill import run_backfill
+from src.explain import explain_analyses, load_report_history
+from src.data.views import PANDAS_ALWAYS_COPIES_ON_WRITE
+from src.utils.profiling import PROFILE_DIRECTORY
+from src.utils.run_report import RunReport, RUN_REPORT_FILENAME
+from src.utils.tracing import enable_tracing, get_tracer, span
 
 # Hides warnings for .fillna() calls
 pd.set_option('future.no_silent_downcasting', True)
-
-#region Initialization
-print("### Loading plugins...")
-
-plugins = LoadedPlugins()
-plugins.print_details()
-
-args, config = load_parameters()
-print()
-
-# Verify ConfigurablePlugin config sections
-print("Verifying config sections...")
-
-prog_data = ProgramData(plugins, args, config)
-prog_data.program_start_ts = time.time()
-
-successes = 0
-config_checks = 0
-# Join the set of allowed types with the types in config to safely loop
-for plugin_name in prog_data.loaded_plugins.loaded_plugin_names:
-    try:
-        plugin = prog_data.loaded_plugins.get_plugin_by_name(plugin_name)
-    except Exception as e:
-        print(e)
-        continue
-    
-    config_section = None
-    if(plugin_name in prog_data.config.keys()):
-        config_section = prog_data.config[plugin_name]
-    
-    config_checks += 1
-    try:
-        plugin.verify_config_section(config_section)
-        successes += 1
-    except ConfigurationException as e:
-        print(f"Failed to verify config section for plugin \"{plugin_name}\": {e}")
-        continue
-
-config_section = None # Clear from above use
-
-if(successes != config_checks):
-    print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!")
-    print(f"WARNING: {successes}/{config_checks} configs valid.")
-    print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!")
-else:
-    print(f"All configs valid.")
-
-print()
-
-analysis_order = get_analysis_order(prog_data)
-analysis_order_printable = ", ".join([analysis.name for analysis in analysis_order])
-
-print()
-#endregion
-
-print(f"""### Loaded:
-        \rTimeline:
-        \r{prog_data.timeline}
-        \r
-        \rAnalyses:
-        \r  {analysis_order_printable}
-        \r""")
-
-if(prog_data.args.verifyconfig):
-    print(f"Config verified, --verify-config set, exiting.")
-    exit()
-
-#region Ingest
-print("### Ingesting data...")
-prog_data.data_repo = DataRepository()
-
-for ingest_plugin_name in prog_data.config["ingest"]["run"]:
-    try:
-        ingest_plugin = prog_data.loaded_plugins.get_plugin_by_name(ingest_plugin_name)
-    except Exception as e:
-        print(f"Failed to run ingest plugin named \"{ingest_plugin_name}\". {e}")
-        continue
-
-    ingest_config_section = None
-    if(ingest_plugin_name in prog_data.config.keys()):
-        ingest_config_section = prog_data.config[ingest_plugin_name]
-
-    try:
-        ingested_repo = ingest_plugin.ingest(prog_data, ingest_config_section)
-        prog_data.data_repo.join(ingested_repo)
-    except Exception as e:
-        print(f"Ingest plugin \"{ingest_plugin_name}\" failed:")
-        traceback.print_exc()        
-        exit(2)
-
-print()
-
-if(args.verbose):
-    prog_data.data_repo.print_contents()
-#endregion
-
-#region Analysis
-print("### Analyzing...")
-
-for analysis in analysis_order:
-    driver = plugins.get_analysis_driver(type(analysis))
-
-    try:
-        config_section = prog_data.config[type(driver).__name__]
-    except KeyError as e:
-        # Check if the driver can handle not having config, if so we can skip passing it
-        if(driver.verify_config_section(None)):
-            config_section = None
-        else:
-            raise Exception(f"Analysis driver failed, it was expecting config but didn't get any. The driver \"{type(driver).__name__}\" is required because of analysis \"{analysis.name}\"")
-
-    try:
-        driver.run_analysis(analysis, prog_data, config_section)
-    except Exception as e:
-        print(f"Analysis driver plugin \"{type(driver).__name__}\" failed on analysis \"{analysis.name}\":")
-        traceback.print_exc()
-        exit(2)
-
-print()
-
-if(args.verbose):
-    prog_data.data_repo.print_contents()
-#endregion
-
-#region Saving
-print("### Saving...")
-base_path = "./latest_run"
-if("saving" in prog_data.config.keys() and "base-path" in prog_data.config["saving"].keys()):
-    base_path = prog_data.config["saving"]["base-path"]
-else:
-    print(f"WARNING: Using default base path \"{base_path}\" for saving.")
-
-all_saved_files = []
-for saver_name in prog_data.config["saving"]["run"]:
-    try:
-        saver_plugin = prog_data.loaded_plugins.get_plugin_by_name(saver_name)
-    except Exception as e:
-        print(f"Failed to run saver plugin named \"{saver_name}\". {e}")
-        continue
-
-    saver_config_section = None
-    if(saver_name in prog_data.config.keys()):
-        saver_config_section = prog_data.config[saver_name]
-    
-    specific_base_path = base_path
-    if(saver_config_section is not None and "addtl-base" in saver_config_section):
-        specific_base_path = os.path.join(base_path, saver_config_section["addtl-base"])
-
-    try:
-        saved_files = saver_plugin.save(prog_data, saver_config_section, specific_base_path)
-        if(saved_files is not None):
-            all_saved_files.extend(saved_files)
-    except Exception as e:
-        print(f"Saver plugin \"{saver_name}\" failed:")
-        traceback.print_exc()        
-        print("Continuing saving...")
-        continue
-
-print()
-#endregion
+# DataRepository views share memory with the stored DataFrames until they're written to
+if(not PANDAS_ALWAYS_COPIES_ON_WRITE):
+    pd.set_option('mode.copy_on_write', True)
 
 def open_file(path: str):
     if sys.platform.startswith("darwin"):  # macOS
@@ -187,22 +36,174 @@ def open_file(path: str):
         subprocess.run(["xdg-open", path])
     else:
         raise OSError(f"Unsupported platform: {sys.platform}")
-    
-if(args.exitaction == "openeach"):
-    print(f"Exit action: opening each saved file.")
-    for saved_file in all_saved_files:
-        open_file(saved_file)
-elif(args.exitaction == "opendir"):
-    print("Exit action: opening directory.")
-    open_file(os.path.abspath(base_path))
-
-try:
-    import psutil
-    psutil_available = True
-except ImportError:
-    psutil_available = False
-
-if(psutil_available):
-    process = psutil.Process(os.getpid())
-    memory_info = process.memory_info()
-    print(f"Memory usage: {memory_info.rss / (1024 * 1024):.2f} MB")
\ No newline at end of file
+
+def run(prog_data: ProgramData, analysis_order: list):
+    """ Run the ingest, analysis, and saving phases for a single period. Returns the saving base
+            path and the list of saved files. """
+    #region Ingest
+    remaining_analyses = analysis_order
+    if(prog_data.args.shards > 1):
+        print("### Ingesting and analyzing shards...")
+        remaining_analyses = run_sharded(prog_data, analysis_order, prog_data.args.shards)
+    else:
+        print("### Ingesting data...")
+        run_ingest(prog_data)
+
+    print()
+
+    if(prog_data.args.verbose):
+        prog_data.data_repo.print_contents()
+    #endregion
+
+    #region Analysis
+    print("### Analyzing...")
+
+    # Streaming savers write results while the analyses run, run_savers waits for them
+    start_streams(prog_data, get_base_path(prog_data, warn=False))
+    run_analyses(prog_data, remaining_analyses)
+
+    print()
+
+    if(prog_data.data_repo.stats is not None):
+        print("### Repository access:")
+        prog_data.data_repo.stats.print_report()
+        print()
+
+    if(prog_data.args.verbose):
+        prog_data.data_repo.print_contents()
+    #endregion
+
+    #region Saving
+    print("### Saving...")
+    base_path = get_base_path(prog_data)
+
+    all_saved_files = run_savers(prog_data, base_path)
+
+    print()
+    #endregion
+
+    return base_path, all_saved_files
+
+def main():
+    #region Initialization
+    # Parameters are loaded first so plugin loading can be traced
+    args, config = load_parameters()
+    if(args.trace is not None):
+        enable_tracing()
+
+    print("### Loading plugins...")
+
+    with span("Loading plugins", "plugin_load"):
+        plugins = LoadedPlugins()
+    plugins.print_details()
+    print()
+
+    # Verify ConfigurablePlugin config sections
+    print("Verifying config sections...")
+
+    prog_data = ProgramData(plugins, args, config)
+    prog_data.program_start_ts = time.time()
+    prog_data.run_report = RunReport()
+
+    successes = 0
+    config_checks = 0
+    # Join the set of allowed types with the types in config to safely loop
+    for plugin_name in prog_data.loaded_plugins.loaded_plugin_names:
+        try:
+            plugin = prog_data.loaded_plugins.get_plugin_by_name(plugin_name)
+        except Exception as e:
+            print(e)
+            continue
+
+        config_section = None
+        if(plugin_name in prog_data.config.keys()):
+            config_section = prog_data.config[plugin_name]
+
+        config_checks += 1
+        try:
+            plugin.verify_config_section(config_section)
+            successes += 1
+        except ConfigurationException as e:
+            print(f"Failed to verify config section for plugin \"{plugin_name}\": {e}")
+            continue
+
+    config_section = None # Clear from above use
+
+    if(successes != config_checks):
+        print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        print(f"WARNING: {successes}/{config_checks} configs valid.")
+        print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!")
+    else:
+        print(f"All configs valid.")
+
+    print()
+
+    analysis_order = get_analysis_order(prog_data)
+    analysis_order_printable = ", ".join([analysis.name for analysis in analysis_order])
+
+    print()
+    #endregion
+
+    print(f"""### Loaded:
+            \rTimeline:
+            \r{prog_data.timeline}
+            \r
+            \rAnalyses:
+            \r  {analysis_order_printable}
+            \r""")
+
+    if(prog_data.args.verifyconfig):
+        print(f"Config verified, --verify-config set, exiting.")
+        exit()
+
+    if(args.explain):
+        print("### Ingesting data...")
+        run_ingest(prog_data)
+        print()
+
+        history_path = args.explain_history
+        if(history_path is None):
+            history_path = os.path.join(get_base_path(prog_data, warn=False), RUN_REPORT_FILENAME)
+
+        print(f"### Explaining {len(analysis_order)} analyses, history from \"{history_path}\":")
+        explain_analyses(prog_data, analysis_order, load_report_history(history_path))
+        exit()
+
+    if(args.backfill is not None):
+        print("### Backfilling...")
+        base_path = get_base_path(prog_data)
+        all_saved_files = run_backfill(prog_data, analysis_order, base_path, args.step, args.workers)
+        print()
+    else:
+        base_path, all_saved_files = run(prog_data, analysis_order)
+
+    if(prog_data.profiler is not None):
+        profile_path = os.path.join(base_path, PROFILE_DIRECTORY)
+        profile_files = prog_data.profiler.save(profile_path)
+        print(f"Saved {len(profile_files)} profile(s) to \"{profile_path}\"")
+
+    report_details = {}
+    if(prog_data.data_repo.stats is not None):
+        report_details["repository_stats"] = prog_data.data_repo.stats.to_dict()
+
+    report_path = os.path.join(base_path, RUN_REPORT_FILENAME)
+    prog_data.run_report.save(report_path, config=args.config, period=args.period, analyses=args.analysis_options, saved_files=len(all_saved_files), **report_details)
+
+    print("### Run report:")
+    prog_data.run_report.print_summary()
+    print(f"Saved run report \"{report_path}\"")
+
+    if(args.trace is not None):
+        get_tracer().save(args.trace)
+        print(f"Saved trace \"{args.trace}\"")
+
+    if(args.exitaction == "openeach"):
+        print(f"Exit action: opening each saved file.")
+        for saved_file in all_saved_files:
+            open_file(saved_file)
+    elif(args.exitaction == "opendir"):
+        print("Exit action: opening directory.")
+        open_file(os.path.abspath(base_path))
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,12 @@ import yaml
 import traceback
 
 from src.parameter_utils import parse_period_argument, ConfigurationException, ArgumentException
+from src.data.compaction import COMPACT_MODE_CHOICES, pyarrow_available
 from src.data.timeline import verify_timeline_config, TIMELINE_SECTION_NAME
+from src.utils.profiling import PROFILE_MODE_CHOICES
 
 EXIT_ACTION_CHOICES=['none', 'openeach', 'opendir']
+BACKFILL_STEP_CHOICES=['month', 'year']
 
 def load_parameters():
     try:
@@ -35,11 +38,23 @@ def load_arguments():
 
     parser = argparse.ArgumentParser(prog='AutoMetrics', description='AutoMetrics - collect, analyze, and save metrics through plugins')
     parser.add_argument("config", default="./config.yaml", type=str, help="The location of the config file to use.")
-    parser.add_argument('-p', '--period', dest='period', type=parse_period_argument, help="A time range of the format <start>-<end> where your start and end times are UNIX timestamps.")
+    period_group = parser.add_mutually_exclusive_group()
+    period_group.add_argument('-p', '--period', dest='period', type=parse_period_argument, help="A time range of the format <start>-<end> where your start and end times are UNIX timestamps.")
+    period_group.add_argument('--backfill', dest='backfill', type=parse_period_argument, help="Run the config once for each --step sized period in this range, saving each period into its own subdirectory of saving.base-path. Accepts the same formats as --period.")
     parser.add_argument('-a', '--analyses', dest='analysis_options', type=lambda opt: opt.split(","), help="A list of analysis options separated by a comma (no spaces).")
     parser.add_argument('-v', dest='verbose', action='store_true', help="Enable verbose output.")
     parser.add_argument('--verify-config', dest="verifyconfig", action='store_true', help='Load plugins and check their configurations, early exit.')
+    parser.add_argument('--explain', dest='explain', action='store_true', help="Ingest, then print the estimated workload of each analysis without running it, early exit.")
+    parser.add_argument('--explain-history', dest='explain_history', default=None, help="The run_report.json used by --explain to predict time and memory. Defaults to the one in saving.base-path.")
     parser.add_argument('--exit-action', dest='exitaction', choices=EXIT_ACTION_CHOICES, help="What exit action to take when files are done saving. Can open each individual file, or just open the directory with the systems file explorer.")
+    parser.add_argument('--step', dest='step', choices=BACKFILL_STEP_CHOICES, default="month", help="The size of each --backfill period.")
+    parser.add_argument('--workers', dest='workers', type=int, default=os.cpu_count(), help="The maximum amount of --backfill periods processed at the same time. Defaults to the CPU count.")
+    parser.add_argument('--repo-stats', dest='repo_stats', action='store_true', help="Count DataRepository filter_ids, get_data, and contains calls per analysis and print a report at the end of the analysis phase.")
+    parser.add_argument('--trace', dest='trace', default=None, help="Record a Chrome trace-event JSON file of the run to this path, it can be opened in Perfetto.")
+    parser.add_argument('--profile', dest='profile', action='store_true', help="Profile every ingest plugin, analysis, and saver, saving the profiles into the profiles directory of saving.base-path.")
+    parser.add_argument('--profile-plugins', dest='profile_plugins', type=lambda opt: opt.split(","), help="Only profile these plugins, analysis drivers, or analyses, separated by a comma (no spaces). Implies --profile.")
+    parser.add_argument('--profile-mode', dest='profile_mode', choices=PROFILE_MODE_CHOICES, default="cprofile", help="Profile with cProfile (.prof files) or the stack sampler (collapsed stack files for flamegraphs).")
+    parser.add_argument('--shards', dest='shards', type=int, default=1, help="Partition the timeline's main periods across this many worker processes. Each shard ingests and runs period local analyses, cross period analyses run after the shards are joined.")
 
     return parser.parse_args()
 
@@ -71,6 +86,21 @@ def verify_arguments(prog_data):
     if(args.period[1] < args.period[0]):
         raise ArgumentException(f"The period's end time is before the start time.")
 
+    if(args.shards < 1):
+        raise ArgumentException(f"The shard count must be at least 1, got {args.shards}.")
+
+    if(args.workers < 1):
+        raise ArgumentException(f"The worker count must be at least 1, got {args.workers}.")
+
+    if(args.profile_plugins is not None):
+        analysis_names = [analysis.name for analysis in analyses]
+        for plugin_name in args.profile_plugins:
+            if(plugin_name not in prog_data.loaded_plugins.loaded_plugin_names and plugin_name not in analysis_names):
+                raise ArgumentException(f"Can't profile \"{plugin_name}\", it isn't a loaded plugin or analysis.")
+
+    if(args.backfill is not None and args.shards > 1):
+        raise ArgumentException("--backfill and --shards can't be used together, --backfill already runs periods in parallel with --workers.")
+
 def load_config(config_location = "./config.yaml"):
     if(not os.path.isfile(config_location)):
         print(f"Error: The config file \"{config_location}\" doesn't exist. Exiting...")
@@ -110,11 +140,31 @@ def verify_config(prog_data, config):
 
     if(TIMELINE_SECTION_NAME in config):
         verify_timeline_config(config[TIMELINE_SECTION_NAME])
+
+    if("compact" in config["ingest"]):
+        verify_compact_config(config["ingest"])
+
+def verify_compact_config(ingest_section: dict):
+    """ Verify the ingest.compact section maps ingest plugins from ingest.run to a compaction mode. """
+    compact_section = ingest_section["compact"]
+    if(not isinstance(compact_section, dict)):
+        raise ConfigurationException(f"The ingest.compact section must map ingest plugin names to one of: {", ".join(COMPACT_MODE_CHOICES)}")
+
+    for plugin_name, mode in compact_section.items():
+        if(plugin_name not in ingest_section["run"]):
+            raise ConfigurationException(f"Can't compact ingest plugin \"{plugin_name}\" it isn't in ingest.run.")
+        if(mode not in COMPACT_MODE_CHOICES):
+            raise ConfigurationException(f"Unknown ingest.compact mode \"{mode}\" for \"{plugin_name}\", the choices are: {", ".join(COMPACT_MODE_CHOICES)}")
+        if(mode == "arrow" and not pyarrow_available):
+            raise ConfigurationException(f"Can't compact \"{plugin_name}\" with Arrow dtypes, pyarrow is not installed.")
     
 def install_config(config, args):
     """ Install the config onto the arguments object, replacing missing values with ones from the 
             config, like period."""
     
+    if(args.backfill is not None):
+        args.period = args.backfill
+
     if(args.period is None):
         if("period" not in config.keys()):
             raise ConfigurationException(f"There was no period provided in arguments, and it isn't present in the config. Specify the period in either config or arguments.")
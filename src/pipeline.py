@@ -0,0 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import os
+import traceback
+
+from src.data.compaction import compact_repository
+from src.data.data_repository import DataRepository
+from src.program_data import ProgramData
+from src.streaming import close_saver_streams, is_streaming, start_saver_streams
+from src.utils.profiling import profile
+from src.utils.run_report import measure
+from src.utils.tracing import span
+
+DEFAULT_BASE_PATH = "./latest_run"
+
+def get_config_section(prog_data: ProgramData, plugin_name: str):
+    """ Get the config section for a plugin by its class name, None if the config doesn't have
+            one. """
+    if(plugin_name in prog_data.config.keys()):
+        return prog_data.config[plugin_name]
+    return None
+
+def get_compact_mode(prog_data: ProgramData, ingest_plugin_name: str):
+    """ Get the ingest.compact mode for an ingest plugin, None if its DataFrames aren't compacted. """
+    compact_section = prog_data.config["ingest"].get("compact")
+    if(compact_section is None):
+        return None
+    return compact_section.get(ingest_plugin_name)
+
+def create_repository(prog_data: ProgramData):
+    """ Create an empty DataRepository for the run, counting accesses if --repo-stats is set. """
+    data_repo = DataRepository()
+    if(prog_data.args.repo_stats):
+        data_repo.enable_stats()
+    return data_repo
+
+def repository_context(prog_data: ProgramData, context: str):
+    """ Attribute the repository accesses made inside of the context to context, does nothing when
+            the repository isn't counting accesses. """
+    if(prog_data.data_repo.stats is None):
+        return nullcontext()
+    return prog_data.data_repo.stats.in_context(context)
+
+def run_ingest(prog_data: ProgramData):
+    """
+    Run each ingest plugin in the config's ingest.run list, joining the ingested repositories
+        into prog_data.data_repo. A new DataRepository is created if prog_data doesn't have one.
+
+    Args:
+        prog_data (ProgramData): The program data, the timeline decides what periods are ingested.
+    Returns:
+        DataRepository: The repository holding all of the ingested data.
+    """
+    if(getattr(prog_data, "data_repo", None) is None):
+        prog_data.data_repo = create_repository(prog_data)
+
+    for ingest_plugin_name in prog_data.config["ingest"]["run"]:
+        try:
+            ingest_plugin = prog_data.loaded_plugins.get_plugin_by_name(ingest_plugin_name)
+        except Exception as e:
+            print(f"Failed to run ingest plugin named \"{ingest_plugin_name}\". {e}")
+            continue
+
+        ingest_config_section = get_config_section(prog_data, ingest_plugin_name)
+
+        try:
+            with measure(prog_data, "ingest", ingest_plugin_name, prog_data.data_repo), span(ingest_plugin_name, "ingest"), \
+                    profile(prog_data, "ingest", ingest_plugin_name):
+                ingested_repo = ingest_plugin.ingest(prog_data, ingest_config_section)
+
+                compact_mode = get_compact_mode(prog_data, ingest_plugin_name)
+                if(compact_mode is not None):
+                    with span(ingest_plugin_name, "compact", mode=compact_mode):
+                        compact_repository(ingested_repo, compact_mode, ingest_plugin_name, prog_data.args.verbose)
+
+                prog_data.data_repo.join(ingested_repo)
+        except Exception as e:
+            print(f"Ingest plugin \"{ingest_plugin_name}\" failed:")
+            traceback.print_exc()
+            exit(2)
+
+    return prog_data.data_repo
+
+def run_analyses(prog_data: ProgramData, analyses: list):
+    """
+    Run each analysis with its corresponding analysis driver, in the order provided. The analyses
+        should already be ordered with get_analysis_order.
+
+    Args:
+        prog_data (ProgramData): The program data, results are stored in prog_data.data_repo.
+        analyses (list[Analysis]): The ordered list of analyses to run.
+    """
+    for analysis in analyses:
+        driver = prog_data.loaded_plugins.get_analysis_driver(type(analysis))
+
+        try:
+            config_section = prog_data.config[type(driver).__name__]
+        except KeyError as e:
+            # Check if the driver can handle not having config, if so we can skip passing it
+            if(driver.verify_config_section(None)):
+                config_section = None
+            else:
+                raise Exception(f"Analysis driver failed, it was expecting config but didn't get any. The driver \"{type(driver).__name__}\" is required because of analysis \"{analysis.name}\"")
+
+        try:
+            with measure(prog_data, "analysis", analysis.name, prog_data.data_repo, driver=type(driver).__name__), \
+                    span(analysis.name, "analysis", driver=type(driver).__name__, prereqs=analysis.prereq_analyses), \
+                    profile(prog_data, "analysis", analysis.name, type(driver).__name__), \
+                    repository_context(prog_data, analysis.name):
+                driver.run_analysis(analysis, prog_data, config_section)
+        except Exception as e:
+            print(f"Analysis driver plugin \"{type(driver).__name__}\" failed on analysis \"{analysis.name}\":")
+            traceback.print_exc()
+            exit(2)
+
+def get_base_path(prog_data: ProgramData, warn=True):
+    """ Get the saving base path from the config, falling back to DEFAULT_BASE_PATH. """
+    if("saving" in prog_data.config.keys() and "base-path" in prog_data.config["saving"].keys()):
+        return prog_data.config["saving"]["base-path"]
+
+    if(warn):
+        print(f"WARNING: Using default base path \"{DEFAULT_BASE_PATH}\" for saving.")
+    return DEFAULT_BASE_PATH
+
+def get_files_size(paths: list[str]):
+    """ Get the summed size in bytes of the files that exist in paths, each file counted once. """
+    return sum([os.path.getsize(path) for path in set(paths) if os.path.isfile(path)])
+
+def paths_overlap(path_a: str, path_b: str):
+    """ Check if the paths are the same or one of them is inside of the other. """
+    path_a = os.path.abspath(path_a)
+    path_b = os.path.abspath(path_b)
+    return os.path.commonpath([path_a, path_b]) in (path_a, path_b)
+
+def group_savers(savers: list[tuple]):
+    """
+    Split the savers into groups that run one after another, the savers inside of a group run at
+        the same time. A saver joins the group before it when every saver in the group is
+        CONCURRENT and none of their base paths overlap its own, otherwise it starts a new group.
+        Savers never start before an earlier saver they could conflict with finishes.
+
+    Args:
+        savers (list[tuple]): The (saver_name, saver_plugin, config_section, base_path) of each
+            saver in saving.run order.
+    Returns:
+        list[list[tuple]]: The groups, in saving.run order.
+    """
+    groups = []
+    for saver in savers:
+        _, saver_plugin, _, saver_base_path = saver
+        can_join = (len(groups) > 0 and saver_plugin.CONCURRENT and
+                    all([other_plugin.CONCURRENT and not paths_overlap(saver_base_path, other_base_path) for _, other_plugin, _, other_base_path in groups[-1]]))
+
+        if(can_join):
+            groups[-1].append(saver)
+        else:
+            groups.append([saver])
+    return groups
+
+def is_profiled_exclusively(prog_data: ProgramData, group: list[tuple]):
+    """ Check if any saver in the group is profiled in a way that can't overlap another profiled
+            saver, see Profiler.is_exclusive. """
+    if(prog_data.profiler is None):
+        return False
+    return any([prog_data.profiler.is_exclusive(saver_name) for saver_name, _, _, _ in group])
+
+def run_saver(prog_data: ProgramData, saver_name: str, saver_plugin, config_section: dict, base_path: str):
+    """ Run a single saver, returning the file paths it saved. A failing saver is logged and None
+            is returned. """
+    try:
+        with measure(prog_data, "saving", saver_name) as entry, span(saver_name, "saver"), profile(prog_data, "saving", saver_name):
+            saved_files = saver_plugin.save(prog_data, config_section, base_path)
+            write_stats = saver_plugin.get_write_stats()
+            if(write_stats is not None):
+                entry.update(write_stats)
+            elif(saved_files is not None):
+                entry["files_written"] = len(saved_files)
+                entry["bytes_written"] = get_files_size(saved_files)
+            return saved_files
+    except Exception as e:
+        print(f"Saver plugin \"{saver_name}\" failed:")
+        traceback.print_exc()
+        print("Continuing saving...")
+        return None
+
+def get_savers(prog_data: ProgramData, base_path: str):
+    """
+    Get the savers in the config's saving.run list, savers that can't be found are logged and
+        skipped.
+
+    Args:
+        prog_data (ProgramData): The program data.
+        base_path (str): The base path that savers write under, savers with an addtl-base config
+            write into a subdirectory of it.
+    Returns:
+        list[tuple]: The (saver_name, saver_plugin, config_section, base_path) of each saver.
+    """
+    savers = []
+    for saver_name in prog_data.config["saving"]["run"]:
+        try:
+            saver_plugin = prog_data.loaded_plugins.get_plugin_by_name(saver_name)
+        except Exception as e:
+            print(f"Failed to run saver plugin named \"{saver_name}\". {e}")
+            continue
+
+        saver_config_section = get_config_section(prog_data, saver_name)
+
+        specific_base_path = base_path
+        if(saver_config_section is not None and "addtl-base" in saver_config_section):
+            specific_base_path = os.path.join(base_path, saver_config_section["addtl-base"])
+
+        savers.append((saver_name, saver_plugin, saver_config_section, specific_base_path))
+
+    return savers
+
+def start_streams(prog_data: ProgramData, base_path: str):
+    """ Start streaming results to the savers that support it before the analyses run, when
+            saving.stream is set. base_path is the one later passed to run_savers, which flushes
+            the streams. """
+    if(is_streaming(prog_data)):
+        start_saver_streams(prog_data, get_savers(prog_data, base_path))
+
+def run_savers(prog_data: ProgramData, base_path: str):
+    """
+    Run each saver in the config's saving.run list. Failing savers are logged and skipped.
+        CONCURRENT savers with base paths that don't overlap run at the same time on threads, see
+        group_savers, unless they're profiled with cProfile. Saver streams are flushed first, so
+        every streamed result is written by the time this returns.
+
+    Args:
+        prog_data (ProgramData): The program data.
+        base_path (str): The base path that savers write under, savers with an addtl-base config
+            write into a subdirectory of it.
+    Returns:
+        list[str]: Every file path that the savers reported saving, in saver order. Also stored in
+            prog_data.saved_files as each group of savers finishes.
+    """
+    close_saver_streams(prog_data)
+    savers = get_savers(prog_data, base_path)
+
+    # Shared with the savers through prog_data, so later savers can read what earlier ones saved
+    all_saved_files = []
+    prog_data.saved_files = all_saved_files
+    for group in group_savers(savers):
+        if(len(group) == 1):
+            results = [run_saver(prog_data, *group[0])]
+        elif(is_profiled_exclusively(prog_data, group)):
+            print(f"Running {len(group)} savers one at a time, cProfile can't profile them concurrently: {", ".join([saver_name for saver_name, _, _, _ in group])}")
+            results = [run_saver(prog_data, *saver) for saver in group]
+        else:
+            print(f"Running {len(group)} savers concurrently: {", ".join([saver_name for saver_name, _, _, _ in group])}")
+            with ThreadPoolExecutor(max_workers=len(group), thread_name_prefix="Saver") as executor:
+                futures = [executor.submit(run_saver, prog_data, *saver) for saver in group]
+                results = [future.result() for future in futures]
+
+        # Collected in saving.run order, whichever saver finished first
+        for saved_files in results:
+            if(saved_files is not None):
+                all_saved_files.extend(saved_files)
+
+    return all_saved_files
@@ -5,6 +5,7 @@ import os
 import sys
 
 from src.plugin_mgmt.plugins import IngestPlugin, Analysis, AnalysisPlugin, AnalysisDriverPlugin, Saver
+from src.utils.tracing import span
 
 MODULE_DIR = "./plugins"
 
@@ -56,18 +57,19 @@ class LoadedPlugins:
         Returns: None
         """
 
-        module_name = os.path.splitext(os.path.relpath(path, MODULE_DIR))[0].replace(os.sep, "_")
-        if module_name in sys.modules:
-            module = sys.modules[module_name]
-        else:
-            spec = importlib.util.spec_from_file_location(module_name, path)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-
-        # Scan the module for classes that subclass IngestPlugin
-        for name, obj in inspect.getmembers(module, inspect.isclass):
-            self.load_object(name, obj, path)
+        with span(path, "plugin_load"):
+            module_name = os.path.splitext(os.path.relpath(path, MODULE_DIR))[0].replace(os.sep, "_")
+            if module_name in sys.modules:
+                module = sys.modules[module_name]
+            else:
+                spec = importlib.util.spec_from_file_location(module_name, path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                spec.loader.exec_module(module)
+
+            # Scan the module for classes that subclass IngestPlugin
+            for name, obj in inspect.getmembers(module, inspect.isclass):
+                self.load_object(name, obj, path)
 
     def load_object(self, name, obj, path):
         """
@@ -61,6 +61,19 @@ class AnalysisPlugin(ABC):
         """
         pass
 
+@dataclass
+class AnalysisPlan:
+    """ The estimated workload of an analysis, made by AnalysisDriverPlugin.explain_analysis without
+            running the analysis. """
+    inputs: int
+    """ The amount of identifiers the analysis reads. """
+    calls: int
+    """ The amount of units of work, like method calls or figures. """
+    outputs: list[Identifier]
+    """ The identifiers the analysis would add, used as placeholders by later analyses. """
+    work: str
+    """ A readable description of how calls was calculated. """
+
 class AnalysisDriverPlugin(ConfigurablePlugin):
     """
     The AnalysisDriverPlugin reads the analysis being performed and is handed the program data,
@@ -69,17 +82,36 @@ class AnalysisDriverPlugin(ConfigurablePlugin):
     """
 
     SERVED_TYPE: Type[Analysis] = None
+    PERIOD_LOCAL: bool = False
+    """ Set to True when the driver's analyses only read identifiers from the same main period as
+            the result they produce. Period local analyses are run inside shard workers when
+            --shards is used, everything else runs after the shards are joined. """
 
     @abstractmethod
     def run_analysis(self, analysis, prog_data: ProgramData, config_section: dict):
         """ Run this specific analysis. """
         pass
 
+    def explain_analysis(self, analysis, plan_repo: DataRepository) -> AnalysisPlan:
+        """
+        Estimate the work of an analysis for --explain without running it. The plan_repo holds the
+            ingested identifiers and placeholder outputs of earlier analyses, its data is None.
+
+        Returns:
+            AnalysisPlan: The estimate, None if the driver can't estimate its analyses.
+        """
+        return None
+
 class Saver(ConfigurablePlugin):
     """ The Saver plugin saves data from the DataRepository to the file system. The saver is a
             plugin to allow arbitrary saving of files.
     """
 
+    CONCURRENT: bool = False
+    """ Set to True when the saver can run at the same time as other savers. Concurrent savers only
+            run alongside each other when their base paths don't overlap, a saver that reads the
+            files of an earlier saver should stay False. """
+
     def verify_config_section(self, config_section):
         """ A default implementation of verify_config_section for the Saver class, this version
                 allows empty configs, or a config only with an addtl-base section. """
@@ -102,4 +134,42 @@ class Saver(ConfigurablePlugin):
         Returns:
             list[str]: A list of file paths that the Saver plugin saved. 
         """
-        pass
\ No newline at end of file
+        pass
+
+    def start_stream(self, prog_data: ProgramData, config_section: dict, base_path: str) -> Callable[[Identifier], bool]:
+        """ Get ready to write results while the analyses are still running, called before the
+                analysis phase when saving.stream is set. Identifiers that satisfy the returned
+                filter are passed to save_streamed as they're added to the DataRepository. save()
+                is still called after the analyses, it writes everything that wasn't streamed and
+                returns every saved file, streamed ones included.
+
+        Arguments:
+            prog_data (ProgramData): The program data.
+            config_section (dict): The configuration section for this plugin.
+            base_path (str): The base path for files to be saved to, like in save().
+
+        Returns:
+            Callable[[Identifier], bool]: The filter of the identifiers to stream, None (the
+                default) when the saver only saves after the analyses.
+        """
+        return None
+
+    def save_streamed(self, identifier: Identifier, data: object) -> bool:
+        """ Save one streamed result, see start_stream. Called on a background thread in the order
+                the results were added, never at the same time as save(). A result replaced with
+                DataRepository.update_data is passed again with its new data.
+
+        Arguments:
+            identifier (Identifier): The added identifier.
+            data (object): A read-only view of the result, taken when it was added.
+
+        Returns:
+            bool: True if the result was saved, False if it was left for save().
+        """
+        return False
+
+    def get_write_stats(self) -> dict:
+        """ Get the files_written, bytes_written, files_skipped, and bytes_skipped of the last save,
+                for savers that skip unchanged files. None measures the size of every saved file
+                instead. """
+        return None
\ No newline at end of file
@@ -6,6 +6,7 @@ import pandas as pd
 from src.parameter_utils import ConfigurationException
 from src.parameters import ArgumentException, verify_arguments, verify_config
 from src.data.timeline import Timeline, TIMELINE_SECTION_NAME
+from src.utils.profiling import create_profiler
 
 class ProgramData():
     def __init__(self, loaded_plugins, args, config):
@@ -33,4 +34,13 @@ class ProgramData():
         if(TIMELINE_SECTION_NAME in self.config.keys()):
             timeline_conf = self.config[TIMELINE_SECTION_NAME]
             
-        self.timeline = Timeline(timeline_conf, self.args.period[0], self.args.period[1])
\ No newline at end of file
+        self.timeline = Timeline(timeline_conf, self.args.period[0], self.args.period[1])
+
+        # The RunReport measuring this run, None when the run isn't being measured
+        self.run_report = None
+        # The Profiler for --profile, None when the run isn't being profiled
+        self.profiler = create_profiler(self.args)
+        # The files saved by the savers that finished so far, see pipeline.run_savers
+        self.saved_files = []
+        # The SaverStreams by saver name while results are streamed, see src/streaming.py
+        self.saver_streams = {}
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.pipeline import run_ingest, run_analyses, get_base_path, create_repository
+from src.plugin_mgmt.pluginloader import LoadedPlugins
+from src.program_data import ProgramData
+from src.utils.fileutils import convert_readable_period_fs
+from src.utils.processes import get_worker_context
+from src.utils.profiling import PROFILE_DIRECTORY
+from src.utils.run_report import RunReport
+from src.utils.timeutils import get_range_printable
+from src.utils.tracing import enable_tracing, disable_tracing, is_tracing, get_trace_events, extend_trace, span
+
+# The plugins loaded by a worker process on startup, see create_worker_pool.
+_worker_plugins: LoadedPlugins = None
+
+def partition_analyses(analysis_order: list, loaded_plugins: LoadedPlugins):
+    """
+    Split the ordered analyses into the ones that can run inside a shard and the ones that need
+        the joined repository. An analysis is period local when its driver is PERIOD_LOCAL and
+        all of its prereq analyses are period local too.
+
+    Args:
+        analysis_order (list[Analysis]): The analyses, ordered by get_analysis_order.
+        loaded_plugins (LoadedPlugins): The loaded plugins, used to look up analysis drivers.
+    Returns:
+        tuple[list[Analysis], list[Analysis]]: The period local and cross period analyses, both
+            keeping the order from analysis_order.
+    """
+    local_names = set()
+    period_local = []
+    cross_period = []
+
+    for analysis in analysis_order:
+        driver = loaded_plugins.get_analysis_driver(type(analysis))
+        prereqs = analysis.prereq_analyses if analysis.prereq_analyses is not None else []
+
+        if(driver.PERIOD_LOCAL and all(prereq in local_names for prereq in prereqs)):
+            local_names.add(analysis.name)
+            period_local.append(analysis)
+        else:
+            cross_period.append(analysis)
+
+    return period_local, cross_period
+
+def create_sub_program_data(loaded_plugins: LoadedPlugins, args: argparse.Namespace, config: dict, period: tuple, program_start_ts=None, measured=False):
+    """ Create a ProgramData for the same run restricted to a (start_ts, end_ts) period. The
+            arguments are copied so the parent's arguments aren't touched. If measured is set the
+            ProgramData gets its own RunReport. """
+    sub_args = copy.copy(args)
+    sub_args.period = period
+    sub_args.analysis_options = list(args.analysis_options)
+
+    sub_prog_data = ProgramData(loaded_plugins, sub_args, config)
+    sub_prog_data.program_start_ts = program_start_ts
+    if(measured):
+        sub_prog_data.run_report = RunReport()
+
+    return sub_prog_data
+
+def run_sharded(prog_data: ProgramData, analysis_order: list, shard_count: int):
+    """
+    Partition the timeline's main periods across shard_count worker processes. Each shard ingests
+        and runs the period local analyses for its own periods, then the shard repositories are
+        joined into prog_data.data_repo.
+
+    Args:
+        prog_data (ProgramData): The program data for the whole run.
+        analysis_order (list[Analysis]): The analyses, ordered by get_analysis_order.
+        shard_count (int): The maximum amount of shards to use.
+    Returns:
+        list[Analysis]: The analyses that still have to be run on the joined repository, in order.
+    """
+    shard_periods = prog_data.timeline.split_main_periods(shard_count)
+    period_local, cross_period = partition_analyses(analysis_order, prog_data.loaded_plugins)
+
+    if(len(shard_periods) < shard_count):
+        print(f"Only {prog_data.timeline.get_period_count()} main period(s), using {len(shard_periods)} shard(s).")
+
+    print(f"Running {len(period_local)} period local analyses in {len(shard_periods)} shard(s): {", ".join([analysis.name for analysis in period_local])}")
+
+    analysis_names = [analysis.name for analysis in period_local]
+
+    prog_data.data_repo = create_repository(prog_data)
+    with create_worker_pool(len(shard_periods)) as executor:
+        futures = [
+            executor.submit(_run_shard, prog_data.args, prog_data.config, period, analysis_names, prog_data.program_start_ts, prog_data.run_report is not None, is_tracing())
+            for period in shard_periods
+        ]
+
+        # Join in timeline order so the joined repository is deterministic
+        for period, future in zip(shard_periods, futures):
+            shard_repo, telemetry = future.result()
+            prog_data.data_repo.join(shard_repo)
+            merge_worker_telemetry(prog_data, telemetry, shard=get_range_printable(*period))
+
+    return cross_period
+
+def create_worker_pool(max_workers: int) -> ProcessPoolExecutor:
+    """ Create a process pool whose workers can use get_worker_plugins(). The workers are started
+            with get_worker_context() and load the plugins again on startup. """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=get_worker_context(), initializer=_init_worker)
+
+def get_worker_plugins() -> LoadedPlugins:
+    """ Get the loaded plugins inside of a worker created by create_worker_pool. """
+    return _worker_plugins
+
+def start_worker_telemetry(traced: bool):
+    """ Start a worker task with a fresh Tracer, or none if traced is False. Pooled workers run
+            many tasks, so the Tracer is always reset. """
+    if(traced):
+        enable_tracing()
+    else:
+        disable_tracing()
+
+def get_worker_telemetry(prog_data: ProgramData):
+    """ Get the run report entries and trace events recorded by a worker task, these are sent back
+            to the main process and merged with merge_worker_telemetry. """
+    report_entries = prog_data.run_report.entries if prog_data.run_report is not None else []
+    return report_entries, get_trace_events()
+
+def merge_worker_telemetry(prog_data: ProgramData, telemetry: tuple, **details):
+    """ Merge a worker task's telemetry into the main process, the details are added to each run
+            report entry. """
+    report_entries, trace_events = telemetry
+    if(prog_data.run_report is not None):
+        prog_data.run_report.extend(report_entries, **details)
+    extend_trace(trace_events)
+
+def _init_worker():
+    global _worker_plugins
+    if(_worker_plugins is None):
+        _worker_plugins = LoadedPlugins()
+
+def _run_shard(args, config, period, analysis_names, program_start_ts, measured, traced):
+    """ Worker entry point, ingest and analyze a single shard period. Returns the shard's
+            repository and its telemetry. """
+    start_worker_telemetry(traced)
+
+    loaded_plugins = get_worker_plugins()
+    shard_prog_data = create_sub_program_data(loaded_plugins, args, config, period, program_start_ts, measured)
+
+    with span(f"Shard {get_range_printable(*period)}", "shard"):
+        run_ingest(shard_prog_data)
+        run_analyses(shard_prog_data, [loaded_plugins.get_analysis_by_name(name) for name in analysis_names])
+
+    # Shards don't save, so their profiles go straight into the run's profile directory
+    if(shard_prog_data.profiler is not None):
+        profile_path = os.path.join(get_base_path(shard_prog_data, warn=False), PROFILE_DIRECTORY)
+        shard_prog_data.profiler.save(profile_path, prefix=f"{convert_readable_period_fs(get_range_printable(*period))}_")
+
+    return shard_prog_data.data_repo, get_worker_telemetry(shard_prog_data)
@@ -0,0 +1,91 @@
+import threading
+import traceback
+
+from src.data.repository_events import EVENT_ADD, EVENT_JOIN, EVENT_UPDATE_DATA
+from src.program_data import ProgramData
+from src.utils.tracing import span
+
+def is_streaming(prog_data: ProgramData) -> bool:
+    """ Check if savers should write results while the analyses run, see saving.stream. """
+    config = getattr(prog_data, "config", None)
+    if(config is None or "saving" not in config):
+        return False
+    return bool(config["saving"].get("stream", False))
+
+class SaverStream():
+    """
+    The SaverStream passes the identifiers a saver subscribed to, see Saver.start_stream, to the
+        saver's save_streamed on a background thread as they're added to the DataRepository. The
+        analyses only pay for queueing a read-only view of each result, see
+        DataRepository.subscribe_queue, the saver writes it while later analyses are computing.
+        Results replaced with update_data are passed again.
+    A result that fails to stream is logged and left to the saver's save().
+    """
+
+    def __init__(self, prog_data: ProgramData, saver_name: str, saver_plugin, operation):
+        self.data_repo = prog_data.data_repo
+        self.saver_name = saver_name
+        self.saver_plugin = saver_plugin
+        self.streamed_count = 0
+
+        self._subscription = self.data_repo.subscribe_queue(operation, events={EVENT_ADD, EVENT_JOIN, EVENT_UPDATE_DATA})
+        # Daemon so a run that exits during the analyses isn't held open by the stream
+        self._thread = threading.Thread(target=self._run, name=f"SaverStream-{saver_name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for events in self._subscription:
+            for event in events:
+                for identifier, data, _ in event:
+                    self.save(identifier, data)
+
+    def save(self, identifier, data):
+        try:
+            with span(self.saver_name, "stream", identifier=identifier):
+                if(self.saver_plugin.save_streamed(identifier, data)):
+                    self.streamed_count += 1
+        except Exception:
+            print(f"Saver plugin \"{self.saver_name}\" failed to stream \"{identifier}\", it will be saved after the analyses:")
+            traceback.print_exc()
+
+    def close(self):
+        """ Stop the subscription and wait for every queued result to be handed to the saver. """
+        self.data_repo.unsubscribe(self._subscription)
+        self._thread.join()
+
+def start_saver_streams(prog_data: ProgramData, savers: list[tuple]):
+    """
+    Start a SaverStream for each saver that streams, see Saver.start_stream. The streams are kept
+        in prog_data.saver_streams by saver name until close_saver_streams.
+
+    Args:
+        prog_data (ProgramData): The program data, streamed results are added to its data_repo.
+        savers (list[tuple]): The (saver_name, saver_plugin, config_section, base_path) of each
+            saver in saving.run order.
+    """
+    for saver_name, saver_plugin, config_section, base_path in savers:
+        try:
+            operation = saver_plugin.start_stream(prog_data, config_section, base_path)
+        except Exception:
+            print(f"Saver plugin \"{saver_name}\" failed to start streaming, it will save after the analyses:")
+            traceback.print_exc()
+            continue
+
+        if(operation is not None):
+            prog_data.saver_streams[saver_name] = SaverStream(prog_data, saver_name, saver_plugin, operation)
+
+    if(len(prog_data.saver_streams) > 0):
+        print(f"Streaming results to {len(prog_data.saver_streams)} saver(s): {", ".join(prog_data.saver_streams.keys())}")
+
+def close_saver_streams(prog_data: ProgramData):
+    """ Close every stream in prog_data.saver_streams, waiting until each queued result was handed
+            to its saver. The savers' save() calls finish the streamed writes. """
+    if(len(prog_data.saver_streams) == 0):
+        return
+
+    with span("Flushing saver streams", "stream"):
+        for saver_stream in prog_data.saver_streams.values():
+            saver_stream.close()
+
+    print(f"Streamed {", ".join([f"{stream.streamed_count} result(s) to {saver_name}" for saver_name, stream in prog_data.saver_streams.items()])}")
+    prog_data.saver_streams.clear()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+
+from src.utils.fileutils import write_bytes_atomic
+
+CONTENT_MANIFEST_VERSION = 1
+
+def is_incremental(prog_data) -> bool:
+    """ Check if the run's savers should only write files whose content changed, see
+            saving.incremental. """
+    config = getattr(prog_data, "config", None)
+    if(config is None or "saving" not in config):
+        return False
+    return bool(config["saving"].get("incremental", False))
+
+def get_content_hash(data: bytes):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def format_bytes(size: int):
+    """ Format a byte count for printing, like 12.3 KB. """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if(size < 1024 or unit == "GB"):
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class ContentManifest():
+    """
+    The ContentManifest keeps the content hash, size, and modification time of every file a saver
+        wrote under its base path, so files whose content didn't change since the last run aren't
+        written again. Changed files are written atomically, through a temporary file that's
+        renamed into place. A file that was changed outside of AutoMetrics has a different size or
+        modification time and is written again.
+    The manifest is saved as JSON next to the files, it only keeps the files of the latest run.
+        Writes can come from multiple threads.
+    """
+
+    def __init__(self, base_path: str, name: str):
+        """
+        Args:
+            base_path (str): The directory the saver writes under, paths are stored relative to it.
+            name (str): The name of the manifest, usually the saver's class name.
+        """
+        self.base_path = base_path
+        self.path = os.path.join(base_path, f".{name}.manifest.json")
+        self.previous_entries = self.load()
+        self.entries = {}
+        self._lock = threading.Lock()
+
+        self.files_written = 0
+        self.bytes_written = 0
+        self.files_skipped = 0
+        self.bytes_skipped = 0
+
+    def load(self):
+        """ Load the entries of the previous run, none if there's no manifest or it can't be read. """
+        try:
+            with open(self.path, "r") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        if(manifest.get("version") != CONTENT_MANIFEST_VERSION):
+            return {}
+        return manifest.get("files", {})
+
+    def is_unchanged(self, path: str, content_hash: str, size: int):
+        """ Check if the file at path still holds the content the manifest recorded for it. """
+        entry = self.previous_entries.get(os.path.relpath(path, self.base_path))
+        if(entry is None or entry["hash"] != content_hash or entry["size"] != size):
+            return False
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == size and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def write(self, path: str, data: bytes):
+        """
+        Write the bytes to path unless the file already holds them.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        content_hash = get_content_hash(data)
+        written = not self.is_unchanged(path, content_hash, len(data))
+        if(written):
+            write_bytes_atomic(path, data)
+
+        self.record(path, content_hash, written)
+        return written
+
+    def record(self, path: str, content_hash: str, written: bool):
+        """ Record a file that was written or skipped without write(), like a hard linked file.
+                content_hash is None when the content wasn't hashed, the file is always written
+                by the next write(). """
+        stat = os.stat(path)
+        with self._lock:
+            self.entries[os.path.relpath(path, self.base_path)] = {"hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            if(written):
+                self.files_written += 1
+                self.bytes_written += stat.st_size
+            else:
+                self.files_skipped += 1
+                self.bytes_skipped += stat.st_size
+
+    def save(self):
+        """ Save the manifest atomically, keeping only the files recorded this run. """
+        manifest = {"version": CONTENT_MANIFEST_VERSION, "files": self.entries}
+        write_bytes_atomic(self.path, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    def get_stats(self):
+        """ Get the written and skipped file and byte counts, in the run report's entry format. """
+        return {
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "files_skipped": self.files_skipped,
+            "bytes_skipped": self.bytes_skipped
+        }
+
+    def print_summary(self):
+        print(f"  Wrote {self.files_written} file(s) ({format_bytes(self.bytes_written)}), skipped {self.files_skipped} unchanged file(s) ({format_bytes(self.bytes_skipped)})")
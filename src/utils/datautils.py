@@ -1,5 +1,9 @@
+import sys
+import time
+
 from src.data.data_repository import DataRepository
 from src.data.filters import filter_analyis_type
+from src.data.identifier import AnalysisIdentifier, TimeStampIdentifier
 
 def resolve_analysis(data_repo: DataRepository, start_ts, end_ts, analysis_name, key_method=None, unique_key=None):
     """ Resolve an analysis identifier with a specific analysis and matching start and 
@@ -8,7 +12,23 @@ def resolve_analysis(data_repo: DataRepository, start_ts, end_ts, analysis_name,
     if((key_method is not None) ^ (unique_key is not None)):
         raise Exception("Can't resolve analysis, a key_method or unique_key provided without the other value being provided! If key_method is there, ensure unique_key is there too- other way around as well.")
 
+    if(data_repo.stats is not None):
+        start = time.perf_counter()
+
+    resolved, scanned = _resolve_analysis(data_repo, start_ts, end_ts, analysis_name, key_method, unique_key)
+
+    # resolve_analysis scans the repository like filter_ids does, so it's counted the same way
+    if(data_repo.stats is not None):
+        data_repo.stats.record_filter(sys._getframe(1), resolve_analysis, scanned, 0 if resolved is None else 1, time.perf_counter()-start)
+
+    return resolved
+
+def _resolve_analysis(data_repo: DataRepository, start_ts, end_ts, analysis_name, key_method, unique_key):
+    """ Scan for the identifier resolve_analysis is looking for, returning it and the amount of
+            identifiers scanned. """
+    scanned = 0
     for identifier in data_repo.get_ids():
+        scanned += 1
         if(not filter_analyis_type(analysis_name)(identifier)):
             continue
 
@@ -20,6 +40,20 @@ def resolve_analysis(data_repo: DataRepository, start_ts, end_ts, analysis_name,
         src_id = identifier.find_base()
 
         if(src_id.start_ts == start_ts and src_id.end_ts == end_ts):
-            return identifier
+            return identifier, scanned
         
-    return None
\ No newline at end of file
+    return None, scanned
+
+def get_identifier_period(identifier):
+    """ Get the (start_ts, end_ts) period an identifier belongs to. AnalysisIdentifiers use the
+            period of their base identifier. Returns None when the identifier isn't based on a
+            TimeStampIdentifier. """
+
+    base = identifier
+    if(isinstance(identifier, AnalysisIdentifier)):
+        base = identifier.find_base()
+
+    if(not isinstance(base, TimeStampIdentifier)):
+        return None
+
+    return (base.start_ts, base.end_ts)
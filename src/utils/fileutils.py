@@ -1,5 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import secrets
+import shutil
+
+# The buffer size of BufferedLineWriter handles
+DEFAULT_WRITE_BUFFER = 1024*1024
+# The amount of files a ParallelFileWriter writes at the same time
+DEFAULT_WRITE_WORKERS = 4
+
 def append_line_to_file(path, line, overwrite = False):
-    """ Given a filepath, open it and append the line to it and save it.
+    """ Given a filepath, open it and append the line to it and save it. The whole file is read and
+          rewritten, use a BufferedLineWriter to write many lines.
 
     Arguments:
         path (str): The filepath.
@@ -21,8 +33,144 @@ def append_line_to_file(path, line, overwrite = False):
         contents += line
         file.write(contents)
 
+class BufferedLineWriter():
+    """ Writes lines through one buffered handle per file, kept open until close(). The files end
+          up like calling append_line_to_file for each line, the first line of a file overwrites
+          it and lines are separated by newlines.
+    """
+
+    def __init__(self, buffer_size = DEFAULT_WRITE_BUFFER):
+        self.buffer_size = buffer_size
+        self.files = {}
+
+    def write_line(self, path, line):
+        file = self.files.get(path)
+        if(file is None):
+            file = open(path, "w", buffering=self.buffer_size)
+            self.files[path] = file
+        else:
+            file.write("\n")
+        file.write(line)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ParallelFileWriter():
+    """ Writes files on a bounded pool of threads so several writes can wait on the file system at
+          the same time, which matters on network file systems. Paths are returned in the order
+          they were submitted, not the order the writes finished in. With one worker every file is
+          written right away on the calling thread.
+    """
+
+    def __init__(self, workers = DEFAULT_WRITE_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FileWriter") if workers > 1 else None
+        # The submitted paths in order, each with its pending write's future
+        self.writes = {}
+
+    def submit(self, path, write, *args):
+        """ Write the file at path by calling write(*args). A path submitted again is written
+              after its earlier write finishes, so the last submitted write wins. """
+        earlier = self.writes.get(path)
+        if(earlier is not None):
+            earlier.result()
+
+        if(self.executor is None):
+            write(*args)
+            self.writes[path] = None
+        else:
+            self.writes[path] = self.executor.submit(write, *args)
+
+    def wait(self) -> list[str]:
+        """
+        Wait for every submitted write to finish.
+
+        Returns:
+            list[str]: The written paths in the order they were first submitted.
+        Raises:
+            Exception: The exception of the first submitted write that failed.
+        """
+        for future in self.writes.values():
+            if(future is not None):
+                future.result()
+        return list(self.writes.keys())
+
+    def close(self):
+        if(self.executor is not None):
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if(self.executor is not None):
+            # Don't start writes that are still queued when the saver failed
+            self.executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
 def convert_readable_period_fs(readable_period: str):
     """ Convert a readable period string (see timeutils.py) into a string that is compatible with
           the file system. """
     
-    return readable_period.replace("/", "_").replace(" ", "T").replace(":", "")
\ No newline at end of file
+    return readable_period.replace("/", "_").replace(" ", "T").replace(":", "")
+
+def get_temp_path(path):
+    """ Get a unique hidden path next to path, for writing a file before moving it into place. """
+    
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+
+@contextmanager
+def open_atomic(path):
+    """ Open a temporary file next to path for writing bytes, it's moved into place when the context
+          exits without an exception and removed otherwise. Readers never see a partially written
+          file. """
+    
+    # A unique name opened with "x" instead of mkstemp so the file gets the umask's permissions
+    temp_path = get_temp_path(path)
+    try:
+        with open(temp_path, "xb") as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        if(os.path.exists(temp_path)):
+            os.remove(temp_path)
+        raise
+
+def write_bytes_atomic(path, data: bytes):
+    """ Write the bytes to a temporary file next to path and move it into place, so readers never
+          see a partially written file. """
+    
+    with open_atomic(path) as file:
+        file.write(data)
+
+def link_or_copy_file(src_path, dst_path):
+    """ Hard link src_path to dst_path, replacing dst_path atomically. Falls back to an atomic copy
+          when the file system can't link them, e.g. when they're on different devices. dst_path
+          is never missing while it's replaced.
+
+    Returns:
+        bool: True if the file was hard linked, False if it was copied.
+    """
+    
+    temp_path = get_temp_path(dst_path)
+    try:
+        os.link(src_path, temp_path)
+    except OSError:
+        with open_atomic(dst_path) as dst_file, open(src_path, "rb") as src_file:
+            shutil.copyfileobj(src_file, dst_file)
+        return False
+
+    try:
+        os.replace(temp_path, dst_path)
+    finally:
+        # Replacing a link to the same file does nothing, leaving the temporary link behind
+        if(os.path.lexists(temp_path)):
+            os.remove(temp_path)
+    return True
@@ -0,0 +1,17 @@
+import multiprocessing
+
+# Imported once by the fork server so the workers it starts don't import them again. pandas
+#   isn't preloaded, importing it starts a native thread and the server has to stay single threaded
+FORKSERVER_PRELOAD = ["matplotlib.pyplot"]
+
+def get_worker_context():
+    """ Get the multiprocessing context for worker process pools. Workers are started by a fork
+            server instead of forking the run itself, which has threads like the saver streams
+            and concurrent savers running, forking those can deadlock the worker. Platforms
+            without a fork server spawn the workers. """
+    if("forkserver" not in multiprocessing.get_all_start_methods()):
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return context
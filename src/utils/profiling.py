@@ -0,0 +1,167 @@
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+import cProfile
+import os
+import re
+import sys
+import threading
+
+PROFILE_MODE_CHOICES = ['cprofile', 'sample']
+PROFILE_DIRECTORY = "profiles"
+# Seconds between stack samples in sample mode
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+class StackSampler():
+    """
+    The StackSampler samples the call stack of a single thread from a background thread, counting
+        how often each stack is seen. The counts are written as collapsed stacks, the text format
+        read by flamegraph.pl and speedscope. Unlike cProfile, functions that aren't sampled cost
+        nothing, so the overhead stays flat no matter how many small calls a plugin makes.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """ Start sampling the calling thread. """
+        self._target_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="StackSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _sample_loop(self):
+        while(not self._stop_event.wait(self.interval)):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if(frame is None):
+                continue
+
+            stack = []
+            while(frame is not None):
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+
+            self.counts[";".join(reversed(stack))] += 1
+
+class Profiler():
+    """
+    The Profiler profiles ingest, analysis, and saver calls with cProfile or the StackSampler.
+        Calls with the same phase and name share a profile, so an analysis that runs more than
+        once is combined into one file.
+    """
+
+    def __init__(self, mode="cprofile", plugin_names=None, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            mode (str): One of PROFILE_MODE_CHOICES.
+            plugin_names (list[str]): The plugin, driver, or analysis names to profile, None
+                profiles every call.
+            interval (float): The seconds between samples in sample mode.
+        Raises:
+            ValueError: The mode is not one of PROFILE_MODE_CHOICES.
+        """
+        if(mode not in PROFILE_MODE_CHOICES):
+            raise ValueError(f"Unknown profile mode \"{mode}\", the choices are: {", ".join(PROFILE_MODE_CHOICES)}")
+
+        self.mode = mode
+        self.plugin_names = set(plugin_names) if plugin_names is not None else None
+        self.interval = interval
+
+        self.profiles = {}
+        self.samples = {}
+
+    def is_selected(self, *names):
+        """ Check if a call is profiled, the call is selected if any of its names were requested. """
+        return self.plugin_names is None or any(name in self.plugin_names for name in names)
+
+    def is_exclusive(self, *names):
+        """ Check if profiling a call stops other calls from being profiled at the same time. Python
+                3.12 only allows one active cProfile profile per process, the StackSampler follows
+                a single thread and has no limit. """
+        return self.mode == "cprofile" and self.is_selected(*names)
+
+    @contextmanager
+    def profile(self, phase: str, name: str, *addtl_names):
+        """
+        Profile the code run inside of the context if the call is selected.
+
+        Args:
+            phase (str): The phase the call belongs to; ingest, analysis, or saving.
+            name (str): The plugin or analysis name, used in the profile's file name.
+            *addtl_names: Other names that select this call, like the analysis driver's name.
+        """
+        if(not self.is_selected(name, *addtl_names)):
+            yield
+            return
+
+        key = f"{phase}_{name}"
+        if(self.mode == "cprofile"):
+            profile = self.profiles.setdefault(key, cProfile.Profile())
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        else:
+            sampler = StackSampler(self.interval)
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                self.samples.setdefault(key, Counter()).update(sampler.counts)
+
+    def save(self, directory: str, prefix=""):
+        """
+        Save each profile into the directory; cProfile profiles as .prof files readable with
+            pstats or snakeviz, sampled profiles as collapsed stack .txt files.
+
+        Args:
+            directory (str): The directory to save into, created if it doesn't exist.
+            prefix (str): Prefixed to each file name, used to keep worker profiles apart.
+        Returns:
+            list[str]: The saved file paths.
+        """
+        if(len(self.profiles) == 0 and len(self.samples) == 0):
+            return []
+
+        os.makedirs(directory, exist_ok=True)
+
+        saved_files = []
+        for key, profile in self.profiles.items():
+            path = os.path.join(directory, f"{prefix}{get_profile_filename(key)}.prof")
+            profile.dump_stats(path)
+            saved_files.append(path)
+
+        for key, counts in self.samples.items():
+            path = os.path.join(directory, f"{prefix}{get_profile_filename(key)}.collapsed.txt")
+            with open(path, "w") as file:
+                for stack, count in counts.most_common():
+                    file.write(f"{stack} {count}\n")
+            saved_files.append(path)
+
+        return saved_files
+
+def get_profile_filename(key: str):
+    """ Replace the characters in a profile key that aren't safe in a file name. """
+    return re.sub(r"[^\w.-]", "_", key)
+
+def create_profiler(args):
+    """ Create a Profiler from the --profile arguments, None if profiling wasn't requested. """
+    if(not args.profile and args.profile_plugins is None):
+        return None
+    return Profiler(args.profile_mode, args.profile_plugins)
+
+def profile(prog_data, phase: str, name: str, *addtl_names):
+    """ Profile a call with the ProgramData's Profiler, see Profiler.profile. When the run isn't
+            profiled this returns a context that does nothing. """
+    if(prog_data.profiler is None):
+        return nullcontext()
+    return prog_data.profiler.profile(phase, name, *addtl_names)
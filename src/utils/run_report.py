@@ -0,0 +1,158 @@
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import psutil
+    psutil_available = True
+except ImportError:
+    psutil_available = False
+
+try:
+    import resource
+    resource_available = True
+except ImportError:
+    resource_available = False
+
+RUN_REPORT_FILENAME = "run_report.json"
+
+def get_rss_mb():
+    """ Get the current resident set size in MB, None if psutil isn't installed. """
+    if(not psutil_available):
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+def get_peak_rss_mb():
+    """ Get the peak resident set size in MB, None if the platform can't report it. """
+    rss = get_rss_mb()
+    if(not resource_available):
+        return rss
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    peak = peak / (1024 * 1024) if sys.platform.startswith("darwin") else peak / 1024
+    # ru_maxrss can lag slightly behind the current RSS
+    return max(peak, rss) if rss is not None else peak
+
+class RunReport():
+    """
+    The RunReport collects a measurement for each ingest plugin, analysis, and saver that runs.
+        Each measurement is a dictionary entry with the phase, name, wall time, CPU time, RSS
+        delta, and the amount of identifiers the step added to the DataRepository. Steps can
+        add their own details to the entry, like the bytes a saver wrote.
+    Steps measured off the main thread, like concurrent savers, run next to each other, so their
+        CPU time is the measuring thread's own and the entry's cpu_clock is "thread". It doesn't
+        include threads the step starts, like a saver's file writers.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.start_ts = time.time()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextmanager
+    def measure(self, phase: str, name: str, data_repo=None, **details):
+        """
+        Measure the code run inside of the context, adding an entry to the report when it exits.
+
+        Args:
+            phase (str): The phase the step belongs to; ingest, analysis, or saving.
+            name (str): The plugin or analysis name.
+            data_repo (DataRepository): If provided, the identifiers added while in the context
+                are counted.
+            **details: Additional values for the entry.
+        Returns:
+            dict: The entry, values can be added to it inside of the context.
+        """
+        entry = {"phase": phase, "name": name, **details}
+
+        count_before = data_repo.count() if data_repo is not None else None
+        rss_before = get_rss_mb()
+        # process_time counts every thread of the process, it would count the other steps too
+        cpu_time = time.process_time
+        if(threading.current_thread() is not threading.main_thread()):
+            cpu_time = time.thread_time
+            entry["cpu_clock"] = "thread"
+        wall_start = time.perf_counter()
+        cpu_start = cpu_time()
+
+        try:
+            yield entry
+        finally:
+            entry["wall_seconds"] = time.perf_counter() - wall_start
+            entry["cpu_seconds"] = cpu_time() - cpu_start
+
+            rss_after = get_rss_mb()
+            entry["rss_delta_mb"] = rss_after - rss_before if rss_after is not None else None
+
+            if(data_repo is not None):
+                entry["identifiers_added"] = data_repo.count() - count_before
+
+            self.entries.append(entry)
+
+    def extend(self, entries: list, **details):
+        """ Add entries from another report, like one made in a worker process. The details are
+                added to each entry, for example the shard that produced it. """
+        for entry in entries:
+            self.entries.append({**entry, **details})
+
+    def get_phase_totals(self):
+        """ Get the summed wall and CPU seconds of each phase, in the order phases first ran. """
+        totals = {}
+        for entry in self.entries:
+            phase_total = totals.setdefault(entry["phase"], {"wall_seconds": 0.0, "cpu_seconds": 0.0, "steps": 0})
+            phase_total["wall_seconds"] += entry["wall_seconds"]
+            phase_total["cpu_seconds"] += entry["cpu_seconds"]
+            phase_total["steps"] += 1
+        return totals
+
+    def to_dict(self, **details):
+        """ Get the report as a JSON serializable dictionary. """
+        return {
+            **details,
+            "start_ts": self.start_ts,
+            "wall_seconds": time.perf_counter() - self._start_wall,
+            "cpu_seconds": time.process_time() - self._start_cpu,
+            "rss_mb": get_rss_mb(),
+            "peak_rss_mb": get_peak_rss_mb(),
+            "phases": self.get_phase_totals(),
+            "entries": self.entries,
+        }
+
+    def save(self, path: str, **details):
+        """ Save the report as JSON to the path, the details are added to the top level. """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_dict(**details), file, indent=2, default=str)
+
+    def print_summary(self, slowest_count=5):
+        """ Print the phase totals, the slowest steps, and memory usage. """
+        report = self.to_dict()
+
+        print(f"Run took {report["wall_seconds"]:.2f}s wall, {report["cpu_seconds"]:.2f}s CPU.")
+        for phase, totals in report["phases"].items():
+            print(f"  {phase}: {totals["wall_seconds"]:.2f}s wall, {totals["cpu_seconds"]:.2f}s CPU over {totals["steps"]} step(s)")
+
+        slowest = sorted(self.entries, key=lambda entry: entry["wall_seconds"], reverse=True)[:slowest_count]
+        if(len(slowest) > 0):
+            print(f"Slowest steps:")
+            for entry in slowest:
+                source = entry.get("shard", entry.get("period"))
+                source_printable = f" ({source})" if source is not None else ""
+                print(f"  {entry["phase"]} {entry["name"]}{source_printable}: {entry["wall_seconds"]:.2f}s")
+
+        if(report["rss_mb"] is not None):
+            print(f"Memory usage: {report["rss_mb"]:.2f} MB")
+        if(report["peak_rss_mb"] is not None):
+            print(f"Peak memory usage: {report["peak_rss_mb"]:.2f} MB")
+
+def measure(prog_data, phase: str, name: str, data_repo=None, **details):
+    """ Measure a step with the ProgramData's RunReport. When the run has no report this returns a
+            context that does nothing, yielding a throwaway entry. """
+    if(prog_data.run_report is None):
+        return nullcontext({})
+    return prog_data.run_report.measure(phase, name, data_repo, **details)
@@ -0,0 +1,173 @@
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import threading
+import time
+
+# The active Tracer, None when tracing is off. Spans cost a single check while tracing is off.
+_tracer = None
+
+TRACE_PROCESS_NAME = "AutoMetrics"
+TRACE_WORKER_PROCESS_NAME = "AutoMetrics worker"
+
+class Tracer():
+    """
+    The Tracer records spans as Chrome trace-event "X" (complete) events, these can be opened in
+        Perfetto (https://ui.perfetto.dev) or chrome://tracing. Timestamps are wall clock
+        microseconds so spans recorded by worker processes line up with the main process.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self._epoch_ns = time.time_ns()
+        self._perf_ns = time.perf_counter_ns()
+
+    def get_timestamp_us(self):
+        """ Get the current wall clock time in microseconds, measured with the performance counter. """
+        return (self._epoch_ns + time.perf_counter_ns() - self._perf_ns) / 1000
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """
+        Record a span covering the code run inside of the context.
+
+        Args:
+            name (str): The span name, an analysis name, identifier, or file path.
+            category (str): The span category, for example "analysis" or "write".
+            **args: Values shown with the span, values that aren't JSON types are stored as strings.
+        """
+        start_us = self.get_timestamp_us()
+        try:
+            yield
+        finally:
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start_us,
+                "dur": self.get_timestamp_us() - start_us,
+                "pid": self.pid,
+                "tid": threading.get_native_id(),
+                "args": {key: to_trace_arg(value) for key, value in args.items()}
+            })
+
+    def extend(self, events: list):
+        """ Add events recorded by another Tracer, like one in a worker process. """
+        self.events.extend(events)
+
+    def to_chrome_trace(self):
+        """ Get the trace as a Chrome trace-event JSON object, with the analysis dependencies added
+                as flow events and the analysis critical path in otherData. """
+        pids = sorted(set([event["pid"] for event in self.events]) | {self.pid})
+        metadata_events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": TRACE_PROCESS_NAME if pid == self.pid else TRACE_WORKER_PROCESS_NAME}}
+            for pid in pids
+        ]
+
+        analysis_spans = [event for event in self.events if event["cat"] == "analysis"]
+
+        return {
+            "traceEvents": metadata_events + self.events + get_dependency_flows(analysis_spans),
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "critical_path": get_critical_path(analysis_spans)
+            }
+        }
+
+    def save(self, path: str):
+        """ Save the trace as Chrome trace-event JSON to the path. """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+def to_trace_arg(value):
+    """ Convert a span argument into a JSON value. """
+    if(value is None or isinstance(value, (str, int, float, bool))):
+        return value
+    if(isinstance(value, (list, tuple))):
+        return [to_trace_arg(item) for item in value]
+    return str(value)
+
+def get_latest_spans(spans: list):
+    """ Get the span that ended last for each span name. Shards run an analysis once per shard, the
+            last one to finish is the one its dependents waited on. """
+    latest = {}
+    for span in spans:
+        if(span["name"] not in latest or span["ts"]+span["dur"] > latest[span["name"]]["ts"]+latest[span["name"]]["dur"]):
+            latest[span["name"]] = span
+    return latest
+
+def get_dependency_flows(analysis_spans: list):
+    """ Get flow events linking each analysis span to the analysis spans of its prereqs. """
+    latest = get_latest_spans(analysis_spans)
+
+    flows = []
+    for span in analysis_spans:
+        for prereq in span["args"].get("prereqs") or []:
+            if(prereq not in latest):
+                continue
+
+            prereq_span = latest[prereq]
+            flow_id = len(flows) // 2
+            flows.append({"name": prereq, "cat": "dependency", "ph": "s", "id": flow_id, "ts": prereq_span["ts"], "pid": prereq_span["pid"], "tid": prereq_span["tid"]})
+            flows.append({"name": prereq, "cat": "dependency", "ph": "f", "bp": "e", "id": flow_id, "ts": span["ts"], "pid": span["pid"], "tid": span["tid"]})
+
+    return flows
+
+def get_critical_path(analysis_spans: list):
+    """
+    Get the chain of analyses that decided when the last analysis finished. Starting at the
+        analysis that ended last, each step goes to the prereq that ended last.
+
+    Returns:
+        list[dict]: The analyses on the critical path, first to run first, with their durations in ms.
+    """
+    latest = get_latest_spans(analysis_spans)
+    if(len(latest) == 0):
+        return []
+
+    path = []
+    current = max(latest.values(), key=lambda span: span["ts"]+span["dur"])
+    while(current is not None):
+        path.append({"analysis": current["name"], "dur_ms": current["dur"] / 1000})
+
+        prereq_spans = [latest[prereq] for prereq in current["args"].get("prereqs") or [] if prereq in latest]
+        current = max(prereq_spans, key=lambda span: span["ts"]+span["dur"]) if len(prereq_spans) > 0 else None
+
+    return list(reversed(path))
+
+def enable_tracing():
+    """ Start tracing with a new Tracer, replacing the active one. """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+def disable_tracing():
+    global _tracer
+    _tracer = None
+
+def is_tracing():
+    return _tracer is not None
+
+def get_tracer() -> Tracer:
+    """ Get the active Tracer, None if tracing is off. """
+    return _tracer
+
+def span(name: str, category: str, **args):
+    """ Record a span with the active Tracer, see Tracer.span. Does nothing when tracing is off. """
+    if(_tracer is None):
+        return nullcontext()
+    return _tracer.span(name, category, **args)
+
+def get_trace_events():
+    """ Get the events recorded by the active Tracer, an empty list if tracing is off. """
+    if(_tracer is None):
+        return []
+    return _tracer.events
+
+def extend_trace(events: list):
+    """ Add events recorded in another process to the active Tracer. """
+    if(_tracer is not None):
+        _tracer.extend(events)
@@ -0,0 +1,44 @@
+""" Plugins for the runs in test_run_equivalence.py, loaded from ./plugins of the run's directory. """
+import numpy as np
+import pandas as pd
+
+from src.builtin_plugins.agg_analysis_driver import AggregateAnalysis
+from src.builtin_plugins.meta_analysis_driver import MetaAnalysis
+from src.builtin_plugins.simple_analysis_driver import SimpleAnalysis
+from src.data.data_repository import DataRepository
+from src.data.filters import *
+from src.plugin_mgmt.plugins import IngestPlugin, AnalysisPlugin
+
+@dataclass(frozen=True, slots=True)
+class ClusterIdentifier(TimeStampIdentifier):
+    """ The usage of one cluster in a period. """
+    cluster: str
+
+    def __str__(self):
+        return f"{self.cluster} {self.start_ts}-{self.end_ts}"
+
+class ClusterIngest(IngestPlugin):
+    """ Ingests random usage for each cluster and main period, seeded by the period so every run
+            of a period ingests the same data. """
+    def ingest(self, prog_data, config_section):
+        data_repo = DataRepository()
+        for start_ts, end_ts in prog_data.timeline.main_periods:
+            for cluster in ["east", "west"]:
+                rng = np.random.default_rng([int(start_ts), ord(cluster[0])])
+                df = pd.DataFrame({"namespace": rng.choice(["ns-a", "ns-b", "ns-c"], size=40), "hours": np.round(rng.random(40)*10, 3)})
+                data_repo.add(ClusterIdentifier(start_ts, end_ts, cluster), df)
+        return data_repo
+
+def get_cluster(identifier):
+    return identifier.find_base().cluster
+
+class ClusterAnalyses(AnalysisPlugin):
+    def get_analyses(self):
+        return [
+            SimpleAnalysis("hours", [], filter_type(ClusterIdentifier), lambda identifier, data_repo: float(data_repo.get_data(identifier)["hours"].sum())),
+            SimpleAnalysis("namespaces", [], filter_type(ClusterIdentifier), lambda identifier, data_repo: data_repo.get_data(identifier).groupby("namespace", as_index=False)["hours"].sum()),
+            SimpleAnalysis("busiest", ["namespaces"], filter_analyis_type("namespaces"), lambda identifier, data_repo: str(data_repo.get_data(identifier).sort_values("hours").iloc[-1]["namespace"])),
+            # One table for every cluster, the AnalysisSaver names per key tables the same
+            MetaAnalysis("hours_over_time", ["hours"], get_cluster, long_format=True),
+            AggregateAnalysis("hours_total", ["hours"], filter_analyis_type("hours"), get_cluster, lambda identifiers, data_repo: sum([data_repo.get_data(identifier) for identifier in identifiers])),
+        ]
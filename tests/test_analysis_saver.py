@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.builtin_plugins.analysis_saver import AnalysisSaver
+from src.data.data_repository import DataRepository
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier
+from src.utils.fileutils import append_line_to_file
+
+def build_repository(sources: int = 50, analyses: int = 3):
+    """ One hourly period per source, added out of order, each with a scalar result per analysis. """
+    data_repo = DataRepository()
+    for source in reversed(range(sources)):
+        base = TimeStampIdentifier(1_700_000_000 + source*3600, 1_700_000_000 + source*3600 + 3599)
+        for analysis in range(analyses):
+            data_repo.add(AnalysisIdentifier(base, f"text_{analysis}"), source*0.5 + analysis if analysis != 2 else [source, "items"])
+    return data_repo
+
+def save_appending(text_results: dict, path: str):
+    """ The text results write loop from before the buffered writer, appending each period. """
+    ordered_keys = sorted(text_results.keys(), key=lambda x: x.start_ts)
+    for index, identifier in enumerate(ordered_keys):
+        to_append = f"For {identifier}:\n  {"\n  ".join(text_results[identifier])}"
+        append_line_to_file(path, to_append, overwrite=(index == 0))
+
+def test_text_results_match_appending_each_period(tmp_path):
+    saver = AnalysisSaver()
+    saved_files = saver.save(SimpleNamespace(data_repo=build_repository()), None, str(tmp_path / "buffered"))
+
+    buffered_path = str(tmp_path / "buffered" / "text_results.txt")
+    appending_path = str(tmp_path / "appending.txt")
+    save_appending(saver.text_results, appending_path)
+
+    assert saved_files == [buffered_path]
+    with open(buffered_path) as buffered_file, open(appending_path) as appending_file:
+        assert buffered_file.read() == appending_file.read()
+
+def test_text_results_are_ordered_by_period(tmp_path):
+    AnalysisSaver().save(SimpleNamespace(data_repo=build_repository(sources=3)), None, str(tmp_path))
+
+    with open(tmp_path / "text_results.txt") as file:
+        periods = [line for line in file.read().split("\n") if line.startswith("For ")]
+    assert periods == [f"For {TimeStampIdentifier(1_700_000_000 + source*3600, 1_700_000_000 + source*3600 + 3599)}:" for source in range(3)]
+
+def test_missing_results_are_skipped(tmp_path):
+    data_repo = DataRepository()
+    base = TimeStampIdentifier(0, 3599)
+    data_repo.add(AnalysisIdentifier(base, "missing"), None)
+    data_repo.add(AnalysisIdentifier(base, "table"), pd.DataFrame({"a": [1, 2]}))
+    data_repo.add(AnalysisIdentifier(base, "total"), 5)
+    prog_data = SimpleNamespace(data_repo=data_repo, config={"saving": {"incremental": True}})
+
+    saver = AnalysisSaver()
+    saved_files = saver.save(prog_data, None, str(tmp_path))
+
+    assert sorted(saved_files) == sorted([str(tmp_path / AnalysisIdentifier(base, "table").fs_str() / "table.csv"), str(tmp_path / "text_results.txt")])
+    assert saver.get_write_stats()["files_written"] == 2
+    # The manifest was saved, so the next run skips both files
+    next_saver = AnalysisSaver()
+    assert sorted(next_saver.save(prog_data, None, str(tmp_path))) == sorted(saved_files)
+    assert next_saver.get_write_stats()["files_skipped"] == 2
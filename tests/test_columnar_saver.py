@@ -0,0 +1,73 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src.builtin_plugins.columnar_saver import ColumnarSaver, ENTIRE_RANGE_PARTITION
+from src.data.compaction import pyarrow_available
+from src.data.data_repository import DataRepository
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier
+
+pytestmark = pytest.mark.skipif(not pyarrow_available, reason="pyarrow is not installed")
+
+FIRST = TimeStampIdentifier(0, 3599)
+SECOND = TimeStampIdentifier(3600, 7199)
+
+def build_repository():
+    """ Two periods with a table and a total each, and a combined table run on both the table and
+            the total of the first period, so both combined results share its base period. """
+    data_repo = DataRepository()
+    for index, base in enumerate([FIRST, SECOND]):
+        data_repo.add(AnalysisIdentifier(base, "table"), pd.DataFrame({"namespace": ["a", "b"], "hours": [index + 0.5, index + 1.5]}))
+        data_repo.add(AnalysisIdentifier(base, "total"), index*10)
+    data_repo.add(AnalysisIdentifier(AnalysisIdentifier(FIRST, "table"), "combined"), pd.DataFrame({"source": ["table"]}))
+    data_repo.add(AnalysisIdentifier(AnalysisIdentifier(FIRST, "total"), "combined"), pd.DataFrame({"source": ["total"]}))
+    data_repo.add(MetaAnalysisIdentifier(None, "meta", "hours"), pd.DataFrame({"period": [0, 1]}))
+    data_repo.add(AnalysisIdentifier(SECOND, "items"), ["x", "y"])
+    return data_repo
+
+def save(tmp_path, config_section=None):
+    prog_data = SimpleNamespace(data_repo=build_repository(), config={})
+    saved_files = ColumnarSaver().save(prog_data, config_section, str(tmp_path))
+    with open(tmp_path / "manifest.json") as file:
+        return saved_files, json.load(file)
+
+def read_table(path, format):
+    return pd.read_parquet(path) if format == "parquet" else pd.read_feather(path)
+
+@pytest.mark.parametrize("format", ["parquet", "feather"])
+def test_frames_are_partitioned(tmp_path, format):
+    saved_files, manifest = save(tmp_path, {"format": format})
+
+    entries = {entry["identifier"]: entry for entry in manifest["files"]}
+    assert manifest["format"] == format
+    assert entries[str(AnalysisIdentifier(FIRST, "table"))]["path"] == f"table/{FIRST.fs_str()}.{format}"
+    assert entries[str(AnalysisIdentifier(SECOND, "table"))]["path"] == f"table/{SECOND.fs_str()}.{format}"
+    assert entries[str(MetaAnalysisIdentifier(None, "meta", "hours"))]["path"] == f"meta/{ENTIRE_RANGE_PARTITION}__hours.{format}"
+
+    table = read_table(tmp_path / "table" / f"{SECOND.fs_str()}.{format}", format)
+    assert table.equals(pd.DataFrame({"namespace": ["a", "b"], "hours": [1.5, 2.5]}))
+    assert sorted(saved_files) == sorted([str(tmp_path / entry["path"]) for entry in manifest["files"]] + [str(tmp_path / f"scalars.{format}"), str(tmp_path / "manifest.json")])
+
+def test_colliding_partitions_get_their_own_files(tmp_path):
+    _, manifest = save(tmp_path)
+
+    combined = [entry for entry in manifest["files"] if entry["analysis"] == "combined"]
+    assert len(combined) == 2
+    assert len({entry["path"] for entry in manifest["files"]}) == len(manifest["files"])
+    for source in ["table", "total"]:
+        identifier = AnalysisIdentifier(AnalysisIdentifier(FIRST, source), "combined")
+        entry = next(entry for entry in combined if entry["identifier"] == str(identifier))
+        assert entry["path"] == f"combined/{identifier}.parquet" and entry["base"] == str(FIRST)
+        assert pd.read_parquet(tmp_path / entry["path"])["source"].tolist() == [source]
+
+def test_scalars_table(tmp_path):
+    _, manifest = save(tmp_path)
+
+    scalars = pd.read_parquet(tmp_path / "scalars.parquet")
+    assert manifest["scalars"] == {"path": "scalars.parquet", "rows": 3}
+    assert scalars["identifier"].tolist() == [str(AnalysisIdentifier(FIRST, "total")), str(AnalysisIdentifier(SECOND, "items")), str(AnalysisIdentifier(SECOND, "total"))]
+    assert scalars["start_ts"].tolist() == [0, 3600, 3600]
+    assert scalars["value"].fillna(-1).tolist() == [0.0, -1, 10.0]
+    assert scalars["text"].tolist() == ["0", "x, y", "10"]
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.builtin_plugins.simple_analysis_driver import SimpleAnalysis, SimpleAnalysisDriver
+from src.data.compaction import compact_dataframe, compact_repository, pyarrow_available
+from src.data.data_repository import DataRepository
+from src.data.filters import filter_type
+from src.data.identifier import AnalysisIdentifier, TimeStampIdentifier
+
+def build_frame(seed: int, rows: int = 200):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "namespace": rng.choice([f"ns{index}" for index in range(8)], size=rows),
+        "node": [f"node{index}" for index in range(rows)],
+        "cpu": rng.integers(100, 121, size=rows),
+        "gpu": rng.integers(100, 121, size=rows),
+        "hours": np.round(rng.random(rows)*24, 1),
+    })
+
+def top_namespaces(identifier, data_repo):
+    df = data_repo.get_data(identifier)
+    top = df.groupby("namespace", as_index=False, observed=True)["hours"].sum()
+    return top.sort_values("hours", ascending=False, kind="stable").head(5)
+
+def busy_namespaces(identifier, data_repo):
+    df = data_repo.get_data(identifier)
+    busy = df[df["cpu"] + df["gpu"] > 230]
+    return busy.groupby("namespace", observed=True)["node"].count().to_dict()
+
+ANALYSES = [
+    SimpleAnalysis("total_hours", [], filter_type(TimeStampIdentifier), lambda identifier, data_repo: float(data_repo.get_data(identifier)["hours"].sum())),
+    SimpleAnalysis("total_cores", [], filter_type(TimeStampIdentifier), lambda identifier, data_repo: int((data_repo.get_data(identifier)["cpu"] + data_repo.get_data(identifier)["gpu"]).sum())),
+    SimpleAnalysis("peak_cores", [], filter_type(TimeStampIdentifier), lambda identifier, data_repo: (data_repo.get_data(identifier)["cpu"] + data_repo.get_data(identifier)["gpu"]).tolist()),
+    SimpleAnalysis("top_namespaces", [], filter_type(TimeStampIdentifier), top_namespaces),
+    SimpleAnalysis("busy_namespaces", [], filter_type(TimeStampIdentifier), busy_namespaces),
+]
+
+def run_analyses(compact_mode=None):
+    data_repo = DataRepository()
+    for period in range(3):
+        data_repo.add(TimeStampIdentifier(period*3600, period*3600 + 3599), build_frame(period))
+    if(compact_mode is not None):
+        compact_repository(data_repo, compact_mode, "test")
+
+    driver = SimpleAnalysisDriver()
+    for analysis in ANALYSES:
+        driver.run_analysis(analysis, SimpleNamespace(data_repo=data_repo), None)
+
+    return {identifier: data_repo.get_data(identifier) for identifier in data_repo.filter_ids(filter_type(AnalysisIdentifier))}
+
+def assert_same_result(result, expected):
+    if(isinstance(expected, pd.DataFrame)):
+        # Categorical columns compare by their values
+        pd.testing.assert_frame_equal(result.astype({column: object for column in result.select_dtypes("category").columns}).reset_index(drop=True), expected.reset_index(drop=True))
+    else:
+        assert result == expected and type(result) is type(expected)
+
+@pytest.mark.parametrize("mode", ["standard", pytest.param("arrow", marks=pytest.mark.skipif(not pyarrow_available, reason="pyarrow is not installed"))])
+def test_analyses_on_compacted_frames_match(mode):
+    expected = run_analyses()
+    results = run_analyses(mode)
+
+    assert results.keys() == expected.keys()
+    for identifier, result in results.items():
+        assert_same_result(result, expected[identifier])
+
+def test_standard_keeps_numeric_dtypes():
+    df = pd.DataFrame({"a": [100, 120], "b": [100, 100], "c": [0.5, 1.5], "s": ["x", "x"]})
+    compacted = compact_dataframe(df)
+
+    assert compacted.dtypes["a"] == np.int64 and compacted.dtypes["c"] == np.float64
+    assert (compacted["a"] + compacted["b"]).tolist() == [200, 220]
+    assert isinstance(compacted.dtypes["s"], pd.CategoricalDtype)
+
+def test_downcast_shrinks_numbers_losslessly():
+    df = pd.DataFrame({"a": [100, 120], "u": np.array([1, 2], dtype=np.uint64), "c": [0.5, 1.5], "p": [0.1, 0.2]})
+    compacted = compact_dataframe(df, "downcast")
+
+    assert compacted.dtypes.to_dict() == {"a": np.int8, "u": np.uint8, "c": np.float32, "p": np.float64}
+    assert compacted.astype(np.float64).equals(df.astype(np.float64))
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        compact_dataframe(pd.DataFrame({"a": [1]}), "smallest")
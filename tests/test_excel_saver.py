@@ -0,0 +1,100 @@
+import re
+import zipfile
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from src.builtin_plugins import excel_saver
+from src.builtin_plugins.excel_saver import ExcelSaver, SCALARS_SHEET_NAME, get_column_cells, get_sheet_name
+from src.data.data_repository import DataRepository
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier
+
+NAMESPACES = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+FIRST = TimeStampIdentifier(0, 3599)
+SECOND = TimeStampIdentifier(3600, 7199)
+
+def read_workbook(path) -> dict:
+    """ Read the cells of each sheet as {sheet name: {cell reference: value}}, sheets in workbook order. """
+    with zipfile.ZipFile(path) as workbook_file:
+        workbook = ElementTree.fromstring(workbook_file.read("xl/workbook.xml"))
+        sheets = {}
+        for position, sheet in enumerate(workbook.iterfind("main:sheets/main:sheet", NAMESPACES), start=1):
+            worksheet = ElementTree.fromstring(workbook_file.read(f"xl/worksheets/sheet{position}.xml"))
+            cells = {}
+            for cell in worksheet.iterfind("main:sheetData/main:row/main:c", NAMESPACES):
+                if(cell.get("t") == "inlineStr"):
+                    cells[cell.get("r")] = cell.find("main:is/main:t", NAMESPACES).text
+                elif(cell.get("t") == "b"):
+                    cells[cell.get("r")] = cell.find("main:v", NAMESPACES).text == "1"
+                else:
+                    cells[cell.get("r")] = float(cell.find("main:v", NAMESPACES).text)
+            sheets[sheet.get("name")] = cells
+        return sheets
+
+def get_rows(cells: dict) -> int:
+    return max([int(re.sub(r"[A-Z]", "", reference)) for reference in cells])
+
+def save(tmp_path, data_repo: DataRepository, config_section=None):
+    saved_files = ExcelSaver().save(SimpleNamespace(data_repo=data_repo), config_section, str(tmp_path))
+    assert saved_files == [str(tmp_path / "analyses.xlsx")]
+    return read_workbook(saved_files[0])
+
+def test_sheet_names_are_sanitized_and_unique():
+    used_names = {SCALARS_SHEET_NAME.lower()}
+
+    assert get_sheet_name("cpu/gpu [hours]: *?", used_names) == "cpu_gpu _hours__ __"
+    assert get_sheet_name("'quoted'", used_names) == "quoted"
+    assert get_sheet_name("", used_names) == "Sheet"
+    assert get_sheet_name("History", used_names) == "History_"
+    assert get_sheet_name("scalar results", used_names) == "scalar results (2)"
+    long_name = "namespaces by hours used per month"
+    assert get_sheet_name(long_name, used_names) == long_name[:31]
+    assert get_sheet_name(long_name.upper(), used_names) == long_name.upper()[:27] + " (2)"
+    assert get_sheet_name(long_name, used_names) == long_name[:27] + " (3)"
+    assert all([len(name) <= 31 for name in used_names])
+
+def test_datetimes_become_serial_dates():
+    naive = pd.Series(pd.to_datetime(["1899-12-31 00:00", "2024-01-01 12:00", None]))
+    aware = pd.Series(pd.to_datetime(["2024-01-01 12:00"])).dt.tz_localize("Europe/Berlin")
+
+    assert get_column_cells(naive) == ([1.0, 45292.5, None], True)
+    # Timezone aware datetimes keep their local time
+    assert get_column_cells(aware) == ([45292.5], True)
+    assert get_column_cells(pd.Series([1.5, None])) == ([1.5, None], False)
+
+def test_periods_are_stacked_with_every_column(tmp_path):
+    data_repo = DataRepository()
+    # Added out of order, the sheet is in time order
+    data_repo.add(AnalysisIdentifier(SECOND, "usage"), pd.DataFrame({"namespace": ["b"], "gpu": [2], "when": pd.to_datetime(["2024-01-01 12:00"])}))
+    data_repo.add(AnalysisIdentifier(FIRST, "usage"), pd.DataFrame({"namespace": ["a", "c"], "cpu": [1.5, 3.0], "done": [True, False]}))
+    data_repo.add(MetaAnalysisIdentifier(None, "usage/meta", "cpu"), pd.DataFrame({"period": ["x"]}))
+    data_repo.add(AnalysisIdentifier(FIRST, "total"), 4)
+    data_repo.add(AnalysisIdentifier(SECOND, "items"), ["x", "y"])
+
+    sheets = save(tmp_path, data_repo)
+
+    assert list(sheets.keys()) == ["usage", "usage_meta cpu", SCALARS_SHEET_NAME]
+    assert sheets["usage"] == {
+        "A1": "Source", "B1": "namespace", "C1": "cpu", "D1": "done", "E1": "gpu", "F1": "when",
+        "A2": str(FIRST), "B2": "a", "C2": 1.5, "D2": True,
+        "A3": str(FIRST), "B3": "c", "C3": 3.0, "D3": False,
+        "A4": str(SECOND), "B4": "b", "E4": 2.0, "F4": 45292.5
+    }
+    assert sheets["usage_meta cpu"] == {"A1": "period", "A2": "x"}
+    assert sheets[SCALARS_SHEET_NAME] == {
+        "A1": "Source", "B1": "Analysis", "C1": "Value",
+        "A2": str(FIRST), "B2": "total", "C2": 4.0,
+        "A3": str(SECOND), "B3": "items", "C3": "x, y"
+    }
+
+def test_rows_are_cut_at_the_row_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_saver, "EXCEL_MAX_ROWS", 4)
+    data_repo = DataRepository()
+    for base in [FIRST, SECOND, TimeStampIdentifier(7200, 10799)]:
+        data_repo.add(AnalysisIdentifier(base, "usage"), pd.DataFrame({"cpu": [base.start_ts, base.start_ts + 1]}))
+
+    sheets = save(tmp_path, data_repo)
+
+    assert get_rows(sheets["usage"]) == 4
+    assert [sheets["usage"][f"B{row}"] for row in range(2, 5)] == [0.0, 1.0, 3600.0]
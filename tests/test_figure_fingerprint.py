@@ -0,0 +1,110 @@
+import dataclasses
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+
+from src.builtin_plugins.vis_analysis_driver import VisualAnalysisDriver
+from src.builtin_plugins.vis_dataclasses import VisIdentifier, VisualAnalysis, VisBarSettings, RenderedFigure
+from src.builtin_plugins.vis_impls import FigureCache, FigureSpec, get_figure_fingerprint, read_png_fingerprint, render_png
+from src.builtin_plugins.vis_saver import VizualizationsSaver
+from src.data.data_repository import DataRepository
+from src.data.filters import filter_analyis_type, filter_type
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier
+
+BASE = TimeStampIdentifier(1_700_000_000, 1_700_003_599)
+ANALYSIS = VisualAnalysis("top_vis", [], filter_analyis_type("top"), VisBarSettings("Top namespaces", None, "", "green"))
+
+def build_frame(hours: float = 3.0):
+    return pd.DataFrame({"namespace": ["a", "b"], "hours": [hours, 1.0]})
+
+def build_spec(df: pd.DataFrame = None, title="Top namespaces"):
+    return FigureSpec("bar", build_frame() if df is None else df, {}, title, "", "green")
+
+def run_and_save(out_path, df: pd.DataFrame, config_section: dict = None):
+    """ Render the figure of df like a run with the driver's config_section, then save it. """
+    data_repo = DataRepository()
+    data_repo.add(AnalysisIdentifier(BASE, "top"), df)
+    prog_data = SimpleNamespace(data_repo=data_repo, config={"saving": {}})
+
+    VisualAnalysisDriver().run_analysis(ANALYSIS, prog_data, {"render": "png", **(config_section or {})})
+    saver = VizualizationsSaver()
+    saved_files = saver.save(prog_data, None, str(out_path))
+    return saver, saved_files[0]
+
+def test_fingerprint_follows_inputs():
+    fingerprint = get_figure_fingerprint(build_spec())
+
+    assert get_figure_fingerprint(build_spec(build_frame())) == fingerprint
+    assert get_figure_fingerprint(build_spec(build_frame(4.0))) != fingerprint
+    assert get_figure_fingerprint(build_spec(title="Top users")) != fingerprint
+    assert get_figure_fingerprint(dataclasses.replace(build_spec(), engine="fast")) != fingerprint
+    assert get_figure_fingerprint(build_spec(build_frame().astype({"hours": "float32"}))) != fingerprint
+
+def test_png_fingerprint_is_read_back(tmp_path):
+    fingerprinted = tmp_path / "fingerprinted.png"
+    fingerprinted.write_bytes(render_png(build_spec(), "abc123"))
+    plain = tmp_path / "plain.png"
+    plain.write_bytes(render_png(build_spec()))
+    not_png = tmp_path / "not.png"
+    not_png.write_bytes(b"not a png")
+
+    assert read_png_fingerprint(str(fingerprinted)) == "abc123"
+    assert read_png_fingerprint(str(plain)) is None
+    assert read_png_fingerprint(str(not_png)) is None
+    assert read_png_fingerprint(str(tmp_path / "missing.png")) is None
+
+def test_figure_cache_stores_by_fingerprint(tmp_path):
+    cache = FigureCache(str(tmp_path / "cache"))
+
+    assert not cache.contains("abc123")
+    path = cache.put("abc123", b"png")
+    assert cache.contains("abc123") and path == cache.get_path("abc123")
+    assert Path(path).read_bytes() == b"png"
+
+def test_unchanged_figures_are_not_written_again(tmp_path):
+    saver, path = run_and_save(tmp_path, build_frame())
+    first_png = Path(path).read_bytes()
+    first_mtime = os.stat(path).st_mtime_ns
+    assert saver.unchanged_count == 0
+    assert read_png_fingerprint(path) == get_figure_fingerprint(build_spec())
+
+    saver, path = run_and_save(tmp_path, build_frame())
+    assert saver.unchanged_count == 1
+    assert os.stat(path).st_mtime_ns == first_mtime
+
+    saver, path = run_and_save(tmp_path, build_frame(4.0))
+    assert saver.unchanged_count == 0
+    assert read_png_fingerprint(path) == get_figure_fingerprint(build_spec(build_frame(4.0)))
+    assert Path(path).read_bytes() != first_png
+
+def test_png_without_fingerprint_is_written_over(tmp_path):
+    saver, path = run_and_save(tmp_path, build_frame())
+    Path(path).write_bytes(render_png(build_spec()))
+
+    saver, path = run_and_save(tmp_path, build_frame())
+
+    assert saver.unchanged_count == 0
+    assert read_png_fingerprint(path) == get_figure_fingerprint(build_spec())
+
+def test_cached_figures_are_reused(tmp_path):
+    config_section = {"figure-cache": str(tmp_path / "cache")}
+    _, path = run_and_save(tmp_path / "first", build_frame(), config_section)
+    cache = FigureCache(config_section["figure-cache"])
+    fingerprint = get_figure_fingerprint(build_spec())
+    assert cache.contains(fingerprint)
+
+    data_repo = DataRepository()
+    data_repo.add(AnalysisIdentifier(BASE, "top"), build_frame())
+    VisualAnalysisDriver().run_analysis(ANALYSIS, SimpleNamespace(data_repo=data_repo), {"render": "png", **config_section})
+    figure = data_repo.get_data(data_repo.filter_ids(filter_type(VisIdentifier))[0])
+    assert figure == RenderedFigure(None, fingerprint, cache.get_path(fingerprint))
+
+    saver, second_path = run_and_save(tmp_path / "second", build_frame(), config_section)
+    assert saver.unchanged_count == 0
+    assert Path(second_path).read_bytes() == Path(path).read_bytes()
+    saver, second_path = run_and_save(tmp_path / "second", build_frame(), config_section)
+    assert saver.unchanged_count == 1
@@ -0,0 +1,58 @@
+import os
+
+from src.utils import fileutils
+from src.utils.fileutils import link_or_copy_file
+
+def write(path, text):
+    with open(path, "w") as file:
+        file.write(text)
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+def test_link_replaces_existing_file(tmp_path):
+    src_path, dst_path = tmp_path / "cached.png", tmp_path / "figure.png"
+    write(src_path, "new")
+    write(dst_path, "old")
+
+    assert link_or_copy_file(src_path, dst_path)
+    assert read(dst_path) == "new"
+    assert os.path.samefile(src_path, dst_path)
+    assert sorted(os.listdir(tmp_path)) == ["cached.png", "figure.png"]
+
+def test_link_keeps_destination_until_replaced(tmp_path, monkeypatch):
+    src_path, dst_path = tmp_path / "cached.png", tmp_path / "figure.png"
+    write(src_path, "new")
+    write(dst_path, "old")
+
+    link = os.link
+    def checked_link(src, dst):
+        assert read(dst_path) == "old", "The destination was removed before the link replaced it"
+        link(src, dst)
+    monkeypatch.setattr(fileutils.os, "link", checked_link)
+
+    assert link_or_copy_file(src_path, dst_path)
+    assert read(dst_path) == "new"
+
+def test_relinking_the_same_file_leaves_no_temporary_link(tmp_path):
+    src_path, dst_path = tmp_path / "cached.png", tmp_path / "figure.png"
+    write(src_path, "same")
+    link_or_copy_file(src_path, dst_path)
+
+    assert link_or_copy_file(src_path, dst_path)
+    assert sorted(os.listdir(tmp_path)) == ["cached.png", "figure.png"]
+
+def test_copies_when_linking_fails(tmp_path, monkeypatch):
+    src_path, dst_path = tmp_path / "cached.png", tmp_path / "figure.png"
+    write(src_path, "new")
+    write(dst_path, "old")
+
+    def failing_link(src, dst):
+        raise OSError("cross-device link")
+    monkeypatch.setattr(fileutils.os, "link", failing_link)
+
+    assert not link_or_copy_file(src_path, dst_path)
+    assert read(dst_path) == "new"
+    assert not os.path.samefile(src_path, dst_path)
+    assert sorted(os.listdir(tmp_path)) == ["cached.png", "figure.png"]
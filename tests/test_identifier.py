@@ -0,0 +1,56 @@
+import pickle
+
+import numpy as np
+
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier, AggregateAnalysisIdentifier
+
+def test_equal_identifiers_are_interned():
+    base = TimeStampIdentifier(10, 20)
+    identifier = AnalysisIdentifier(base, "total")
+
+    assert TimeStampIdentifier(10, 20) is base
+    assert AnalysisIdentifier(TimeStampIdentifier(10, 20), "total") is identifier
+    assert MetaAnalysisIdentifier(None, "meta", "key") is MetaAnalysisIdentifier(None, "meta", "key")
+    assert AnalysisIdentifier(base, "mean") is not identifier
+
+def test_unpickled_identifiers_are_interned():
+    identifier = AnalysisIdentifier(TimeStampIdentifier(10, 20), "total")
+
+    assert pickle.loads(pickle.dumps(identifier)) is identifier
+
+def test_field_types_keep_their_own_identifier():
+    int_identifier = TimeStampIdentifier(100, 200)
+    float_identifier = TimeStampIdentifier(100.0, 200.0)
+    numpy_identifier = TimeStampIdentifier(np.int64(300), np.int64(400))
+    later_int_identifier = TimeStampIdentifier(300, 400)
+
+    assert int_identifier == float_identifier and int_identifier is not float_identifier
+    assert float_identifier.fs_str() == "timestamps 100.0-200.0"
+    assert type(later_int_identifier.start_ts) is int
+    assert AnalysisIdentifier(float_identifier, "total").fs_str() == "total__timestamps 100.0-200.0"
+    assert AnalysisIdentifier(int_identifier, "total").fs_str() == "total__timestamps 100-200"
+
+def test_tuple_field_types_keep_their_own_identifier():
+    base = AnalysisIdentifier(None, "sum")
+    int_identifier = AggregateAnalysisIdentifier(base, "agg", (1, 2))
+    float_identifier = AggregateAnalysisIdentifier(base, "agg", (1.0, 2))
+
+    assert int_identifier is not float_identifier
+    assert float_identifier.key == (1.0, 2)
+
+def test_hash_is_cached():
+    identifier = TimeStampIdentifier(30, 40)
+
+    assert hash(identifier) == hash((30, 40))
+    # A frozen identifier can only change through object.__setattr__, the cached hash stays
+    object.__setattr__(identifier, "start_ts", 31)
+    assert hash(identifier) == hash((30, 40))
+    object.__setattr__(identifier, "start_ts", 30)
+
+def test_find_base_is_cached():
+    base = TimeStampIdentifier(50, 60)
+    identifier = AnalysisIdentifier(AnalysisIdentifier(base, "inner"), "outer")
+
+    assert identifier.find_base() is base
+    assert identifier._base_cache is base
+    assert AnalysisIdentifier(None, "loose").find_base() is None
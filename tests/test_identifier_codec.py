@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.builtin_plugins.vis_dataclasses import VisIdentifier
+from src.data.identifier import TimeStampIdentifier, AnalysisIdentifier, MetaAnalysisIdentifier, AggregateAnalysisIdentifier
+from src.data.identifier_codec import encode_identifiers, decode_identifiers, encode_identifier, decode_identifier
+
+def build_identifiers(periods: int = 3, keys: int = 4):
+    """ The identifiers of a small run, each analysis and visualization shares its .on subtree with
+            the others on the same period. """
+    identifiers = []
+    for period in range(periods):
+        start_ts = 1_700_000_000 + period*2_592_000
+        base = TimeStampIdentifier(start_ts, start_ts + 2_591_999)
+        identifiers.append(base)
+        for analysis in ["sum", "mean", "top"]:
+            analysis_identifier = AnalysisIdentifier(base, analysis)
+            identifiers.append(analysis_identifier)
+            identifiers.append(VisIdentifier(analysis_identifier, "bar"))
+
+    for key_index in range(keys):
+        identifiers.append(MetaAnalysisIdentifier(None, "meta", f"key_{key_index}"))
+    identifiers.append(AggregateAnalysisIdentifier(AnalysisIdentifier(TimeStampIdentifier(0, 1), "sum"), "agg", None))
+
+    return identifiers
+
+def test_round_trip_is_interned():
+    identifiers = build_identifiers()
+    decoded = decode_identifiers(encode_identifiers(identifiers))
+
+    assert decoded == identifiers
+    assert all([a is b for a, b in zip(decoded, identifiers)])
+
+@pytest.mark.parametrize("identifier", [
+    TimeStampIdentifier(-1, 2**62),
+    TimeStampIdentifier(1.5, 2.25),
+    AnalysisIdentifier(None, ""),
+    AnalysisIdentifier(TimeStampIdentifier(0, 0), "ünïcødé"),
+    AggregateAnalysisIdentifier(AnalysisIdentifier(None, "a"), "agg", (1, -2.5, True, False, None, ("nested",))),
+])
+def test_edge_case_round_trips(identifier):
+    assert decode_identifier(encode_identifier(identifier)) == identifier
+
+@pytest.mark.parametrize("numpy_fields, python_fields", [
+    ((np.int64(1), 2), (1, 2)),
+    ((np.int32(-7), np.uint64(2**63)), (-7, 2**63)),
+    ((np.float64(1.5), np.float32(2.5)), (1.5, 2.5)),
+])
+def test_numpy_numbers_encode_as_python_numbers(numpy_fields, python_fields):
+    payload = encode_identifier(TimeStampIdentifier(*numpy_fields))
+
+    assert payload == encode_identifier(TimeStampIdentifier(*python_fields))
+    assert decode_identifier(payload) == TimeStampIdentifier(*numpy_fields)
+
+def test_unsupported_value_raises():
+    with pytest.raises(ValueError):
+        encode_identifier(AnalysisIdentifier(None, ("a", object())))
+
+def test_truncated_payload_raises():
+    payload = encode_identifiers(build_identifiers()[:10])
+    with pytest.raises(ValueError):
+        decode_identifiers(payload[:-2])
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from src.pipeline import run_savers
+from src.plugin_mgmt.plugins import Saver
+from src.utils.profiling import Profiler
+
+class FileSaver(Saver):
+    """ A concurrent saver writing one file, recording the threads it was run on. """
+    CONCURRENT = True
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.threads = []
+
+    def save(self, prog_data, config_section, base_path):
+        self.threads.append(threading.current_thread().name)
+        # Long enough for concurrent savers to overlap
+        time.sleep(0.1)
+        os.makedirs(base_path, exist_ok=True)
+        path = os.path.join(base_path, self.filename)
+        with open(path, "w") as file:
+            file.write(self.filename)
+        return [path]
+
+def make_prog_data(savers: dict, profiler=None):
+    config = {"saving": {"run": list(savers.keys())}}
+    for saver_name in savers.keys():
+        config[saver_name] = {"addtl-base": saver_name}
+    return SimpleNamespace(
+        config=config,
+        loaded_plugins=SimpleNamespace(get_plugin_by_name=lambda name: savers[name]),
+        profiler=profiler,
+        run_report=None,
+        saver_streams={},
+        saved_files=[]
+    )
+
+def test_concurrent_savers_run_on_threads(tmp_path):
+    savers = {"FirstSaver": FileSaver("first.txt"), "SecondSaver": FileSaver("second.txt")}
+    saved_files = run_savers(make_prog_data(savers), str(tmp_path))
+
+    assert saved_files == [str(tmp_path / "FirstSaver" / "first.txt"), str(tmp_path / "SecondSaver" / "second.txt")]
+    assert all([saver.threads[0].startswith("Saver") for saver in savers.values()])
+
+def test_cprofiled_concurrent_savers_all_save(tmp_path):
+    savers = {"FirstSaver": FileSaver("first.txt"), "SecondSaver": FileSaver("second.txt")}
+    profiler = Profiler("cprofile")
+    saved_files = run_savers(make_prog_data(savers, profiler), str(tmp_path))
+
+    assert saved_files == [str(tmp_path / "FirstSaver" / "first.txt"), str(tmp_path / "SecondSaver" / "second.txt")]
+    assert set(profiler.profiles.keys()) == {"saving_FirstSaver", "saving_SecondSaver"}
+    saved_profiles = profiler.save(str(tmp_path / "profiles"))
+    assert len(saved_profiles) == 2 and all([os.path.getsize(path) > 0 for path in saved_profiles])
+
+def test_sampled_concurrent_savers_run_on_threads(tmp_path):
+    savers = {"FirstSaver": FileSaver("first.txt"), "SecondSaver": FileSaver("second.txt")}
+    saved_files = run_savers(make_prog_data(savers, Profiler("sample")), str(tmp_path))
+
+    assert len(saved_files) == 2
+    assert all([saver.threads[0].startswith("Saver") for saver in savers.values()])
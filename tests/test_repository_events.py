@@ -0,0 +1,153 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src.data.data_repository import DataRepository
+from src.data.filters import filter_analyis_type, filter_type
+from src.data.identifier import AnalysisIdentifier, TimeStampIdentifier
+from src.data.repository_events import EVENT_ADD, EVENT_JOIN, EVENT_REMOVE, EVENT_UPDATE_DATA, EVENT_UPDATE_METADATA
+
+BASE = TimeStampIdentifier(0, 1)
+TABLE = AnalysisIdentifier(BASE, "table")
+
+def test_events_are_filtered():
+    data_repo = DataRepository()
+    received = []
+    data_repo.subscribe(received.append, filter_type(AnalysisIdentifier))
+
+    df = pd.DataFrame({"a": [1, 2]})
+    data_repo.add(BASE, None)
+    data_repo.add(TABLE, df, {"unit": "GB"})
+
+    assert len(received) == 1 and [event.kind for event in received[0]] == [EVENT_ADD]
+    event = received[0][0]
+    assert list(event) == [(TABLE, event.data[0], {"unit": "GB"})]
+    assert event.data[0].equals(df) and event.data[0] is not df
+
+def test_every_kind_of_event():
+    data_repo = DataRepository()
+    df = pd.DataFrame({"a": [1, 2]})
+    data_repo.add(TABLE, df)
+    received = []
+    data_repo.subscribe(received.append)
+
+    data_repo.update_metadata(TABLE, {"unit": "TB"})
+    data_repo.update_data(TABLE, df.head(1))
+    data_repo.remove(TABLE)
+
+    assert [batch[0].kind for batch in received] == [EVENT_UPDATE_METADATA, EVENT_UPDATE_DATA, EVENT_REMOVE]
+    assert received[0][0].metadata == [{"unit": "TB"}] and received[0][0].data == [None]
+    assert received[2][0].data[0].equals(df.head(1))
+
+def test_removed_scalar_event_carries_value():
+    data_repo = DataRepository()
+    total = AnalysisIdentifier(BASE, "total")
+    data_repo.add(total, 5)
+    received = []
+    data_repo.subscribe(received.append, events={EVENT_REMOVE})
+
+    data_repo.remove(total)
+
+    assert received[0][0].data == [5]
+
+def test_event_kinds_are_filtered():
+    data_repo = DataRepository()
+    received = []
+    data_repo.subscribe(received.append, events={EVENT_REMOVE})
+
+    data_repo.add(TABLE, 1)
+    data_repo.remove(TABLE)
+
+    assert [batch[0].kind for batch in received] == [EVENT_REMOVE]
+
+def test_unknown_event_kind_raises():
+    with pytest.raises(ValueError):
+        DataRepository().subscribe(lambda events: None, events={"added"})
+
+def test_batch_events_deliver_one_list():
+    data_repo = DataRepository()
+    received = []
+    data_repo.subscribe(received.append)
+
+    with data_repo.batch_events():
+        data_repo.add(AnalysisIdentifier(BASE, "total"), 5)
+        with data_repo.batch_events():
+            data_repo.add(AnalysisIdentifier(BASE, "mean"), 2.5)
+        assert received == []
+
+    assert len(received) == 1 and len(received[0]) == 2
+
+def test_join_is_one_event():
+    other_repo = DataRepository()
+    for index in range(100):
+        other_repo.add(AnalysisIdentifier(TimeStampIdentifier(index, index+1), "total"), float(index))
+    other_repo.add(AnalysisIdentifier(TimeStampIdentifier(5, 6), "table"), pd.DataFrame({"a": [1]}))
+
+    data_repo = DataRepository()
+    received = []
+    data_repo.subscribe(received.append)
+    data_repo.join(other_repo)
+
+    assert len(received) == 1 and len(received[0]) == 1
+    assert received[0][0].kind == EVENT_JOIN and len(received[0][0].identifiers) == 101
+
+def test_join_without_subscriptions():
+    other_repo = DataRepository()
+    other_repo.add(TABLE, 1)
+    data_repo = DataRepository()
+
+    data_repo.join(other_repo)
+
+    assert data_repo.get_data(TABLE) == 1
+
+def test_queued_subscription_reads_until_unsubscribed():
+    data_repo = DataRepository()
+    queued = data_repo.subscribe_queue(filter_analyis_type("table"), events={EVENT_ADD, EVENT_JOIN, EVENT_UPDATE_DATA})
+
+    data_repo.add(BASE, None)
+    data_repo.add(TABLE, 1)
+    data_repo.update_data(TABLE, 2)
+    data_repo.update_metadata(TABLE, {"unit": "GB"})
+    other_repo = DataRepository()
+    other_repo.add(AnalysisIdentifier(TimeStampIdentifier(5, 6), "table"), 3)
+    other_repo.add(AnalysisIdentifier(TimeStampIdentifier(5, 6), "total"), 4)
+    data_repo.join(other_repo)
+
+    consumed = []
+    consumer = threading.Thread(target=lambda: consumed.extend([event for batch in queued for event in batch]))
+    consumer.start()
+    data_repo.unsubscribe(queued)
+    consumer.join()
+
+    assert [(event.kind, event.data) for event in consumed] == [(EVENT_ADD, [1]), (EVENT_UPDATE_DATA, [2]), (EVENT_JOIN, [3])]
+
+def test_unsubscribed_subscriptions_get_nothing():
+    data_repo = DataRepository()
+    received = []
+    subscription = data_repo.subscribe(received.append)
+    queued = data_repo.subscribe_queue()
+    data_repo.unsubscribe(subscription)
+    data_repo.unsubscribe(queued)
+
+    data_repo.add(TABLE, 1)
+
+    assert received == []
+    assert queued.get_batch(timeout=0) == []
+
+def test_join_reads_other_repository_directly():
+    other_repo = DataRepository()
+    other_stats = other_repo.enable_stats()
+    other_repo.add(TABLE, pd.DataFrame({"a": [1]}))
+    other_repo.add(AnalysisIdentifier(BASE, "total"), 5)
+    other_repo.add(AnalysisIdentifier(BASE, "unit"), 1, {"unit": "GB"})
+    data_repo = DataRepository()
+    data_repo.enable_stats()
+    received = []
+    data_repo.subscribe(received.append)
+
+    data_repo.join(other_repo)
+
+    assert other_stats.lookups == {} and data_repo.stats.lookups == {}
+    assert data_repo._metadata == {AnalysisIdentifier(BASE, "unit"): {"unit": "GB"}}
+    assert received[0][0].data[1:] == [5, 1] and received[0][0].metadata == [None, None, {"unit": "GB"}]
@@ -0,0 +1,33 @@
+import pickle
+import threading
+
+from src.data.data_repository import DataRepository
+from src.data.identifier import AnalysisIdentifier, TimeStampIdentifier
+
+TOTAL = AnalysisIdentifier(TimeStampIdentifier(0, 1), "total")
+
+def test_context_is_per_thread():
+    data_repo = DataRepository()
+    stats = data_repo.enable_stats()
+    data_repo.add(TOTAL, 5)
+
+    with stats.in_context("analysis"):
+        # Like a stream or saver thread reading while the main thread runs an analysis
+        reader = threading.Thread(target=lambda: data_repo.get_data(TOTAL))
+        reader.start()
+        reader.join()
+        data_repo.get_data(TOTAL)
+    data_repo.get_data(TOTAL)
+
+    assert stats.lookups == {("analysis", "get_data"): {"hits": 1, "misses": 0}, (None, "get_data"): {"hits": 2, "misses": 0}}
+
+def test_pickled_stats_keep_counts():
+    data_repo = DataRepository()
+    stats = data_repo.enable_stats()
+    data_repo.add(TOTAL, 5)
+
+    with stats.in_context("analysis"):
+        data_repo.contains(TOTAL)
+        unpickled = pickle.loads(pickle.dumps(stats))
+
+    assert unpickled.lookups == stats.lookups and unpickled.context is None
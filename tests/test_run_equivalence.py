@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import yaml
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ANALYSES = ["hours", "namespaces", "busiest", "hours_over_time", "hours_total"]
+
+def run(tmp_path, name: str, *args) -> str:
+    """ Run the CLI on the equivalence plugins with extra arguments, returning its base path. The
+            run's directory links ./src and ./plugins, plugins are loaded relative to it. """
+    run_path = tmp_path / "run"
+    if(not run_path.exists()):
+        run_path.mkdir()
+        os.symlink(os.path.join(PROJECT_ROOT, "src"), run_path / "src")
+        os.symlink(os.path.join(PROJECT_ROOT, "tests", "plugins"), run_path / "plugins")
+
+    base_path = str(tmp_path / name)
+    config = {
+        "period": "January25-March25",
+        "timeline": {"align": "month"},
+        "ingest": {"run": ["IngestTimeline", "ClusterIngest"]},
+        "analysis": {"run": ANALYSES},
+        "saving": {"base-path": base_path, "run": ["AnalysisSaver"]}
+    }
+    config_path = tmp_path / f"{name}.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    # The text results are ordered by period, results within a period by hash
+    env = {**os.environ, "MPLBACKEND": "Agg", "PYTHONHASHSEED": "0"}
+    result = subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, "src", "main.py"), str(config_path), *args], cwd=run_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return base_path
+
+def read_outputs(base_path: str) -> dict:
+    """ Read every saved file except the run report, by its path relative to base_path. """
+    outputs = {}
+    for root, _, files in os.walk(base_path):
+        for filename in files:
+            if(filename == "run_report.json"):
+                continue
+            path = os.path.join(root, filename)
+            with open(path) as file:
+                outputs[os.path.relpath(path, base_path)] = file.read()
+    return outputs
+
+def test_sharded_and_backfilled_runs_match(tmp_path):
+    expected = read_outputs(run(tmp_path, "plain"))
+    sharded = read_outputs(run(tmp_path, "sharded", "--shards", "2"))
+    backfilled = read_outputs(run(tmp_path, "backfilled", "--backfill", "February25", "--workers", "1"))
+    february = read_outputs(run(tmp_path, "february", "--period", "February25"))
+
+    # Every analysis saved a result, the meta and aggregate ones ran on the joined shards
+    assert all([any([analysis in path or analysis in text for path, text in expected.items()]) for analysis in ANALYSES])
+    assert sharded == expected
+
+    assert len(february) > 0
+    # The backfilled period saves into its own subdirectory
+    assert {os.path.join(*path.split(os.sep)[1:]): text for path, text in backfilled.items()} == february
@@ -0,0 +1,38 @@
+import threading
+import time
+
+from src.utils.run_report import RunReport
+
+def spin(seconds: float):
+    """ Use CPU time on the calling thread for the given seconds. """
+    end = time.thread_time() + seconds
+    while(time.thread_time() < end):
+        pass
+
+def test_concurrent_steps_count_their_own_cpu_time():
+    report = RunReport()
+    started = threading.Barrier(2)
+
+    def run_step(name):
+        with report.measure("saving", name):
+            started.wait()
+            spin(0.2)
+
+    threads = [threading.Thread(target=run_step, args=(name,)) for name in ["first", "second"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(report.entries) == 2
+    for entry in report.entries:
+        assert entry["cpu_clock"] == "thread"
+        assert 0.2 <= entry["cpu_seconds"] < 0.3
+
+def test_main_thread_steps_count_process_cpu_time():
+    report = RunReport()
+
+    with report.measure("analysis", "total"):
+        spin(0.05)
+
+    assert "cpu_clock" not in report.entries[0] and report.entries[0]["cpu_seconds"] >= 0.05
@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.data.data_repository import DataRepository
+from src.data.identifier import AnalysisIdentifier, TimeStampIdentifier
+
+def test_vectors_keep_float_timestamps():
+    data_repo = DataRepository()
+    periods = [(1, 2), (1.5, 2.5), (2.25, 3.75)]
+    for index, (start_ts, end_ts) in enumerate(periods):
+        base = TimeStampIdentifier(start_ts, end_ts)
+        data_repo.add(base, None)
+        data_repo.add(AnalysisIdentifier(base, "total"), float(index))
+
+    values, found = data_repo.get_scalar_vectors("total", periods)[None]
+
+    assert found.tolist() == [True, True, True]
+    assert values.tolist() == [0.0, 1.0, 2.0]
+
+def test_vectors_match_exact_periods():
+    data_repo = DataRepository()
+    data_repo.add(AnalysisIdentifier(TimeStampIdentifier(1.5, 2.5), "total"), 4)
+
+    # A truncated period isn't the result's period
+    values, found = data_repo.get_scalar_vectors("total", [(1, 2), (1.5, 2.5)])[None]
+
+    assert found.tolist() == [False, True]
+    assert np.isnan(values[0]) and values[1] == 4
+
+def test_removed_results_leave_the_vectors():
+    data_repo = DataRepository()
+    identifiers = [AnalysisIdentifier(TimeStampIdentifier(start_ts, start_ts+1), "total") for start_ts in range(3)]
+    for identifier in identifiers:
+        data_repo.add(identifier, identifier.on.start_ts*10)
+    data_repo.remove(identifiers[1])
+
+    _, found = data_repo.get_scalar_vectors("total", [(0, 1), (1, 2), (2, 3)])[None]
+
+    assert found.tolist() == [True, False, True]
+    assert data_repo.get_data(identifiers[2]) == 20
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import views
+from src.data.views import get_read_only_view
+
+@pytest.mark.skipif(views.PANDAS_ALWAYS_COPIES_ON_WRITE, reason="pandas 3 always copies on write")
+@pytest.mark.parametrize("mode, shares_memory", [(True, True), (False, False), ("warn", False)])
+def test_view_copies_without_copy_on_write(mode, shares_memory):
+    df = pd.DataFrame({"a": [1, 2]})
+
+    with pd.option_context("mode.copy_on_write", mode):
+        view = get_read_only_view(df)
+        assert np.shares_memory(view["a"].to_numpy(), df["a"].to_numpy()) == shares_memory
+        view.loc[0, "a"] = 5
+
+    assert df["a"].tolist() == [1, 2]
+
+def test_view_is_shallow_when_pandas_always_copies_on_write(monkeypatch):
+    monkeypatch.setattr(views, "PANDAS_ALWAYS_COPIES_ON_WRITE", True)
+    df = pd.DataFrame({"a": [1, 2]})
+
+    assert views.is_copy_on_write()
+    assert np.shares_memory(get_read_only_view(df)["a"].to_numpy(), df["a"].to_numpy())
+
+def test_arrays_are_read_only():
+    array = np.array([1, 2])
+
+    with pytest.raises(ValueError):
+        get_read_only_view(array)[0] = 5
@@ -0,0 +1,50 @@
+import dataclasses
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.builtin_plugins import vis_fast_impls
+from src.builtin_plugins.vis_impls import FigureSpec, RENDER_ENGINE_CHOICES, render_png
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def build_bar_specs(rows: int, count: int = 3):
+    rng = np.random.default_rng(0)
+    specs = []
+    for index in range(count):
+        df = pd.DataFrame({
+            "namespace": [f"key-{index}-ns-{row:03d}" for row in range(rows)],
+            "hours": np.sort(rng.random(rows)*1000)[::-1]
+        })
+        specs.append(FigureSpec("bar", df, {}, f"Top namespaces {index}", f"Total hours: {df['hours'].sum():.2f}", "green"))
+    return specs
+
+def build_time_specs(periods: int, count: int = 3):
+    rng = np.random.default_rng(0)
+    starts = [1_700_000_000 + period*2_592_000 for period in range(periods)]
+    metadata = {"periods": [(start_ts, start_ts + 2_591_999) for start_ts in starts]}
+
+    specs = []
+    for index in range(count):
+        df = pd.DataFrame({"Period": [str(start_ts) for start_ts in starts], "hours": rng.random(periods)*100, "jobs": rng.random(periods)*10})
+        specs.append(FigureSpec("time", df, metadata, f"Hours over time {index}", "", {"hours": "blue", "jobs": "red"}))
+    return specs
+
+@pytest.mark.parametrize("specs", [build_bar_specs(5), build_bar_specs(40), build_time_specs(12)], ids=["bar", "bar_tall", "time"])
+def test_fast_engine_reused_template_renders_same_bytes(specs):
+    specs = [dataclasses.replace(spec, engine="fast") for spec in specs]
+    vis_fast_impls._templates.clear()
+
+    fresh = render_png(specs[0])
+    for spec in specs[1:]:
+        render_png(spec)
+
+    assert render_png(specs[0]) == fresh
+
+@pytest.mark.parametrize("engine", RENDER_ENGINE_CHOICES)
+def test_engines_render_png(engine):
+    for spec in build_bar_specs(5, 1) + build_time_specs(6, 1):
+        assert render_png(dataclasses.replace(spec, engine=engine)).startswith(PNG_SIGNATURE)